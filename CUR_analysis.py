@@ -20,15 +20,56 @@ then computes & renders the scenarios (SP + Spot) with the UX changes you reques
 How to use:
   1) python make_finops_cur_dashboard_html_v2.py
   2) Open the generated HTML file in Chrome/Edge
-  3) Upload your CUR CSV → dashboard renders instantly
+  3) Upload your CUR (.csv, or .csv.gz / .zip as delivered: inflated while streaming) → dashboard renders
+     (several part files / months at once, or a CUR delivery folder with its *-Manifest.json files:
+      each file is reduced on its own Web Worker and the per-billing-period partials are merged;
+      a single large plain CSV is split into row-aligned byte ranges across the idle cores)
+  4) Optionally narrow it to accounts / regions / user tags in the Drill-down card: workers also
+     build a group-by index, so filtering replays index cells instead of re-reading the files
 
 Your CSV never leaves the browser.
+
+Report mode (no upload for viewers):
+  python make_finops_cur_dashboard_html_v2.py CUR.csv.gz [more files / folders] [-o report.html]
+  The CURs are aggregated once (cur_engine.py) into a cube of (billing period × day × ProductCode ×
+  LineItemType × usage class × service) net / publicOnDemand sums, embedded gzip-compressed in the
+  HTML. The page rebuilds every KPI, chart and scenario table from it on load; scenario inputs
+  stay editable, and uploading files still works.
+  Add --state DIR to checkpoint per-part partials: refreshes of a delivery AWS keeps rewriting
+  rescan only new / changed parts, and --watch SECONDS keeps polling it.
+  Add --export DIR for the same tables (and the cube) as Arrow IPC + Parquet files (needs pyarrow);
+  the page's "Export tables" button downloads them as Arrow files from what it shows.
+
+Offline pages (no CDN access, e.g. air-gapped laptops):
+  python make_finops_cur_dashboard_html_v2.py --offline vendor/ [CUR files…]
+  vendor/ holds the pinned papaparse.min.js (5.4.1) and plotly-cartesian-2.30.0.min.js; both are
+  inlined gzip-compressed and only inflated when first needed (parser on upload, Plotly on first chart).
 """
 
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 
+from cur_engine import (
+    DEFAULT_RULES, CubeAccumulator, DashboardAccumulator, DashboardOptions, ScanCheckpoint, build_cube, cube_payload,
+    evaluate_dashboard, expand_inputs, export_tables, load_rules, write_export,
+)
+
 OUT_HTML = Path("finops_cur_scenario_dashboard_v2.html")
 
+# Pinned third-party scripts: the page fetches these CDN builds on first use, or --offline DIR
+# inlines local copies (same file names) so the page needs no network at all.
+ASSETS = {
+    "papaparse": ("5.4.1", "https://cdn.jsdelivr.net/npm/papaparse@5.4.1/papaparse.min.js"),
+    "plotly": ("2.30.0", "https://cdn.plot.ly/plotly-cartesian-2.30.0.min.js"),
+}
+
 html = r"""<!doctype html>
 <html>
 <head>
@@ -36,10 +77,6 @@ html = r"""<!doctype html>
   <meta name="viewport" content="width=device-width, initial-scale=1"/>
   <title>FinOps CUR Scenario Dashboard</title>
 
-  <!-- CSV parsing + charts -->
-  <script src="https://cdn.jsdelivr.net/npm/papaparse@5.4.1/papaparse.min.js"></script>
-  <script src="https://cdn.plot.ly/plotly-2.30.0.min.js"></script>
-
   <style>
     :root{
       --bg:#ffffff;
@@ -120,6 +157,8 @@ html = r"""<!doctype html>
     .dot{width:10px;height:10px;border-radius:999px;background:var(--warn);}
     .dot.ok{background:var(--good);}
     .dot.bad{background:var(--bad);}
+    .vlist{height:140px;overflow:auto;min-width:200px;padding:4px 8px;}
+    .vlist label{display:block;height:22px;line-height:22px;white-space:nowrap;overflow:hidden;text-overflow:ellipsis;font-size:13px;}
     @media (max-width:980px){.kpi{grid-column:span 12;}}
   </style>
 </head>
@@ -137,9 +176,15 @@ html = r"""<!doctype html>
     <div class="card wide">
       <div class="row" style="justify-content:space-between;">
         <div class="row">
-          <input class="input" type="file" id="fileInput" accept=".csv" />
+          <input class="input" type="file" id="fileInput" accept=".csv,.gz,.zip" multiple />
+          <label class="btn" for="folderInput">Folder…</label>
+          <input type="file" id="folderInput" webkitdirectory multiple style="display:none" />
           <button class="btn" id="runBtn">Compute scenarios</button>
           <span class="badge" id="fileName">No file selected</span>
+          <span class="badge" id="cacheBadge" style="display:none"></span>
+          <label class="sub"><input type="checkbox" id="shardCsv" checked /> Split large CSVs across cores</label>
+          <label class="sub"><input type="checkbox" id="previewCsv" checked /> Sampled preview of large CSVs</label>
+          <button class="btn" id="tablesExport" style="display:none" title="Arrow IPC files of the tables shown (zip)">Export tables</button>
         </div>
         <div class="row">
           <label class="sub">Additional SP coverage</label>
@@ -148,21 +193,110 @@ html = r"""<!doctype html>
           <input class="input" id="spotDiscount" value="0.60" />
           <label class="sub">Pass-through list</label>
           <input class="input" id="passThrough" value="0.3,0.4,0.5,0.6,0.7,0.8,1.0" style="min-width:260px"/>
+          <label class="sub">SP discount</label>
+          <input class="input" id="spDiscount" value="" placeholder="observed" style="width:80px"/>
         </div>
       </div>
 
       <div style="margin-top:12px" class="status">
         <span class="dot" id="statusDot"></span>
-        <span id="statusText">Upload a CUR CSV, then click “Compute scenarios”.</span>
+        <span id="statusText">Upload a CUR (.csv, .csv.gz or .zip), then click “Compute scenarios”.</span>
       </div>
 
       <div class="note" style="margin-top:10px">
         <b>Expected CUR columns:</b> lineItem/NetUnblendedCost (or UnblendedCost), pricing/publicOnDemandCost (optional),
         lineItem/UsageStartDate, bill/BillingPeriodStartDate, bill/BillingPeriodEndDate,
         lineItem/LineItemType, lineItem/ProductCode, lineItem/UsageType (optional), product/ProductName (optional).
+        For drill-down: lineItem/UsageAccountId, product/region and resourceTags/user:* (all optional).
+      </div>
+    </div>
+
+    <!-- Diagnostics of the last run (phase timings, counters, memory); exportable as JSON -->
+    <details class="card wide" id="diagCard" style="margin-top:14px; display:none">
+      <summary class="section-title" style="cursor:pointer">Diagnostics <span class="sub" id="diagSummary"></span></summary>
+      <div class="grid" style="margin-top:10px">
+        <div style="grid-column:span 6">
+          <table>
+            <thead>
+              <tr>
+                <th>Phase</th>
+                <th style="text-align:right">Time</th>
+                <th style="text-align:right">Share of run</th>
+              </tr>
+            </thead>
+            <tbody id="diagPhases"></tbody>
+          </table>
+        </div>
+        <div style="grid-column:span 6">
+          <table>
+            <thead>
+              <tr>
+                <th>Counter</th>
+                <th style="text-align:right">Value</th>
+              </tr>
+            </thead>
+            <tbody id="diagCounters"></tbody>
+          </table>
+        </div>
+        <div class="wide" id="diagFilesWrap" style="overflow:auto; max-height:320px">
+          <table>
+            <thead>
+              <tr>
+                <th>File</th>
+                <th style="text-align:right">Size</th>
+                <th style="text-align:right">Rows</th>
+                <th style="text-align:right">Parse</th>
+                <th style="text-align:right">Aggregate</th>
+                <th style="text-align:right">Rows/s</th>
+              </tr>
+            </thead>
+            <tbody id="diagFiles"></tbody>
+          </table>
+        </div>
+      </div>
+      <div class="row" style="margin-top:10px">
+        <button class="btn" id="diagExport">Export JSON</button>
+        <button class="btn" id="cacheClear">Clear scan cache</button>
+        <label class="sub">Cache quota (MB)</label>
+        <input class="input" id="cacheQuota" value="256" style="width:70px" />
+        <span class="note" id="cacheInfo"></span>
+        <span class="note">Phases are also recorded as <code>cur:*</code> entries in the browser's performance timeline.</span>
+      </div>
+    </details>
+
+    <!-- Drill-down by account / region / tag, answered from the scan's group-by index -->
+    <div class="card wide" id="drillCard" style="margin-top:14px; display:none">
+      <div class="section-title">Drill-down</div>
+      <div class="row" id="drillDims" style="align-items:flex-start"></div>
+      <div class="row" style="margin-top:10px">
+        <button class="btn" id="drillReset">Show all</button>
+        <span class="note" id="drillNote"></span>
       </div>
     </div>
 
+    <!-- Sampled preview of a large scan: which figures are still estimates, and the sampled strata -->
+    <div class="card wide" id="previewCard" style="margin-top:14px; display:none">
+      <div class="section-title">Preview: estimated from a sample</div>
+      <div class="note" id="previewNote"></div>
+      <details style="margin-top:8px">
+        <summary class="sub" style="cursor:pointer">Sampled strata (ProductCode × LineItemType)</summary>
+        <div style="overflow:auto">
+          <table>
+            <thead>
+              <tr>
+                <th>ProductCode</th>
+                <th>LineItemType</th>
+                <th style="text-align:right">Estimated net</th>
+                <th style="text-align:right">95% interval</th>
+                <th style="text-align:right">Blocks</th>
+              </tr>
+            </thead>
+            <tbody id="previewStrataBody"></tbody>
+          </table>
+        </div>
+      </details>
+    </div>
+
     <!-- KPIs -->
     <div class="grid" id="kpiGrid" style="margin-top:14px; display:none;"></div>
 
@@ -175,15 +309,81 @@ html = r"""<!doctype html>
     <div class="grid" id="chartsGrid" style="margin-top:14px; display:none;">
       <!-- 1) DAILY chart (full width) -->
       <div class="card wide">
+        <div class="row" style="justify-content:flex-end">
+          <label class="sub">Resolution</label>
+          <select class="input" id="seriesRes">
+            <option value="daily">Daily</option>
+            <option value="hourly">Hourly</option>
+          </select>
+          <label class="sub"><input type="checkbox" id="seriesClip" checked /> Clip Y-axis at p95×1.25</label>
+        </div>
         <div id="chartDaily"></div>
         <div class="note" id="dailyNote" style="margin-top:8px;"></div>
       </div>
 
+      <!-- Spend spikes flagged on the daily chart -->
+      <div class="card wide" id="spikeCard" style="display:none">
+        <div class="section-title">Spend spikes</div>
+        <div style="overflow:auto">
+          <table>
+            <thead>
+              <tr>
+                <th>Day</th>
+                <th style="text-align:right">Variable spend</th>
+                <th style="text-align:right">Excess over typical day</th>
+                <th style="text-align:right">Robust z</th>
+                <th>Spike contributors</th>
+              </tr>
+            </thead>
+            <tbody id="spikeBody"></tbody>
+          </table>
+        </div>
+        <div class="note" id="spikeNote" style="margin-top:8px;"></div>
+      </div>
+
       <!-- 2) TOP services BELOW daily chart (full width, separate container) -->
       <div class="card wide">
         <div id="chartTop"></div>
       </div>
 
+      <!-- Per-billing-period breakdown (multi-month input only) -->
+      <div class="card wide" id="periodCard" style="display:none">
+        <div class="section-title">Billing periods</div>
+        <div style="overflow:auto">
+          <table>
+            <thead>
+              <tr>
+                <th>Billing period</th>
+                <th style="text-align:right">Total bill</th>
+                <th style="text-align:right">Compute OD baseline</th>
+                <th style="text-align:right">Observed discount</th>
+                <th style="text-align:right">SP coverage</th>
+                <th style="text-align:right">Spot share of compute</th>
+              </tr>
+            </thead>
+            <tbody id="periodBody"></tbody>
+          </table>
+        </div>
+      </div>
+
+      <!-- Extra cost pools from the classification rules ("pools"), if any -->
+      <div class="card wide" id="poolCard" style="display:none">
+        <div class="section-title">Cost pools (classification rules)</div>
+        <div style="overflow:auto">
+          <table>
+            <thead>
+              <tr>
+                <th>Pool</th>
+                <th style="text-align:right">Net cost</th>
+                <th style="text-align:right">Public OD cost</th>
+                <th style="text-align:right">Share of total bill</th>
+              </tr>
+            </thead>
+            <tbody id="poolBody"></tbody>
+          </table>
+        </div>
+      </div>
+
       <!-- Pass-through table -->
       <div class="card wide" id="ptCard">
         <div class="section-title">Pass-through impact table (incremental slice only)</div>
@@ -207,6 +407,17 @@ html = r"""<!doctype html>
         </div>
       </div>
 
+      <!-- Hourly Savings Plan commitment, optimized on the load-duration curve -->
+      <div class="card wide">
+        <div class="section-title">Savings Plan commitment from the hourly curve</div>
+        <div class="note" id="commitNote" style="margin-bottom:10px;"></div>
+        <div class="grid" style="gap:14px" id="commitKpiGrid"></div>
+        <div class="grid" style="gap:14px; margin-top:10px">
+          <div style="grid-column:span 6" id="chartLoadDuration"></div>
+          <div style="grid-column:span 6" id="chartCommitCurve"></div>
+        </div>
+      </div>
+
       <div class="card wide"><hr/></div>
 
       <!-- Spot analysis -->
@@ -241,21 +452,63 @@ html = r"""<!doctype html>
           Practical policy: keep baseline on Savings Plans / On-Demand; use Spot for overflow + stateless workers with fallback capacity.
         </div>
       </div>
+
+      <!-- Largest resources of the Spot pools (bounded top-K + distinct counts from the scan) -->
+      <div class="card wide" id="candCard" style="display:none">
+        <div class="section-title">Top Spot candidates</div>
+        <div class="note" id="candNote" style="margin-bottom:10px"></div>
+        <div style="overflow:auto">
+          <table>
+            <thead>
+              <tr>
+                <th>#</th>
+                <th>Resource</th>
+                <th>Pool</th>
+                <th>Instance type</th>
+                <th style="text-align:right">Net cost /mo</th>
+                <th style="text-align:right">Share of pool</th>
+                <th style="text-align:right">Savings on Spot /mo</th>
+              </tr>
+            </thead>
+            <tbody id="candBody"></tbody>
+          </table>
+        </div>
+      </div>
+
+      <!-- Scenario sweep: the full parameter grid, evaluated in one pass from the scan summary -->
+      <div class="card wide">
+        <div class="section-title">Scenario sweep</div>
+        <div class="row">
+          <label class="sub">Pass-through</label>
+          <select class="input" id="sweepPt"></select>
+          <label class="sub">Break-even target (€ / month, blank: current SP plan)</label>
+          <input class="input" id="sweepTarget" value="" style="width:110px" />
+          <button class="btn" id="sweepExport">Export grid CSV</button>
+        </div>
+        <div class="note" id="sweepNote" style="margin-top:8px"></div>
+        <div class="grid" style="gap:14px; margin-top:10px">
+          <div style="grid-column:span 6" id="chartSweepSP"></div>
+          <div style="grid-column:span 6" id="chartSweepSpot"></div>
+          <div class="wide" id="chartSweepTotal"></div>
+        </div>
+      </div>
     </div>
   </div>
 
-<script>
+<!-- Line classification rules (cur_engine.DEFAULT_RULES or --rules FILE), used by both engines -->
+<script type="application/json" id="curRules">__CUR_RULES__</script>
+
+<!-- Precomputed aggregate cube (gzip + base64 JSON); filled in by `python CUR_analysis.py CUR…` -->
+<script type="application/octet-stream" id="curCube" data-encoding="gzip+base64">__CUR_CUBE__</script>
+
+<!-- CSV parser + chart library, inlined by --offline (gzip + base64); empty → pinned CDN builds -->
+<script type="application/octet-stream" id="asset-papaparse" data-encoding="gzip+base64">__CUR_PAPAPARSE__</script>
+<script type="application/octet-stream" id="asset-plotly" data-encoding="gzip+base64">__CUR_PLOTLY__</script>
+
+<script id="curEngine">
   // -----------------------------
-  // Utilities
+  // CUR engine (no DOM access): runs on the page and, unchanged, inside the parse workers
   // -----------------------------
-  const eur = (x, d=0) => {
-    const n = (isFinite(x) ? x : 0);
-    return "€" + n.toLocaleString(undefined, {minimumFractionDigits:d, maximumFractionDigits:d});
-  };
-  const pct = (x, d=1) => {
-    const n = (isFinite(x) ? x : 0);
-    return (n*100).toFixed(d) + "%";
-  };
   const num = (v) => {
     if (v === null || v === undefined) return 0;
     const s = String(v).replace(/,/g,"").trim();
@@ -264,317 +517,3445 @@ html = r"""<!doctype html>
   };
   const str = (v) => (v === null || v === undefined) ? "" : String(v);
 
-  const setStatus = (kind, msg) => {
-    const dot = document.getElementById("statusDot");
-    dot.classList.remove("ok","bad");
-    if (kind === "ok") dot.classList.add("ok");
-    if (kind === "bad") dot.classList.add("bad");
-    document.getElementById("statusText").textContent = msg;
+  // Column accessors on header-keyed rows (PapaParse header:true).
+  const col = {
+    net: (r)=> num(r["lineItem/NetUnblendedCost"] ?? r["lineItem/UnblendedCost"]),
+    publicOD: (r)=> num(r["pricing/publicOnDemandCost"]),
+    lineType: (r)=> str(r["lineItem/LineItemType"] ?? "Unknown"),
+    productCode: (r)=> str(r["lineItem/ProductCode"] ?? "Unknown"),
+    usageType: (r)=> str(r["lineItem/UsageType"] ?? ""),
+    service: (r)=> str(r["product/ProductName"] ?? r["lineItem/ProductCode"] ?? "Unknown"),
+    usageStart: (r)=> str(r["lineItem/UsageStartDate"] ?? ""),
+    resourceId: (r)=> str(r["lineItem/ResourceId"] ?? ""),
+    instanceType: (r)=> str(r["product/instanceType"] ?? ""),
+    billStart: (r)=> str(r["bill/BillingPeriodStartDate"] ?? ""),
+    billEnd: (r)=> str(r["bill/BillingPeriodEndDate"] ?? "")
   };
 
-  const parseList = (s) => s.split(",").map(x=>x.trim()).filter(Boolean).map(x=>parseFloat(x)).filter(x=>isFinite(x) && x>0 && x<=1);
+  // -----------------------------
+  // Line classification. The rules (DEFAULT_RULES in cur_engine.py, embedded as JSON and passed
+  // in opts.rules) are compiled once; each distinct (LineItemType, ProductCode, UsageType) is then
+  // classified once into a flag bitmask, so the hot loops do one lookup plus bit tests.
+  // -----------------------------
+  const FLAG_NAMES = ["fixed","compute","spCovered","spot","ec2Box","ecs","fargateSpot"];
+  const F_FIXED = 1, F_COMPUTE = 2, F_SP_COVERED = 4, F_SPOT = 8, F_EC2_BOX = 16, F_ECS = 32, F_FARGATE_SPOT = 64;
+  const POOL_SHIFT = FLAG_NAMES.length;   // extra pools use the bits above the built-in flags
+
+  function compileRules(rules, computeCodes){
+    const poolNames = Object.keys(rules.pools || {});
+    if (poolNames.length > 31 - POOL_SHIFT) throw new Error(`at most ${31 - POOL_SHIFT} pools are supported`);
+    const codes = new Set(computeCodes);
+    const patterns = [];   // usageTypeContains substrings; UsageType is reduced to bits over these
 
-  // Percentile helper (robust y-axis clipping)
-  function percentile(arr, p){
-    const xs = arr.filter(x=>isFinite(x)).slice().sort((a,b)=>a-b);
-    if (!xs.length) return 0;
-    const idx = (xs.length-1) * p;
-    const lo = Math.floor(idx), hi = Math.ceil(idx);
-    if (lo === hi) return xs[lo];
-    const w = idx - lo;
-    return xs[lo]*(1-w) + xs[hi]*w;
+    const alternative = (a) => {
+      const values = (v) => v == null ? null : (v === "$computeCodes" ? codes : new Set(v));
+      let utMask = 0;
+      for (const pat of (a.usageTypeContains || [])){
+        const lp = pat.toLowerCase();
+        if (!patterns.includes(lp)) patterns.push(lp);
+        utMask |= 1 << patterns.indexOf(lp);
+      }
+      return {lt: values(a.lineType), pc: values(a.productCode),
+              ltHas: (a.lineTypeContains || []).map(x => x.toLowerCase()), utMask};
+    };
+    const named = FLAG_NAMES.map(n => rules[n] || []).concat(poolNames.map(n => rules.pools[n] || []));
+    return {rules, poolNames, patterns, flags: named.map((alts, i) => ({bit: 1 << i, alts: alts.map(alternative)}))};
   }
 
-  // -----------------------------
-  // Core computation
-  // -----------------------------
-  function computeDashboard(rows, opts){
-    const col = {
-      net: (r)=> num(r["lineItem/NetUnblendedCost"] ?? r["lineItem/UnblendedCost"]),
-      publicOD: (r)=> num(r["pricing/publicOnDemandCost"]),
-      lineType: (r)=> str(r["lineItem/LineItemType"] ?? "Unknown"),
-      productCode: (r)=> str(r["lineItem/ProductCode"] ?? "Unknown"),
-      usageType: (r)=> str(r["lineItem/UsageType"] ?? ""),
-      service: (r)=> str(r["product/ProductName"] ?? r["lineItem/ProductCode"] ?? "Unknown"),
-      usageStart: (r)=> str(r["lineItem/UsageStartDate"] ?? ""),
-      billStart: (r)=> str(r["bill/BillingPeriodStartDate"] ?? ""),
-      billEnd: (r)=> str(r["bill/BillingPeriodEndDate"] ?? "")
-    };
-
-    const bs = col.billStart(rows[0]);
-    const be = col.billEnd(rows[0]);
-    const periodStart = bs ? new Date(bs) : null;
-    const periodEnd = be ? new Date(be) : null;
-    const daysInMonth = (periodStart && periodEnd) ? Math.max(1, Math.round((periodEnd - periodStart)/(24*3600*1000))) : 30;
+  function usageBitsOf(cls, ut){
+    const u = ut.toLowerCase();
+    let bits = 0;
+    cls.patterns.forEach((pat, i) => { if (u.includes(pat)) bits |= 1 << i; });
+    return bits;
+  }
+
+  function classifyLine(cls, lt, pc, bits){
+    const ltl = lt.toLowerCase();
+    let flags = 0;
+    for (const {bit, alts} of cls.flags){
+      for (const a of alts){
+        if ((!a.lt || a.lt.has(lt)) && (!a.pc || a.pc.has(pc)) &&
+            (!a.ltHas.length || a.ltHas.some(x => ltl.includes(x))) && (!a.utMask || (bits & a.utMask))){
+          flags |= bit;
+          break;
+        }
+      }
+    }
+    return flags;
+  }
 
-    const fixedTypes = new Set(["SavingsPlanRecurringFee","RIFee","Fee","EdpDiscount","SavingsPlanNegation"]);
-    const dailyVar = new Map();
-    const serviceSpend = new Map();
+  // Memoized flags for header-keyed rows (lineType → productCode → usageType → flags).
+  function rowFlags(acc, lt, pc, ut){
+    let byPc = acc.flagMemo.get(lt);
+    if (!byPc) acc.flagMemo.set(lt, byPc = new Map());
+    let byUt = byPc.get(pc);
+    if (!byUt) byPc.set(pc, byUt = new Map());
+    let f = byUt.get(ut);
+    if (f === undefined){
+      f = classifyLine(acc.cls, lt, pc, usageBitsOf(acc.cls, ut));
+      byUt.set(ut, f);
+    }
+    return f;
+  }
 
-    const computeCodes = new Set(opts.computeCodes);
-    const computeUsageLineTypes = new Set(["Usage","SavingsPlanCoveredUsage","SavingsPlanNegation"]);
+  // Running sums of a period partial (merged by addition).
+  const PERIOD_SUMS = [
+    "totalBill","fixedMonthly","computePublicBaseline","computeActualCost","coveredPublic",
+    "spotNet","ec2BoxNet","ec2BoxPublic","ecsNet","ecsPublic","fargateSpotNet"
+  ];
 
-    let totalBill = 0;
-    let fixedMonthly = 0;
+  // Mergeable partial aggregate for one billing period (+ net / publicOD sums per extra pool).
+  // Each service's variable spend per day is kept in DAY_SLOTS fixed slots (see daySlot), so a
+  // service costs the same memory however many days and rows the period has.
+  const DAY_SLOTS = 31;              // days of a billing period kept per service (a calendar month)
 
-    let computePublicBaseline = 0;
-    let computeActualCost = 0;
-    let coveredPublic = 0;
+  function initPeriod(billStart, billEnd, nPools = 0){
+    const p = {billStart, billEnd, rowCount: 0, dailyVar: new Map(), serviceSpend: new Map(),
+               serviceDays: new Map(),                           // service → DAY_SLOTS day totals of variable spend
+               resources: initResources(),
+               hourlyVar: new Map(), hourlyCompute: new Map(),   // hourlyCompute: compute lines' publicOD
+               poolNet: new Array(nPools).fill(0), poolPublic: new Array(nPools).fill(0)};
+    for (const k of PERIOD_SUMS) p[k] = 0;
+    return p;
+  }
 
-    // Spot (only for KPIs/scenarios)
-    let spotNet = 0;
+  function mergePeriod(p, q){
+    p.rowCount += q.rowCount;
+    for (const k of PERIOD_SUMS) p[k] += q[k];
+    q.poolNet.forEach((v,i) => { p.poolNet[i] = (p.poolNet[i]||0) + v; });
+    q.poolPublic.forEach((v,i) => { p.poolPublic[i] = (p.poolPublic[i]||0) + v; });
+    for (const [k,v] of q.dailyVar) p.dailyVar.set(k, (p.dailyVar.get(k)||0) + v);
+    for (const [k,v] of q.hourlyVar) p.hourlyVar.set(k, (p.hourlyVar.get(k)||0) + v);
+    for (const [k,v] of q.hourlyCompute) p.hourlyCompute.set(k, (p.hourlyCompute.get(k)||0) + v);
+    for (const [k,v] of q.serviceSpend) p.serviceSpend.set(k, (p.serviceSpend.get(k)||0) + v);
+    for (const [svc, days] of q.serviceDays) addServiceDays(p, svc, days);
+    mergeResources(p.resources, q.resources);
+    return p;
+  }
 
-    // EC2 BoxUsage proxy
-    let ec2BoxNet = 0;
-    let ec2BoxPublic = 0;
+  function addServiceDay(p, svc, day, v){
+    const slot = daySlot(p, day);
+    if (slot < 0) return;
+    let days = p.serviceDays.get(svc);
+    if (!days) p.serviceDays.set(svc, days = new Float64Array(DAY_SLOTS));
+    days[slot] += v;
+  }
 
-    // ECS/Fargate pool
-    const ecsCodes = new Set(["AmazonECS","AWSFargate"]);
-    let ecsNet = 0;
-    let ecsPublic = 0;
-    let fargateSpotNet = 0;
+  function addServiceDays(p, svc, days){
+    const mine = p.serviceDays.get(svc);
+    if (!mine) p.serviceDays.set(svc, Float64Array.from(days));
+    else for (let i=0;i<DAY_SLOTS;i++) mine[i] += days[i];
+  }
 
-    for (const r of rows){
-      const net = col.net(r);
-      const pub = col.publicOD(r);
-      const lt = col.lineType(r);
-      const pc = col.productCode(r);
-      const ut = col.usageType(r);
-      const svc = col.service(r);
-
-      totalBill += net;
-      serviceSpend.set(svc, (serviceSpend.get(svc)||0) + net);
-
-      const isFixed = fixedTypes.has(lt);
-      if (isFixed) fixedMonthly += net;
-      else{
-        const d = col.usageStart(r);
-        const dtObj = d ? new Date(d) : null;
-        if (dtObj && !isNaN(dtObj.getTime())){
-          const key = dtObj.toISOString().slice(0,10);
-          dailyVar.set(key, (dailyVar.get(key)||0) + net);
-        }
-      }
+  // The billing period's days (UTC dates), or null when the period has no dates.
+  function periodDays(p){
+    const periodStart = p.billStart ? new Date(p.billStart) : null;
+    const periodEnd = p.billEnd ? new Date(p.billEnd) : null;
+    if (!periodStart || !periodEnd || isNaN(periodStart.getTime()) || isNaN(periodEnd.getTime())) return null;
+    const daysInMonth = Math.max(1, Math.round((periodEnd - periodStart)/(24*3600*1000)));
+    const dates = [];
+    const d = new Date(periodStart);
+    for (let i=0;i<daysInMonth;i++){
+      dates.push(d.toISOString().slice(0,10));
+      d.setDate(d.getDate()+1);
+    }
+    return dates;
+  }
 
-      if (computeCodes.has(pc) && computeUsageLineTypes.has(lt)){
-        computePublicBaseline += pub;
-        computeActualCost += net;
-        if (lt === "SavingsPlanCoveredUsage") coveredPublic += pub;
+  // Slot of a usage day ("YYYY-MM-DD") in p.serviceDays: its index among the period's days, -1
+  // outside them. Without period dates it is the day of the month - 1 (so days of different
+  // months share a slot). Memoized per partial.
+  const daySlotMemo = new WeakMap();
+  function daySlot(p, day){
+    let memo = daySlotMemo.get(p);
+    if (!memo) daySlotMemo.set(p, memo = new Map());
+    let slot = memo.get(day);
+    if (slot === undefined){
+      const days = periodDays(p);
+      if (!days) slot = Number(day.slice(8, 10)) - 1;
+      else {
+        const i = Math.round((Date.parse(day) - Date.parse(days[0])) / (24*3600*1000));
+        slot = i >= 0 && i < Math.min(days.length, DAY_SLOTS) ? i : -1;
       }
+      memo.set(day, slot);
+    }
+    return slot;
+  }
 
-      const isSpot = (ut.toLowerCase().includes("spotusage") || lt.toLowerCase().includes("spot"));
-      if (isSpot){
-        spotNet += net;
-      }
+  // -----------------------------
+  // Spot candidates (cur_engine.ResourceStats). Lines of the EC2 box-usage and ECS / Fargate
+  // pools are ranked by resource ID and by instance type with a weighted Space-Saving summary,
+  // and their distinct resource IDs are counted with HyperLogLog: a month of tens of millions
+  // of resources takes the same memory as a handful. Both are mergeable, so they travel with
+  // the period partials.
+  // -----------------------------
+  const RESOURCE_TOPK = 256;         // counters kept per ranking; the table grows to twice that between prunes
+  const RESOURCE_TOP_REPORTED = 20;
+  const HLL_BITS = 12;               // 4096 registers, ~1.6% standard error
+  const RESOURCE_POOLS = [["ec2Box", F_EC2_BOX], ["ecs", F_ECS]];
+  const F_RESOURCE_POOLS = F_EC2_BOX | F_ECS;
 
-      if (pc === "AmazonEC2" && computeUsageLineTypes.has(lt) && ut.toLowerCase().includes("boxusage")){
-        ec2BoxNet += net;
-        ec2BoxPublic += pub;
-      }
+  // key → [count, overcount, info]. A key that is not tracked enters at `floor` (the largest
+  // count evicted so far) plus its weight; once the table holds 2·capacity keys it is cut back
+  // to the largest `capacity` (ties by key). Weights must be positive.
+  const initTopK = () => ({floor: 0, items: new Map()});
 
-      if (ecsCodes.has(pc) && computeUsageLineTypes.has(lt)){
-        ecsNet += net;
-        ecsPublic += pub;
-        if (ut.toLowerCase().includes("spotusage")) fargateSpotNet += net;
-      }
+  function topKAdd(t, key, w, info){
+    const e = t.items.get(key);
+    if (e){
+      e[0] += w;
+      return;
     }
+    t.items.set(key, [t.floor + w, t.floor, info]);
+    if (t.items.size >= 2 * RESOURCE_TOPK) pruneTopK(t);
+  }
 
-    const computeShareTotal = totalBill > 0 ? (computeActualCost / totalBill) : 0;
-    const observedDiscount = computePublicBaseline > 0 ? (1 - (computeActualCost / computePublicBaseline)) : 0;
-    const currentCoverage = computePublicBaseline > 0 ? (coveredPublic / computePublicBaseline) : 0;
+  const rankTopK = (t) => Array.from(t.items).sort((a,b) => (b[1][0] - a[1][0]) || (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0));
 
-    const addCoverage = Math.max(0, Math.min(1, opts.addCoverage));
-    const targetCoverage = Math.min(1, currentCoverage + addCoverage);
-    const incrementalCommitmentOD = computePublicBaseline * addCoverage;
-    const affectedSliceTotalBill = computeShareTotal * addCoverage;
+  function pruneTopK(t){
+    const kept = rankTopK(t);
+    if (kept.length > RESOURCE_TOPK) t.floor = Math.max(t.floor, kept[RESOURCE_TOPK][1][0]);
+    t.items = new Map(kept.slice(0, RESOURCE_TOPK));
+  }
 
-    // build normalized daily series
-    let dates = [];
-    if (periodStart && periodEnd && !isNaN(periodStart.getTime()) && !isNaN(periodEnd.getTime())){
-      const d = new Date(periodStart);
-      for (let i=0;i<daysInMonth;i++){
-        dates.push(d.toISOString().slice(0,10));
-        d.setDate(d.getDate()+1);
-      }
-    } else {
-      dates = Array.from(dailyVar.keys()).sort();
+  // A key missing on one side may have had up to that side's floor there.
+  function mergeTopK(t, u){
+    const items = new Map();
+    for (const [k, [c, o, info]] of t.items){
+      const e = u.items.get(k);
+      items.set(k, e ? [c + e[0], o + e[1], info] : [c + u.floor, o + u.floor, info]);
     }
-    const fixedPerDay = fixedMonthly / Math.max(1, dates.length);
+    for (const [k, [c, o, info]] of u.items) if (!t.items.has(k)) items.set(k, [c + t.floor, o + t.floor, info]);
+    t.items = items;
+    t.floor += u.floor;
+    if (items.size >= 2 * RESOURCE_TOPK) pruneTopK(t);
+  }
 
-    const dailyX = [];
-    const dailyNormY = [];
-    const dailyVarY = [];
-    for (const key of dates){
-      dailyX.push(key);
-      const v = dailyVar.get(key)||0;
-      dailyVarY.push(v);
-      dailyNormY.push(v + fixedPerDay);
+  function scaleTopK(t, factor){
+    t.floor *= factor;
+    for (const e of t.items.values()){ e[0] *= factor; e[1] *= factor; }
+  }
+
+  const CRC_TABLE = Array.from({length: 256}, (_, n) => {
+    let c = n;
+    for (let k=0;k<8;k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+    return c >>> 0;
+  });
+  function crc32(bytes){
+    let crc = 0xFFFFFFFF;
+    for (let i=0;i<bytes.length;i++) crc = CRC_TABLE[(crc ^ bytes[i]) & 255] ^ (crc >>> 8);
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+  }
+
+  // CRC-32 of the UTF-8 bytes through MurmurHash3's finalizer (cur_engine.hash32).
+  const utf8 = new TextEncoder();
+  function hash32(s){
+    let h = 0xFFFFFFFF;
+    for (let i=0;i<s.length;i++){
+      const u = s.charCodeAt(i);
+      if (u > 127){   // non-ASCII: hash the UTF-8 bytes
+        h = ~crc32(utf8.encode(s));
+        break;
+      }
+      h = CRC_TABLE[(h ^ u) & 255] ^ (h >>> 8);
     }
+    h = (h ^ 0xFFFFFFFF) >>> 0;
+    h ^= h >>> 16;
+    h = Math.imul(h, 0x85EBCA6B);
+    h ^= h >>> 13;
+    h = Math.imul(h, 0xC2B2AE35);
+    return (h ^ (h >>> 16)) >>> 0;
+  }
 
-    // top services
-    const topServices = Array.from(serviceSpend.entries()).sort((a,b)=>b[1]-a[1]).slice(0,10);
-    const topSvcNames = topServices.map(x=>x[0]);
-    const topSvcCosts = topServices.map(x=>x[1]);
+  function hllAdd(reg, s){
+    const h = hash32(s);
+    const rest = (h << HLL_BITS) >>> 0;
+    const rank = rest ? Math.clz32(rest) + 1 : 33 - HLL_BITS;
+    const i = h >>> (32 - HLL_BITS);
+    if (rank > reg[i]) reg[i] = rank;
+  }
 
-    // pass-through table
-    const ptRows = opts.passThrough.map(pt=>{
-      const discToCustomer = observedDiscount * pt;
-      const overallReduction = affectedSliceTotalBill * discToCustomer;
-      const monthlySavings = totalBill * overallReduction;
-      const annualSavings = monthlySavings * 12;
-      return {pt, discToCustomer, overallReduction, monthlySavings, annualSavings};
-    });
+  function hllCount(reg){
+    const m = reg.length;
+    let total = 0, zeros = 0;
+    for (const r of reg){
+      total += 2 ** -r;
+      if (!r) zeros++;
+    }
+    let e = 0.7213 / (1 + 1.079 / m) * m * m / total;
+    if (e <= 2.5 * m && zeros) e = m * Math.log(m / zeros);               // small range: linear counting
+    else if (e > 2 ** 32 / 30) e = -(2 ** 32) * Math.log(1 - e / 2 ** 32);  // 32-bit hash collisions
+    return Math.round(e);
+  }
+
+  function initResources(){
+    const out = {};
+    for (const [name] of RESOURCE_POOLS) out[name] = {ids: initTopK(), types: initTopK(), hll: new Uint8Array(1 << HLL_BITS)};
+    return out;
+  }
 
-    // spot KPIs + scenario
-    const spotShareTotal = totalBill>0 ? spotNet/totalBill : 0;
-    const spotShareCompute = computeActualCost>0 ? spotNet/computeActualCost : 0;
+  let lastResource = null;   // consecutive lines of one resource hash it once
+  let lastSlot = null;
+  function addResource(r, f, net, id, type){
+    for (const [name, bit] of RESOURCE_POOLS){
+      if (!(f & bit)) continue;
+      const pool = r[name];
+      if (id){
+        if (id !== lastResource || pool.hll !== lastSlot){
+          hllAdd(pool.hll, id);
+          lastResource = id;
+          lastSlot = pool.hll;
+        }
+        if (net > 0) topKAdd(pool.ids, id, net, type);
+      }
+      if (type && net > 0) topKAdd(pool.types, type, net, "");
+    }
+  }
 
-    const candidateEC2Box = (ec2BoxPublic>0 ? ec2BoxPublic : ec2BoxNet);
-    const candidateECS = (ecsPublic>0 ? ecsPublic : ecsNet);
+  function mergeResources(r, q){
+    for (const [name] of RESOURCE_POOLS){
+      const a = r[name], b = q[name];
+      mergeTopK(a.ids, b.ids);
+      mergeTopK(a.types, b.types);
+      for (let i=0;i<a.hll.length;i++) if (b.hll[i] > a.hll[i]) a.hll[i] = b.hll[i];
+    }
+    return r;
+  }
 
-    const spotDisc = Math.max(0, Math.min(0.95, opts.spotDiscount));
-    const adopt = [0.10,0.15,0.20,0.30];
-    const spotScenario = adopt.map(a=>{
-      const savEC2 = candidateEC2Box * a * spotDisc;
-      const savECS = candidateECS * a * spotDisc;
-      return {
-        a,
-        savEC2,
-        overallEC2: totalBill>0 ? savEC2/totalBill : 0,
-        savECS,
-        overallECS: totalBill>0 ? savECS/totalBill : 0
+  function resourceMetrics(r, n = RESOURCE_TOP_REPORTED){
+    const out = {};
+    for (const [name] of RESOURCE_POOLS){
+      const pool = r[name];
+      out[name] = {
+        distinctResources: hllCount(pool.hll),
+        resources: rankTopK(pool.ids).slice(0, n).map(([id, e]) => ({id, instanceType: e[2], net: e[0], overcount: e[1]})),
+        instanceTypes: rankTopK(pool.types).slice(0, n).map(([id, e]) => ({id, net: e[0], overcount: e[1]}))
       };
-    });
+    }
+    return out;
+  }
 
-    return {
-      periodStart, periodEnd,
-      totalBill, computePublicBaseline, computeActualCost, computeShareTotal,
-      observedDiscount, currentCoverage, addCoverage, targetCoverage,
-      incrementalCommitmentOD, affectedSliceTotalBill,
-      dailyX, dailyNormY, dailyVarY,
-      topSvcNames, topSvcCosts,
-      ptRows,
-      spotNet, spotShareTotal, spotShareCompute,
-      ec2BoxNet, ecsNet, fargateSpotNet,
-      spotDisc, spotScenario
-    };
+  // Cube form (cur_engine.ResourceStats.to_json) → partial form.
+  function resourcesFromJson(d){
+    const r = initResources();
+    for (const [name] of RESOURCE_POOLS){
+      if (!d[name]) continue;
+      for (const k of ["ids", "types"]){
+        const t = d[name][k];
+        r[name][k] = {floor: t.floor, items: new Map(t.keys.map((key, i) => [key, [t.counts[i], t.overcounts[i], t.info[i]]]))};
+      }
+      r[name].hll = Uint8Array.from(d[name].hll);
+    }
+    return r;
   }
 
-  // -----------------------------
-  // Rendering
-  // -----------------------------
-  function renderAll(res, fileName){
-    document.getElementById("kpiGrid").style.display = "";
-    document.getElementById("infoGrid").style.display = "";
-    document.getElementById("chartsGrid").style.display = "";
+  // The largest resources of both Spot pools, with their savings if moved to Spot entirely.
+  function spotCandidates(resources, spotDisc, n = RESOURCE_TOP_REPORTED){
+    const rows = [];
+    for (const [name] of RESOURCE_POOLS) for (const r of resources[name].resources) rows.push({pool: name, ...r, savings: r.net * spotDisc});
+    rows.sort((a,b) => (b.net - a.net) || (a.pool < b.pool ? -1 : a.pool > b.pool ? 1 : 0) || (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+    return rows.slice(0, n);
+  }
 
-    // KPIs
-    const kpis = [
-      ["Total monthly AWS bill", eur(res.totalBill, 2)],
-      ["Compute OD baseline (SP-eligible)", eur(res.computePublicBaseline, 2)],
-      ["Compute actual cost (SP-eligible)", eur(res.computeActualCost, 2)],
-      ["Compute share of total bill", pct(res.computeShareTotal, 1)],
-      ["Observed effective compute discount", pct(res.observedDiscount, 1)],
-      ["Current SP coverage (OD-basis)", pct(res.currentCoverage, 1)],
-      ["Proposed additional coverage", pct(res.addCoverage, 1)],
-      ["Target coverage (OD-basis)", pct(res.targetCoverage, 1)],
-      ["Incremental SP commitment (OD-equiv)", eur(res.incrementalCommitmentOD, 2)],
-      ["Total-bill slice affected (compute share × add)", pct(res.affectedSliceTotalBill, 1)]
-    ];
+  // Normalized billing-period key, so partials from different part files line up.
+  function periodKey(bs, be){
+    const norm = (v) => {
+      const d = v ? new Date(v) : null;
+      return (d && !isNaN(d.getTime())) ? d.toISOString() : v;
+    };
+    return [norm(bs), norm(be)];
+  }
 
-    document.getElementById("kpiGrid").innerHTML = kpis.map(([k,v]) =>
-      `<div class="card kpi"><div class="k">${k}</div><div class="v">${v}</div></div>`
-    ).join("");
+  // Accumulator: one partial per billing period; memory stays flat regardless of row count.
+  function initDashboard(opts){
+    return {opts, cls: compileRules(opts.rules, opts.computeCodes), flagMemo: new Map(), rowCount: 0, periods: new Map()};
+  }
 
-    // SP explanation
-    const ps = res.periodStart ? res.periodStart.toISOString().slice(0,10) : "n/a";
-    const pe = res.periodEnd ? res.periodEnd.toISOString().slice(0,10) : "n/a";
-    document.getElementById("spExplain").innerHTML = `
-      <b>SP sizing logic (CUR-backed):</b>
-      Compute universe = ProductCode ∈ {AmazonEC2, AmazonECS, AWSFargate, AWSLambda} and LineItemType ∈ Usage / SavingsPlanCoveredUsage / SavingsPlanNegation.
-      Underwriting baseline uses <code>pricing/publicOnDemandCost</code>.
-      Current SP coverage = OD-baseline of SavingsPlanCoveredUsage ÷ OD-baseline of total compute usage.
-      <br/><br/>
-      <b>Incremental +${Math.round(res.addCoverage*100)}% coverage:</b>
-      commitment sized as ${pct(res.addCoverage,1)} × compute OD baseline (= ${eur(res.incrementalCommitmentOD,2)}).
-      Only ${pct(res.affectedSliceTotalBill,1)} of the total bill is affected by this incremental move (compute share × additional coverage).
-      <br/><br/>
-      <span class="badge">Input: ${fileName}</span> <span class="badge">Billing period: ${ps} → ${pe}</span>
-    `;
+  function periodFor(acc, bs, be){
+    const [ks, ke] = periodKey(bs, be);
+    const key = ks + "|" + ke;
+    let p = acc.periods.get(key);
+    if (!p){
+      p = initPeriod(ks, ke, acc.cls.poolNames.length);
+      acc.periods.set(key, p);
+    }
+    return p;
+  }
 
-    // NORMALIZED daily chart — clip y-axis so outlier postings (e.g., day-1) don't dominate
-    const p95 = percentile(res.dailyNormY.concat(res.dailyVarY), 0.95);
-    const ymax = Math.max(1, p95 * 1.25);
+  // Fold one CUR line (or an aggregated cube cell of n lines) with classification flags f into
+  // period p. `day` / `hour` are the UTC usage day and hour ("" when unknown; cube cells carry
+  // no hour, their hourly series is replayed separately).
+  function foldLine(p, n, net, pub, f, svc, day, hour){
+    p.rowCount += n;
+    p.serviceSpend.set(svc, (p.serviceSpend.get(svc)||0) + net);
+    if (!foldSums(p, net, pub, f) && day){
+      p.dailyVar.set(day, (p.dailyVar.get(day)||0) + net);
+      addServiceDay(p, svc, day, net);
+      if (hour){
+        p.hourlyVar.set(hour, (p.hourlyVar.get(hour)||0) + net);
+        if (f & F_COMPUTE) p.hourlyCompute.set(hour, (p.hourlyCompute.get(hour)||0) + pub);
+      }
+    }
+  }
 
-    Plotly.newPlot("chartDaily", [
-      {x: res.dailyX, y: res.dailyNormY, type:"scatter", mode:"lines", name:"Normalized daily spend"},
-      {x: res.dailyX, y: res.dailyVarY, type:"scatter", mode:"lines", name:"Variable usage only", line:{dash:"dot"}}
-    ], {
-      title:"Normalized Daily Spend (Run-rate view)",
-      height:360, margin:{l:50,r:20,t:55,b:45},
-      template:"plotly_white",
-      yaxis:{range:[0, ymax], title:"€ / day (clipped view)"}
-    }, {displayModeBar:false});
+  // The scalar running sums of one line; returns true for fixed fees (kept out of the daily series).
+  function foldSums(p, net, pub, f){
+    p.totalBill += net;
+    if (f & F_FIXED) p.fixedMonthly += net;
 
-    document.getElementById("dailyNote").innerHTML =
-      `Chart uses a <b>clipped Y-axis</b> (p95×1.25) to keep the daily run-rate readable and avoid one-off postings dominating the view.`;
+    if (f & F_COMPUTE){
+      p.computePublicBaseline += pub;
+      p.computeActualCost += net;
+      if (f & F_SP_COVERED) p.coveredPublic += pub;
+    }
+
+    if (f & F_SPOT){
+      p.spotNet += net;
+    }
+
+    if (f & F_EC2_BOX){
+      p.ec2BoxNet += net;
+      p.ec2BoxPublic += pub;
+    }
+
+    if (f & F_ECS){
+      p.ecsNet += net;
+      p.ecsPublic += pub;
+      if (f & F_FARGATE_SPOT) p.fargateSpotNet += net;
+    }
+
+    for (let pools = f >>> POOL_SHIFT, i = 0; pools; pools >>>= 1, i++){
+      if (pools & 1){
+        p.poolNet[i] += net;
+        p.poolPublic[i] += pub;
+      }
+    }
+    return (f & F_FIXED) !== 0;
+  }
+
+  // Fold one chunk of parsed rows into the accumulator. Each row goes to its own billing
+  // period, in file order, so per-period sums are bit-identical to a single pass.
+  function consumeDashboardChunk(acc, rows){
+    let lastBs = null, lastBe = null, p = null;
+
+    for (const r of rows){
+      const bs = col.billStart(r), be = col.billEnd(r);
+      if (bs !== lastBs || be !== lastBe){
+        p = periodFor(acc, bs, be);
+        lastBs = bs; lastBe = be;
+      }
+
+      const f = rowFlags(acc, col.lineType(r), col.productCode(r), col.usageType(r));
+      let hour = "";
+      if (!(f & F_FIXED)){
+        const d = col.usageStart(r);
+        const dtObj = d ? new Date(d) : null;
+        if (dtObj && !isNaN(dtObj.getTime())) hour = dtObj.toISOString().slice(0,13);
+      }
+      const net = col.net(r);
+      foldLine(p, 1, net, col.publicOD(r), f, col.service(r), hour.slice(0,10), hour);
+      if (f & F_RESOURCE_POOLS) addResource(p.resources, f, net, col.resourceId(r), col.instanceType(r));
+    }
+
+    acc.rowCount += rows.length;
+    return acc;
+  }
+
+  // -----------------------------
+  // Columnar ingestion (PapaParse header:false): column indices are resolved once from the header
+  // row; each chunk is decoded into typed columns — costs as Float64Array, categoricals as
+  // Uint32Array dictionary codes, usage dates as hour codes through a memo — and then folded.
+  // -----------------------------
+  function dictionary(){
+    return {codes: new Map(), values: [], last: undefined, lastCode: -1};
+  }
+  // CUR rows come in runs (same period, product, line type…): comparing with the previous value
+  // is much cheaper than hashing a freshly parsed string.
+  function encode(d, v){
+    if (v === d.last) return d.lastCode;
+    let c = d.codes.get(v);
+    if (c === undefined){
+      c = d.values.length;
+      d.codes.set(v, c);
+      d.values.push(v);
+    }
+    d.last = v;
+    d.lastCode = c;
+    return c;
+  }
+
+  // num() without the regex for the common case (plain decimal string).
+  const numCell = (v) => {
+    if (v === undefined) return 0;
+    const n = v.indexOf(",") < 0 ? parseFloat(v) : parseFloat(v.replace(/,/g,""));
+    return isFinite(n) ? n : 0;
+  };
+
+  function initColumnar(acc, header){
+    const at = (name) => header.indexOf(name);   // -1 → r[-1] is undefined, like a missing key
+    return {
+      iNet: at("lineItem/NetUnblendedCost"), iUnblended: at("lineItem/UnblendedCost"),
+      iPub: at("pricing/publicOnDemandCost"), iLt: at("lineItem/LineItemType"),
+      iPc: at("lineItem/ProductCode"), iUt: at("lineItem/UsageType"), iName: at("product/ProductName"),
+      iUs: at("lineItem/UsageStartDate"), iBs: at("bill/BillingPeriodStartDate"), iBe: at("bill/BillingPeriodEndDate"),
+      iRid: at("lineItem/ResourceId"), iIt: at("product/instanceType"),
+      lt: dictionary(), pc: dictionary(), ut: dictionary(), svc: dictionary(), day: dictionary(),
+      hour: dictionary(),
+      usage: [],          // ut code → usageTypeContains pattern bits
+      flagsOf: new Map(), // (pattern bits, pc code, lt code) → classification flags
+      hourOf: new Map(),  // usage start string → hour code (-1: no usable date)
+      dayOfHour: [],      // hour code → day code
+      lastUs: undefined, lastHour: -1,
+      periods: [],        // period code → partial
+      sums: [],           // period code → per-code service / day sums, see endColumnar
+      periodOf: new Map(),
+      batch: null,
+      index: initIndex(header)
+    };
+  }
+
+  function columnBatch(n){
+    return {
+      n: 0,
+      net: new Float64Array(n), pub: new Float64Array(n),
+      lt: new Uint32Array(n), pc: new Uint32Array(n), ut: new Uint32Array(n), svc: new Uint32Array(n),
+      period: new Uint32Array(n), hour: new Int32Array(n), flags: new Uint32Array(n), group: new Int32Array(n)
+    };
+  }
+
+  function hourCode(c, d){
+    if (d === c.lastUs) return c.lastHour;
+    let k = c.hourOf.get(d);
+    if (k === undefined){
+      const dtObj = d ? new Date(d) : null;
+      k = -1;
+      if (dtObj && !isNaN(dtObj.getTime())){
+        const hour = dtObj.toISOString().slice(0,13);
+        k = encode(c.hour, hour);
+        if (k === c.dayOfHour.length) c.dayOfHour.push(encode(c.day, hour.slice(0,10)));
+      }
+      c.hourOf.set(d, k);
+    }
+    c.lastUs = d;
+    c.lastHour = k;
+    return k;
+  }
+
+  function lineFlags(acc, c, lt, pc, bits){
+    if (lt >= 65536 || pc >= 65536) return classifyLine(acc.cls, c.lt.values[lt], c.pc.values[pc], bits);
+    const key = (bits * 65536 + pc) * 65536 + lt;
+    let f = c.flagsOf.get(key);
+    if (f === undefined){
+      f = classifyLine(acc.cls, c.lt.values[lt], c.pc.values[pc], bits);
+      c.flagsOf.set(key, f);
+    }
+    return f;
+  }
+
+  // Fold one chunk of header:false rows; the first row of the first chunk is the header.
+  function consumeColumnarChunk(acc, rows){
+    let start = 0;
+    if (!acc.columnar){
+      if (!rows.length) return acc;
+      acc.columnar = initColumnar(acc, rows[0]);
+      start = 1;
+    }
+    const c = acc.columnar;
+    const n = rows.length - start;
+    if (!c.batch || c.batch.net.length < n) c.batch = columnBatch(Math.max(n, 1024));
+    const b = c.batch;
+    b.n = n;
+
+    let lastBs = null, lastBe = null, pk = 0;
+    let lastLt = -1, lastPc = -1, lastBits = -1, f = 0;
+    for (let j=0;j<n;j++){
+      const r = rows[start + j];
+      const bs = r[c.iBs] ?? "", be = r[c.iBe] ?? "";
+      if (bs !== lastBs || be !== lastBe){
+        const key = bs + "\n" + be;
+        pk = c.periodOf.get(key);
+        if (pk === undefined){
+          pk = c.periods.length;
+          c.periodOf.set(key, pk);
+          c.periods.push(periodFor(acc, bs, be));
+          c.sums.push({svc: [], svcOrder: [], day: [], dayOrder: [], slot: [], svcDay: [], hourVar: [], hourCompute: [], hourOrder: []});
+        }
+        lastBs = bs; lastBe = be;
+      }
+      b.period[j] = pk;
+      b.net[j] = numCell(r[c.iNet] ?? r[c.iUnblended]);
+      b.pub[j] = numCell(r[c.iPub]);
+      const lt = b.lt[j] = encode(c.lt, r[c.iLt] ?? "Unknown");
+      const pc = b.pc[j] = encode(c.pc, r[c.iPc] ?? "Unknown");
+      const ut = b.ut[j] = encode(c.ut, r[c.iUt] ?? "");
+      if (ut === c.usage.length) c.usage.push(usageBitsOf(acc.cls, c.ut.values[ut]));
+      const bits = c.usage[ut];
+      if (lt !== lastLt || pc !== lastPc || bits !== lastBits){
+        f = lineFlags(acc, c, lt, pc, bits);
+        lastLt = lt; lastPc = pc; lastBits = bits;
+      }
+      b.flags[j] = f;
+      // resource IDs are too many to dictionary-encode: ranked straight from the row
+      if (f & F_RESOURCE_POOLS) addResource(c.periods[pk].resources, f, b.net[j], r[c.iRid] ?? "", r[c.iIt] ?? "");
+      b.svc[j] = encode(c.svc, r[c.iName] ?? r[c.iPc] ?? "Unknown");
+      b.hour[j] = hourCode(c, r[c.iUs] ?? "");
+      b.group[j] = groupCode(c.index, r);
+    }
+
+    foldBatch(acc, b);
+    acc.rowCount += n;
+    return acc;
+  }
+
+  // Rows of a batch are folded in file order, so sums stay bit-identical to the row path.
+  // Service, day and hour sums go to code-indexed arrays instead of string-keyed Maps.
+  function foldBatch(acc, b){
+    const c = acc.columnar;
+    const P = c.periods, S = c.sums, dayOfHour = c.dayOfHour;
+    const X = c.index;
+    for (let i=0;i<b.n;i++){
+      const k = b.period[i];
+      const p = P[k], s = S[k];
+      const net = b.net[i];
+      p.rowCount++;
+
+      const sv = b.svc[i];
+      if (s.svc[sv] === undefined){ s.svc[sv] = 0; s.svcOrder.push(sv); }
+      s.svc[sv] += net;
+
+      const f = b.flags[i];
+      const h = b.hour[i];
+      indexCell(X, k, h >= 0 ? dayOfHour[h] : -1, f, sv, b.group[i], net, b.pub[i]);
+      if (!foldSums(p, net, b.pub[i], f)){
+        if (h >= 0){
+          const d = dayOfHour[h];
+          if (s.day[d] === undefined){ s.day[d] = 0; s.dayOrder.push(d); }
+          s.day[d] += net;
+          let slot = s.slot[d];
+          if (slot === undefined) slot = s.slot[d] = daySlot(p, c.day.values[d]);
+          if (slot >= 0) (s.svcDay[sv] || (s.svcDay[sv] = new Float64Array(DAY_SLOTS)))[slot] += net;
+          if (s.hourVar[h] === undefined){ s.hourVar[h] = 0; s.hourCompute[h] = 0; s.hourOrder.push(h); }
+          s.hourVar[h] += net;
+          if (f & F_COMPUTE) s.hourCompute[h] += b.pub[i];
+        }
+      }
+    }
+  }
+
+  // Move the code-indexed sums into the partials' Maps (first-seen order, like the row path)
+  // and drop the columnar state. Call once the file is fully consumed.
+  function endColumnar(acc){
+    const c = acc.columnar;
+    if (!c) return acc;
+    c.periods.forEach((p, k) => {
+      const s = c.sums[k];
+      for (const sv of s.svcOrder){
+        const name = c.svc.values[sv];
+        p.serviceSpend.set(name, (p.serviceSpend.get(name)||0) + s.svc[sv]);
+      }
+      for (const d of s.dayOrder){
+        const key = c.day.values[d];
+        p.dailyVar.set(key, (p.dailyVar.get(key)||0) + s.day[d]);
+      }
+      for (const sv of s.svcOrder){
+        const sd = s.svcDay[sv];
+        if (sd) addServiceDays(p, c.svc.values[sv], sd);
+      }
+      for (const h of s.hourOrder){
+        const key = c.hour.values[h];
+        p.hourlyVar.set(key, (p.hourlyVar.get(key)||0) + s.hourVar[h]);
+        p.hourlyCompute.set(key, (p.hourlyCompute.get(key)||0) + s.hourCompute[h]);
+      }
+    });
+    acc.index = endIndex(c.index, c.periods, c.day.values, c.svc.values);
+    delete acc.columnar;
+    return acc;
+  }
+
+  // -----------------------------
+  // Group-by index for drill-down. Besides its period partials, every scanned file yields cells
+  // of (rows, net, publicOD) per billing period × day × classification flags × service × group,
+  // a group being one combination of the drill-down dimensions: linked account, region and the
+  // user cost-allocation tags. Filtering replays the matching cells through foldLine, so every
+  // KPI, chart and scenario is answered from the index instead of a rescan (the hourly series,
+  // which would multiply the cells by 24, and the Spot candidates stay unfiltered).
+  // Groups are a cross product, so both they and the cells are capped: past INDEX_MAX_GROUPS a
+  // file's new combinations share one group that is INDEX_OTHER in every dimension, and an index
+  // past INDEX_MAX_CELLS (per file or merged) is dropped, turning drill-down off for the upload.
+  // -----------------------------
+  const INDEX_COLUMNS = [["Account", "lineItem/UsageAccountId"], ["Region", "product/region"]];
+  const INDEX_TAG_PREFIX = "resourceTags/user:";
+  const INDEX_MAX_TAGS = 8;          // first tag columns in header order
+  const INDEX_MAX_VALUES = 1000;     // per dimension; values beyond share INDEX_OTHER
+  const INDEX_MAX_GROUPS = 1 << 16;  // per file; also the stride of the period × group cell key
+  const INDEX_MAX_CELLS = 1 << 20;   // about 50 MB of cell columns
+  const INDEX_OTHER = "(other)";
+
+  const indexColumns = () => ({period: [], day: [], flags: [], service: [], group: [], rows: [], net: [], pub: []});
+
+  function initIndex(header){
+    const dims = INDEX_COLUMNS.map(([name, column]) => ({name, column}));
+    for (const h of header){
+      if (h.startsWith(INDEX_TAG_PREFIX)) dims.push({name: `Tag ${h.slice(INDEX_TAG_PREFIX.length)}`, column: h});
+    }
+    const used = dims.slice(0, INDEX_COLUMNS.length + INDEX_MAX_TAGS)
+      .map(d => ({...d, at: header.indexOf(d.column), dict: dictionary()})).filter(d => d.at >= 0);
+    return {
+      dims: used,
+      groups: dictionary(), groupCodes: [],   // group key → code; code → dimension value codes
+      lastRow: null, lastGroup: -1,
+      otherGroups: false,                     // INDEX_MAX_GROUPS reached
+      truncated: false,                       // INDEX_MAX_CELLS reached: cells dropped
+      flags: dictionary(),                    // classification flags → small code for the cell key
+      cellOf: new Map(),                      // period × group → (flags, day, service) → cell
+      cells: indexColumns()
+    };
+  }
+
+  // Stand-in for an index past INDEX_MAX_CELLS: no dimensions, so there is nothing to drill into.
+  function truncatedIndex(){
+    const none = () => new Uint32Array(0), noValues = () => new Float64Array(0);
+    return {dims: [], groups: [], periods: [], days: [], services: [], otherGroups: false, truncated: true,
+            cells: {period: none(), day: new Int32Array(0), flags: none(), service: none(), group: none(),
+                    rows: noValues(), net: noValues(), pub: noValues()}};
+  }
+
+  function groupCode(X, r){
+    const dims = X.dims;
+    if (X.lastRow){
+      let k = 0;
+      while (k < dims.length && r[dims[k].at] === X.lastRow[k]) k++;
+      if (k === dims.length) return X.lastGroup;
+    }
+    const row = dims.map(d => r[d.at]);
+    let codes = dims.map((d, k) => {
+      const v = row[k] ?? "";
+      return d.dict.codes.has(v) || d.dict.values.length < INDEX_MAX_VALUES ? encode(d.dict, v) : encode(d.dict, INDEX_OTHER);
+    });
+    let key = codes.join(",");
+    if (X.groups.values.length >= INDEX_MAX_GROUPS - 1 && !X.groups.codes.has(key)){
+      codes = dims.map(d => encode(d.dict, INDEX_OTHER));
+      key = codes.join(",");
+      X.otherGroups = true;
+    }
+    const g = encode(X.groups, key);
+    if (g === X.groupCodes.length) X.groupCodes.push(codes);
+    X.lastRow = row;
+    X.lastGroup = g;
+    return g;
+  }
+
+  function indexCell(X, period, day, f, svc, group, net, pub){
+    if (X.truncated) return;
+    const outer = period * INDEX_MAX_GROUPS + group;   // groupCode keeps group < INDEX_MAX_GROUPS
+    let inner = X.cellOf.get(outer);
+    if (!inner) X.cellOf.set(outer, inner = new Map());
+    const fc = encode(X.flags, f);
+    // numeric key while the codes fit (they nearly always do), a string otherwise
+    const key = (fc < 4096 && day < 2047 && svc < 65536) ? (fc * 2048 + day + 1) * 65536 + svc : `${fc},${day},${svc}`;
+    const c = X.cells;
+    let i = inner.get(key);
+    if (i === undefined){
+      if (c.net.length >= INDEX_MAX_CELLS){
+        // a partial index would answer filters from part of the file: drop it whole
+        X.truncated = true;
+        X.cellOf = new Map();
+        X.cells = indexColumns();
+        return;
+      }
+      i = c.net.length;
+      inner.set(key, i);
+      c.period.push(period); c.day.push(day); c.flags.push(f); c.service.push(svc); c.group.push(group);
+      c.rows.push(0); c.net.push(0); c.pub.push(0);
+    }
+    c.rows[i]++;
+    c.net[i] += net;
+    c.pub[i] += pub;
+  }
+
+  // The posted form: dictionaries + typed cell columns (day -1: no usable usage date).
+  function endIndex(X, periods, days, services){
+    if (X.truncated) return truncatedIndex();
+    const c = X.cells;
+    return {
+      dims: X.dims.map(d => ({name: d.name, column: d.column, values: d.dict.values})),
+      groups: X.groupCodes, otherGroups: X.otherGroups, truncated: false,
+      periods: periods.map(p => [p.billStart, p.billEnd]),
+      days, services,
+      cells: {period: Uint32Array.from(c.period), day: Int32Array.from(c.day), flags: Uint32Array.from(c.flags),
+              service: Uint32Array.from(c.service), group: Uint32Array.from(c.group),
+              rows: Float64Array.from(c.rows), net: Float64Array.from(c.net), pub: Float64Array.from(c.pub)}
+    };
+  }
+
+  // One index over several files' indexes: dictionaries are unioned and the cells re-coded and
+  // concatenated (files without a dimension's column carry "" for it). Truncated when any part is
+  // or when the cells together exceed INDEX_MAX_CELLS.
+  function mergeIndexes(parts){
+    parts = parts.filter(Boolean);   // files without rows have no index
+    if (parts.some(x => x.truncated) || parts.reduce((t, x) => t + x.cells.net.length, 0) > INDEX_MAX_CELLS){
+      return truncatedIndex();
+    }
+    const dims = [], dimOf = new Map(), groups = dictionary(), groupCodes = [];
+    const days = dictionary(), services = dictionary(), periods = dictionary();
+    for (const x of parts) for (const d of x.dims){
+      if (!dimOf.has(d.column)){
+        dimOf.set(d.column, dims.length);
+        dims.push({name: d.name, column: d.column, dict: dictionary()});
+      }
+    }
+    const n = parts.reduce((t, x) => t + x.cells.net.length, 0);
+    const out = {period: new Uint32Array(n), day: new Int32Array(n), flags: new Uint32Array(n), service: new Uint32Array(n),
+                 group: new Uint32Array(n), rows: new Float64Array(n), net: new Float64Array(n), pub: new Float64Array(n)};
+    let o = 0;
+    for (const x of parts){
+      const dimMap = x.dims.map(d => dimOf.get(d.column));
+      const valueMaps = x.dims.map((d, k) => d.values.map(v => encode(dims[dimMap[k]].dict, v)));
+      const groupMap = x.groups.map((codes) => {
+        const full = dims.map(() => -1);
+        codes.forEach((v, k) => { full[dimMap[k]] = valueMaps[k][v]; });
+        full.forEach((v, j) => { if (v < 0) full[j] = encode(dims[j].dict, ""); });
+        const g = encode(groups, full.join(","));
+        if (g === groupCodes.length) groupCodes.push(full);
+        return g;
+      });
+      const dayMap = x.days.map(v => encode(days, v));
+      const svcMap = x.services.map(v => encode(services, v));
+      const periodMap = x.periods.map(([bs, be]) => encode(periods, bs + "\n" + be));
+      const c = x.cells;
+      for (let i=0;i<c.net.length;i++, o++){
+        out.period[o] = periodMap[c.period[i]];
+        out.day[o] = c.day[i] < 0 ? -1 : dayMap[c.day[i]];
+        out.flags[o] = c.flags[i];
+        out.service[o] = svcMap[c.service[i]];
+        out.group[o] = groupMap[c.group[i]];
+        out.rows[o] = c.rows[i];
+        out.net[o] = c.net[i];
+        out.pub[o] = c.pub[i];
+      }
+    }
+    return {
+      dims: dims.map(d => ({name: d.name, column: d.column, values: d.dict.values})),
+      groups: groupCodes, otherGroups: parts.some(x => x.otherGroups), truncated: false,
+      periods: periods.values.map(k => k.split("\n")),
+      days: days.values, services: services.values,
+      cells: out
+    };
+  }
+
+  // Groups passing a filter (one Set of allowed value codes per dimension; empty = any).
+  function indexGroupMask(index, filter){
+    const keep = new Uint8Array(index.groups.length);
+    index.groups.forEach((codes, g) => {
+      keep[g] = codes.every((v, k) => !filter[k] || !filter[k].size || filter[k].has(v)) ? 1 : 0;
+    });
+    return keep;
+  }
+
+  // Replay the cells of the groups in `keep` (all when null) into a dashboard accumulator.
+  function consumeIndex(acc, index, keep){
+    const c = index.cells;
+    const periods = index.periods.map(([bs, be]) => periodFor(acc, bs, be));
+    for (let i=0;i<c.net.length;i++){
+      if (keep && !keep[c.group[i]]) continue;
+      foldLine(periods[c.period[i]], c.rows[i], c.net[i], c.pub[i], c.flags[i],
+               index.services[c.service[i]], c.day[i] < 0 ? "" : index.days[c.day[i]], "");
+      acc.rowCount += c.rows[i];
+    }
+    return acc;
+  }
+
+  // Net cost per value of every dimension, over the whole index.
+  function indexValueTotals(index){
+    const byGroup = new Float64Array(index.groups.length);
+    const c = index.cells;
+    for (let i=0;i<c.net.length;i++) byGroup[c.group[i]] += c.net[i];
+    const totals = index.dims.map(d => new Float64Array(d.values.length));
+    index.groups.forEach((codes, g) => codes.forEach((v, k) => { totals[k][v] += byGroup[g]; }));
+    return totals;
+  }
+
+  // Replay a precomputed cube (see CubeAccumulator in cur_engine.py): every cell is folded
+  // like a line carrying its summed costs, so all KPIs, charts and scenarios follow unchanged.
+  // acc must be set up with the cube's rules (its usage column holds bits over their patterns).
+  function consumeCube(acc, cube){
+    const {dims, cells: c} = cube;
+    if (acc.cls.patterns.join("\n") !== cube.usagePatterns.join("\n")){
+      throw new Error("cube was built with different UsageType patterns than the current rules");
+    }
+    const periods = cube.periods.map(([bs, be]) => periodFor(acc, bs, be));
+    const flagsOf = new Map();
+    for (let i=0;i<c.net.length;i++){
+      const key = `${c.lineType[i]},${c.productCode[i]},${c.usage[i]}`;
+      let f = flagsOf.get(key);
+      if (f === undefined){
+        f = classifyLine(acc.cls, dims.lineType[c.lineType[i]], dims.productCode[c.productCode[i]], c.usage[i]);
+        flagsOf.set(key, f);
+      }
+      foldLine(periods[c.period[i]], c.rows[i], c.net[i], c.publicOD[i], f,
+               dims.service[c.service[i]], dims.day[c.day[i]], "");
+      acc.rowCount += c.rows[i];
+    }
+    const h = cube.hourly || {hour: []};   // absent in version 2 cubes
+    for (let i=0;i<h.hour.length;i++){
+      const p = periods[h.period[i]];
+      p.hourlyVar.set(h.hour[i], (p.hourlyVar.get(h.hour[i])||0) + h.net[i]);
+      p.hourlyCompute.set(h.hour[i], (p.hourlyCompute.get(h.hour[i])||0) + h.computePublicOD[i]);
+    }
+    (cube.resources || []).forEach((r, i) => mergeResources(periods[i].resources, resourcesFromJson(r)));   // absent before version 4
+    return acc;
+  }
+
+  // Combine another file's partials into acc, billing period by billing period.
+  function mergeDashboardPartials(acc, other){
+    for (const [key, q] of other.periods){
+      const p = acc.periods.get(key);
+      if (p) mergePeriod(p, q);
+      else acc.periods.set(key, mergePeriod(initPeriod(q.billStart, q.billEnd), q));
+    }
+    acc.rowCount += other.rowCount;
+    return acc;
+  }
+
+  // Daily series of one period: fixed fees spread evenly over the billing period's days.
+  function periodSeries(p){
+    const bs = p.billStart;
+    const be = p.billEnd;
+    const periodStart = bs ? new Date(bs) : null;
+    const periodEnd = be ? new Date(be) : null;
+    const dates = periodDays(p) || Array.from(p.dailyVar.keys()).sort();
+    const fixedPerDay = p.fixedMonthly / Math.max(1, dates.length);
+
+    const dailyVarY = [];
+    const dailyNormY = [];
+    for (const key of dates){
+      const v = p.dailyVar.get(key)||0;
+      dailyVarY.push(v);
+      dailyNormY.push(v + fixedPerDay);
+    }
+    return {periodStart, periodEnd, dailyX: dates, dailyVarY, dailyNormY, ...hourlySeries(p, periodStart, periodEnd)};
+  }
+
+  // Hourly series of one period, on every hour of the billing period (for SP sizing an idle
+  // hour is a zero, not a gap).
+  function hourlySeries(p, periodStart, periodEnd){
+    let hours = [];
+    if (periodStart && periodEnd && !isNaN(periodStart.getTime()) && !isNaN(periodEnd.getTime())){
+      const n = Math.max(1, Math.round((periodEnd - periodStart)/(3600*1000)));
+      for (let i=0;i<n;i++) hours.push(new Date(periodStart.getTime() + i*3600*1000).toISOString().slice(0,13));
+    } else {
+      hours = Array.from(new Set([...p.hourlyVar.keys(), ...p.hourlyCompute.keys()])).sort();
+    }
+    return {
+      hourlyX: hours,
+      hourlyVarY: hours.map(h => p.hourlyVar.get(h)||0),
+      hourlyComputeY: hours.map(h => p.hourlyCompute.get(h)||0)
+    };
+  }
+
+  const TOP_SERVICES = 10;   // services charted (the export lists all of them)
+
+  // Scan metrics of one (period or combined) aggregate: everything that needs the CUR rows.
+  // parts: the periods p covers (p itself, or every period for the combined figures).
+  function scanMetrics(p, series, poolNames, parts){
+    const {totalBill, computePublicBaseline, computeActualCost, coveredPublic,
+           spotNet, ec2BoxNet, ec2BoxPublic, ecsNet, ecsPublic, fargateSpotNet} = p;
+
+    const computeShareTotal = totalBill > 0 ? (computeActualCost / totalBill) : 0;
+    const observedDiscount = computePublicBaseline > 0 ? (1 - (computeActualCost / computePublicBaseline)) : 0;
+    const currentCoverage = computePublicBaseline > 0 ? (coveredPublic / computePublicBaseline) : 0;
+
+    // services by net cost; the top ones are charted
+    const services = Array.from(p.serviceSpend.entries()).sort((a,b)=>b[1]-a[1]);
+    const topServices = services.slice(0, TOP_SERVICES);
+
+    return {
+      ...series,
+      totalBill, computePublicBaseline, computeActualCost, computeShareTotal,
+      observedDiscount, currentCoverage,
+      topSvcNames: topServices.map(x=>x[0]),
+      topSvcCosts: topServices.map(x=>x[1]),
+      svcNames: services.map(x=>x[0]),
+      svcCosts: services.map(x=>x[1]),
+      spotNet,
+      spotShareTotal: totalBill>0 ? spotNet/totalBill : 0,
+      spotShareCompute: computeActualCost>0 ? spotNet/computeActualCost : 0,
+      ec2BoxNet, ecsNet, fargateSpotNet,
+      candidateEC2Box: (ec2BoxPublic>0 ? ec2BoxPublic : ec2BoxNet),
+      candidateECS: (ecsPublic>0 ? ecsPublic : ecsNet),
+      pools: poolNames.map((name, i) => ({name, net: p.poolNet[i], publicOD: p.poolPublic[i]})),
+      resources: resourceMetrics(p.resources),
+      spikes: spikeMetrics(parts, series.dailyX, series.dailyVarY),
+      dailyP95: seriesQuantile([series.dailyNormY, series.dailyVarY], 0.95),
+      hourlyP95: seriesQuantile([series.hourlyVarY, series.hourlyComputeY], 0.95)
+    };
+  }
+
+  // -----------------------------
+  // Spend spikes (cur_engine.spike_metrics). A day is a spike when its variable spend is more
+  // than SPIKE_Z robust z-scores (median / MAD) above the typical day; its contributors are the
+  // services furthest above their own typical day. A service's day totals come from the fixed
+  // day slots of the period holding the day, and its typical day from a KLL quantile sketch fed
+  // one service at a time, so a baseline costs the same memory for years of days as for a month.
+  // Compaction alternates which half of a level is promoted instead of flipping a coin, so
+  // sketches are reproducible across engines.
+  // -----------------------------
+  const SKETCH_K = 128;
+  const SPIKE_Z = 3.5;
+  const SPIKE_MIN_EXCESS = 0.05;     // and at least 5% above the typical day
+  const SPIKE_MAX_DAYS = 20;
+  const SPIKE_CONTRIBUTORS = 5;
+
+  function initSketch(k = SKETCH_K){
+    const sk = {k, n: 0, size: 0, cap: 0, levels: [[]], parity: [0]};
+    sk.cap = sketchCapacity(sk);
+    return sk;
+  }
+
+  // Total capacity; level h holds ⌈(2/3)^depth · k⌉ items (at least 2), depth counted from the top.
+  function sketchCapacity(sk, h){
+    let total = 0, c = sk.k;
+    for (let i=sk.levels.length-1;i>=0;i--){
+      if (i === h) return c;
+      total += c;
+      c = Math.max(2, Math.floor((2 * c + 2) / 3));
+    }
+    return total;
+  }
+
+  function sketchAdd(sk, x){
+    sk.levels[0].push(x);
+    sk.n++;
+    if (++sk.size <= sk.cap) return;
+    // compact the lowest full level: sort it and promote every other item at twice the weight
+    const L = sk.levels;
+    for (let h=0;h<L.length;h++){
+      if (L[h].length < sketchCapacity(sk, h)) continue;
+      if (h === L.length - 1){
+        L.push([]);
+        sk.parity.push(0);
+        sk.cap = sketchCapacity(sk);
+      }
+      const lv = L[h].sort((a,b)=>a-b);
+      const m = lv.length - (lv.length & 1);   // an odd item out stays on its level
+      for (let i=sk.parity[h];i<m;i+=2) L[h+1].push(lv[i]);
+      sk.parity[h] ^= 1;
+      L[h] = lv.slice(m);
+      sk.size -= m / 2;
+      return;
+    }
+  }
+
+  // Retained items as [value, weight], ascending; the weights sum to sk.n.
+  function sketchItems(sk){
+    const out = [];
+    sk.levels.forEach((lv, h) => { for (const v of lv) out.push([v, 2 ** h]); });
+    return out.sort((a,b)=>a[0]-b[0]);
+  }
+
+  // Smallest retained value whose cumulative weight reaches q·n (0 for an empty sketch).
+  function weightedQuantile(items, n, q){
+    let cum = 0;
+    for (const [v, w] of items){
+      cum += w;
+      if (cum >= q * n) return v;
+    }
+    return items.length ? items[items.length - 1][0] : 0;
+  }
+
+  // Smallest value with at least q·n of the values at or below it (0 for no values).
+  function quantile(values, q){
+    const xs = Array.from(values).sort((a,b)=>a-b);
+    return xs.length ? xs[Math.max(0, Math.ceil(q * xs.length) - 1)] : 0;
+  }
+
+  function seriesQuantile(arrays, q){
+    return quantile(arrays.flat(), q);
+  }
+
+  // Median and robust scale: 1.4826·MAD, or 1.2533·mean absolute deviation where more than half
+  // of the values equal the median (MAD = 0).
+  function robustScale(values){
+    const xs = Array.from(values).sort((a,b)=>a-b);
+    const median = quantile(xs, 0.5);
+    const dev = xs.map(v => Math.abs(v - median));
+    let sum = 0;
+    for (const d of dev) sum += d;
+    const mad = quantile(dev, 0.5);
+    return {median, mad, scale: mad > 0 ? 1.4826 * mad : (xs.length ? 1.2533 * sum / xs.length : 0)};
+  }
+
+  function spikeMetrics(parts, days, values){
+    const {median, mad, scale} = robustScale(values);
+    const threshold = median + SPIKE_Z * scale;
+    const flagged = [];
+    values.forEach((v, i) => {
+      const excess = v - median;
+      if (scale > 0 && excess / scale > SPIKE_Z && excess >= SPIKE_MIN_EXCESS * Math.abs(median)){
+        flagged.push({day: days[i], value: v, baseline: median, excess, z: excess / scale, contributors: []});
+      }
+    });
+    flagged.sort((a,b) => (b.excess - a.excess) || (a.day < b.day ? -1 : a.day > b.day ? 1 : 0));
+    const out = flagged.slice(0, SPIKE_MAX_DAYS);
+    if (out.length){
+      // each day → [its period's service day slots, slot]; null for a day no period holds
+      const where = new Map(days.map(d => {
+        for (const p of parts){
+          const slot = daySlot(p, d);
+          if (slot >= 0) return [d, [p.serviceDays, slot]];
+        }
+        return [d, null];
+      }));
+      const spend = (svc, d) => {
+        const w = where.get(d);
+        const byDay = w && w[0].get(svc);
+        return byDay ? byDay[w[1]] : 0;
+      };
+      // each service's typical day over the same days (a day without spend counts as 0)
+      const services = Array.from(new Set(parts.flatMap(p => Array.from(p.serviceDays.keys())))).sort();
+      const baselines = services.map(svc => {
+        const sk = initSketch();
+        for (const d of days) sketchAdd(sk, spend(svc, d));
+        return [svc, weightedQuantile(sketchItems(sk), sk.n, 0.5)];
+      });
+      for (const s of out){
+        s.contributors = baselines
+          .map(([service, baseline]) => {
+            const net = spend(service, s.day);
+            return {service, net, baseline, excess: net - baseline};
+          })
+          .filter(c => c.excess > 0)
+          .sort((a,b) => (b.excess - a.excess) || (a.service < b.service ? -1 : a.service > b.service ? 1 : 0))
+          .slice(0, SPIKE_CONTRIBUTORS);
+      }
+    }
+    return {median, mad, threshold, days: out};
+  }
+
+  // KPIs + scenario tables from scan metrics: a few multiplications, no CUR access, so
+  // parameter edits can be re-evaluated on every keystroke.
+  // periods: billing periods m's hourly series spans (the optimizer's savings are per period).
+  function evaluateScenarios(m, opts, periods = 1){
+    const {totalBill, computePublicBaseline, computeShareTotal, observedDiscount, currentCoverage} = m;
+
+    const addCoverage = Math.max(0, Math.min(1, opts.addCoverage));
+    const targetCoverage = Math.min(1, currentCoverage + addCoverage);
+    const incrementalCommitmentOD = computePublicBaseline * addCoverage;
+    const affectedSliceTotalBill = computeShareTotal * addCoverage;
+
+    // pass-through table
+    const ptRows = opts.passThrough.map(pt=>{
+      const discToCustomer = observedDiscount * pt;
+      const overallReduction = affectedSliceTotalBill * discToCustomer;
+      const monthlySavings = totalBill * overallReduction;
+      const annualSavings = monthlySavings * 12;
+      return {pt, discToCustomer, overallReduction, monthlySavings, annualSavings};
+    });
+
+    // spot scenario
+    const spotDisc = Math.max(0, Math.min(0.95, opts.spotDiscount));
+    const adopt = [0.10,0.15,0.20,0.30];
+    const spotScenario = adopt.map(a=>{
+      const savEC2 = m.candidateEC2Box * a * spotDisc;
+      const savECS = m.candidateECS * a * spotDisc;
+      return {
+        a,
+        savEC2,
+        overallEC2: totalBill>0 ? savEC2/totalBill : 0,
+        savECS,
+        overallECS: totalBill>0 ? savECS/totalBill : 0
+      };
+    });
+
+    return {
+      periodStart: m.periodStart, periodEnd: m.periodEnd,
+      totalBill, computePublicBaseline, computeActualCost: m.computeActualCost, computeShareTotal,
+      observedDiscount, currentCoverage, addCoverage, targetCoverage,
+      incrementalCommitmentOD, affectedSliceTotalBill,
+      dailyX: m.dailyX, dailyNormY: m.dailyNormY, dailyVarY: m.dailyVarY,
+      hourlyX: m.hourlyX, hourlyVarY: m.hourlyVarY, hourlyComputeY: m.hourlyComputeY,
+      topSvcNames: m.topSvcNames, topSvcCosts: m.topSvcCosts,
+      svcNames: m.svcNames, svcCosts: m.svcCosts,
+      ptRows,
+      spotNet: m.spotNet, spotShareTotal: m.spotShareTotal, spotShareCompute: m.spotShareCompute,
+      ec2BoxNet: m.ec2BoxNet, ecsNet: m.ecsNet, fargateSpotNet: m.fargateSpotNet,
+      spotDisc, spotScenario,
+      pools: m.pools,
+      resources: m.resources, spotCandidates: spotCandidates(m.resources, spotDisc),
+      spikes: m.spikes, dailyP95: m.dailyP95, hourlyP95: m.hourlyP95,
+      commitment: commitmentOf(m, opts.spDiscount ?? observedDiscount, periods)
+    };
+  }
+
+  // Hourly Savings Plan commitment optimizer (cur_engine.optimize_commitment). Committing k
+  // (On-Demand-equivalent € per hour) costs (1 - d)·k every hour and covers min(h, k) of an hour
+  // with usage h; net savings Σ min(h, k) - (1 - d)·k·n are concave in k and peak at the level the
+  // load-duration curve exceeds in a (1 - d) share of the hours. One sort, then prefix sums give
+  // any point of the curve by bisection.
+  const COMMITMENT_CURVE_POINTS = 101;
+
+  // The sorted hourly load and its prefix sums (prefix[i] = sum of the i smallest hours).
+  function commitmentLoad(hourlyOD){
+    const a = Float64Array.from(hourlyOD).sort();
+    const prefix = new Float64Array(a.length + 1);
+    for (let i=0;i<a.length;i++) prefix[i+1] = prefix[i] + a[i];
+    return {a, prefix};
+  }
+
+  function optimizeCommitment(hourlyOD, spDiscount, periods = 1, points = COMMITMENT_CURVE_POINTS,
+                              load = commitmentLoad(hourlyOD)){
+    const d = Math.max(0, Math.min(1, spDiscount));
+    const {a, prefix} = load;
+    const n = a.length;
+    const total = prefix[n];
+    const per = 1 / Math.max(periods, 1);
+
+    const at = (k) => {
+      let lo = 0, hi = n;   // first index with a[i] > k
+      while (lo < hi){
+        const mid = (lo + hi) >>> 1;
+        if (a[mid] <= k) lo = mid + 1; else hi = mid;
+      }
+      const covered = prefix[lo] + k * (n - lo);
+      return {commitmentOD: k, commitment: (1 - d) * k, savings: (covered - (1 - d) * k * n) * per,
+              utilization: k > 0 ? covered / (k * n) : 0,
+              coverage: total > 0 ? covered / total : 0};
+    };
+
+    const optimum = at(n && d > 0 ? a[Math.ceil(d * n) - 1] : 0);
+    const peak = n ? a[n - 1] : 0;
+    const curve = Array.from({length: points}, (_, i) => at(peak * i / (points - 1)));
+    const col = (k) => curve.map(c => c[k]);
+    return {
+      spDiscount: d, hours: n, optimum,
+      curve: {commitmentOD: col("commitmentOD"), savings: col("savings"), utilization: col("utilization"), coverage: col("coverage")},
+      // level exceeded in each share of the hours (descending load-duration curve)
+      loadDuration: {share: Array.from({length: points}, (_, i) => i / (points - 1)),
+                     level: Array.from({length: points}, (_, i) => n ? a[n - 1 - Math.floor(i * (n - 1) / (points - 1))] : 0)}
+    };
+  }
+
+  // A scan summary's metrics keep their sorted load and last optimum here (a WeakMap, so the
+  // summary's own fields, and its JSON, stay as cur_engine's): scenario edits then re-sort
+  // nothing, and only an edited SP discount reruns the optimizer.
+  const commitments = new WeakMap();   // metrics → {load, spDiscount, periods, result}
+
+  function commitmentOf(m, spDiscount, periods = 1){
+    let c = commitments.get(m);
+    if (!c) commitments.set(m, c = {load: commitmentLoad(m.hourlyComputeY), result: null});
+    if (!c.result || c.spDiscount !== spDiscount || c.periods !== periods){
+      c.result = optimizeCommitment(m.hourlyComputeY, spDiscount, periods, COMMITMENT_CURVE_POINTS, c.load);
+      c.spDiscount = spDiscount;
+      c.periods = periods;
+    }
+    return c.result;
+  }
+
+  const byPeriod = (a,b) =>
+    ((a.billStart === "") - (b.billStart === "")) ||
+    (a.billStart < b.billStart ? -1 : a.billStart > b.billStart ? 1 : 0) ||
+    (a.billEnd < b.billEnd ? -1 : a.billEnd > b.billEnd ? 1 : 0);
+
+  // The scan summary: per-period metrics plus the cross-period view, independent of the
+  // scenario parameters. With several billing periods the combined figures are monthly
+  // averages (ratios are unaffected) and the daily series spans all of them.
+  function summarizeDashboard(acc){
+    const names = acc.cls.poolNames;
+    const ps = Array.from(acc.periods.values()).sort(byPeriod);
+    if (!ps.length) ps.push(initPeriod("", "", names.length));
+    const per = ps.map(p => scanMetrics(p, periodSeries(p), names, [p]));
+    if (per.length === 1) return {combined: per[0], periods: per};
+
+    const combined = initPeriod("", "", names.length);
+    for (const p of ps) mergePeriod(combined, p);
+    const scale = 1 / ps.length;
+    for (const k of PERIOD_SUMS) combined[k] *= scale;
+    for (const [k,v] of combined.serviceSpend) combined.serviceSpend.set(k, v * scale);
+    for (const [name] of RESOURCE_POOLS){
+      scaleTopK(combined.resources[name].ids, scale);
+      scaleTopK(combined.resources[name].types, scale);
+    }
+    combined.poolNet = combined.poolNet.map(v => v * scale);
+    combined.poolPublic = combined.poolPublic.map(v => v * scale);
+    combined.serviceDays = new Map();   // day slots are per period: the spikes read each period's own
+
+    const byDate = new Map();
+    for (const r of per){
+      r.dailyX.forEach((d,i) => {
+        const slot = byDate.get(d) || [0,0];
+        slot[0] += r.dailyVarY[i];
+        slot[1] += r.dailyNormY[i];
+        byDate.set(d, slot);
+      });
+    }
+    const dailyX = Array.from(byDate.keys()).sort();
+    const byHour = new Map();
+    for (const r of per){
+      r.hourlyX.forEach((h,i) => {
+        const slot = byHour.get(h) || [0,0];
+        slot[0] += r.hourlyVarY[i];
+        slot[1] += r.hourlyComputeY[i];
+        byHour.set(h, slot);
+      });
+    }
+    const hourlyX = Array.from(byHour.keys()).sort();
+    const starts = per.map(r=>r.periodStart).filter(d=>d && !isNaN(d.getTime()));
+    const ends = per.map(r=>r.periodEnd).filter(d=>d && !isNaN(d.getTime()));
+    return {
+      combined: scanMetrics(combined, {
+        periodStart: starts.length ? new Date(Math.min(...starts.map(d=>d.getTime()))) : null,
+        periodEnd: ends.length ? new Date(Math.max(...ends.map(d=>d.getTime()))) : null,
+        dailyX,
+        dailyVarY: dailyX.map(d=>byDate.get(d)[0]),
+        dailyNormY: dailyX.map(d=>byDate.get(d)[1]),
+        hourlyX,
+        hourlyVarY: hourlyX.map(h=>byHour.get(h)[0]),
+        hourlyComputeY: hourlyX.map(h=>byHour.get(h)[1])
+      }, names, ps),
+      periods: per
+    };
+  }
+
+  // Scenario parameters applied to a scan summary → the dashboard result (+ per-period results).
+  function evaluateDashboard(summary, opts){
+    return {...evaluateScenarios(summary.combined, opts, summary.periods.length),
+            periods: summary.periods.map(m => evaluateScenarios(m, opts))};
+  }
+
+  // -----------------------------
+  // Scenario sweep (cur_engine.sweep_scenarios): every addCoverage × passThrough × spotDiscount ×
+  // spotAdoption scenario from one scan summary's metrics. SP savings depend on (coverage,
+  // pass-through) only and Spot savings on (discount, adoption) only, so the 4-D total is the
+  // outer sum of three 2-D surfaces; cells use evaluateScenarios' arithmetic.
+  // -----------------------------
+  const SWEEP_COVERAGE = Array.from({length: 101}, (_, i) => i / 100);
+  const SWEEP_SPOT_DISCOUNT = Array.from({length: 20}, (_, i) => i / 20);
+  const SWEEP_SPOT_ADOPTION = Array.from({length: 21}, (_, i) => i / 20);
+  const SWEEP_CSV_COLUMNS = ["addCoverage", "passThrough", "spotDiscount", "spotAdoption", "spMonthlySavings",
+                             "spotEC2MonthlySavings", "spotECSMonthlySavings", "monthlySavings", "annualSavings",
+                             "overallReduction"];
+
+  // Flat typed arrays in row-major order over the axes: sp[c*P + p], spotEC2 / spotECS[d*A + a],
+  // total[((c*P + p)*D + d)*A + a].
+  function sweepScenarios(m, passThrough){
+    const cov = SWEEP_COVERAGE, pt = passThrough, sd = SWEEP_SPOT_DISCOUNT, sa = SWEEP_SPOT_ADOPTION;
+    const C = cov.length, P = pt.length, D = sd.length, A = sa.length;
+    const {totalBill, computeShareTotal: share, observedDiscount: disc, candidateEC2Box: ec2, candidateECS: ecs} = m;
+    const sp = new Float64Array(C * P);
+    for (let c=0;c<C;c++) for (let p=0;p<P;p++) sp[c*P + p] = totalBill * ((share * cov[c]) * (disc * pt[p]));
+    const spotEC2 = new Float64Array(D * A), spotECS = new Float64Array(D * A);
+    for (let d=0;d<D;d++) for (let a=0;a<A;a++){
+      spotEC2[d*A + a] = (ec2 * sa[a]) * sd[d];
+      spotECS[d*A + a] = (ecs * sa[a]) * sd[d];
+    }
+    const DA = D * A;
+    const total = new Float64Array(C * P * DA);
+    for (let cp=0, o=0; cp<C*P; cp++){
+      const s = sp[cp];
+      for (let k=0;k<DA;k++, o++) total[o] = (s + spotEC2[k]) + spotECS[k];
+    }
+    return {axes: {addCoverage: cov, passThrough: pt.slice(), spotDiscount: sd, spotAdoption: sa},
+            totalBill, sp, spotEC2, spotECS, total};
+  }
+
+  function finalizeDashboard(acc){
+    return evaluateDashboard(summarizeDashboard(acc), acc.opts);
+  }
+
+  // Single-pass convenience wrapper over an in-memory row array.
+  function computeDashboard(rows, opts){
+    return finalizeDashboard(consumeDashboardChunk(initDashboard(opts), rows));
+  }
+
+  // -----------------------------
+  // Compressed inputs (.csv.gz, .zip): File.stream() → DecompressionStream → TextDecoderStream →
+  // incremental CSV parser → consumeColumnarChunk. Inflating, decoding, parsing and folding overlap
+  // through the stream's backpressure, and only about one text batch (CSV_BATCH_CHARS) is held.
+  // -----------------------------
+  const CSV_BATCH_CHARS = 1 << 22;
+
+  // Parse the complete CSV rows at the start of buf into `rows` (arrays of strings, like PapaParse
+  // with header:false; empty lines skipped; rows end at \n or \r\n). Returns the index where the
+  // unfinished last row starts (buf.length when everything was consumed); with final=true the
+  // remainder is taken as a complete row. Rows without a quote — nearly all CUR rows — are split
+  // natively; only rows with quoted fields go through parseQuotedRow.
+  function parseCsvRows(buf, rows, final){
+    const n = buf.length;
+    let i = 0, q = -1;
+    while (i < n){
+      let nl = buf.indexOf("\n", i);
+      if (nl < 0){
+        if (!final) return i;
+        nl = n;
+      }
+      if (q < i){
+        q = buf.indexOf('"', i);
+        if (q < 0) q = n;
+      }
+      if (q >= nl){
+        const end = nl > i && buf.charCodeAt(nl - 1) === 13 ? nl - 1 : nl;
+        if (end > i) rows.push(buf.slice(i, end).split(","));
+        i = nl + 1;
+        continue;
+      }
+      const next = parseQuotedRow(buf, i, rows, final);
+      if (next < 0) return i;   // a quoted field runs past the end of buf
+      i = next;
+    }
+    return n;
+  }
+
+  // One row starting at i that contains quoted fields ("" escapes a quote; quoted fields may hold
+  // commas and newlines). Returns the index after the row, or -1 if buf ends inside it.
+  function parseQuotedRow(buf, i, rows, final){
+    const n = buf.length;
+    const row = [];
+    for (;;){
+      let f = "";
+      if (buf.charCodeAt(i) === 34){
+        let j = i + 1;
+        for (;;){
+          const k = buf.indexOf('"', j);
+          if (k < 0 || (k + 1 === n && !final)){
+            if (!final) return -1;
+            f += buf.slice(j, k < 0 ? n : k);
+            i = k < 0 ? n : k + 1;
+            break;
+          }
+          if (buf.charCodeAt(k + 1) === 34){ f += buf.slice(j, k + 1); j = k + 2; continue; }
+          f += buf.slice(j, k);
+          i = k + 1;
+          break;
+        }
+      }
+      // unquoted field, or stray text after a closing quote (kept, like PapaParse)
+      let k = i;
+      for (let c = buf.charCodeAt(k); k < n && c !== 44 && c !== 10; c = buf.charCodeAt(++k));
+      if (k === n && !final) return -1;
+      const end = k < n && k > i && buf.charCodeAt(k) === 10 && buf.charCodeAt(k - 1) === 13 ? k - 1 : k;
+      if (end > i) f += buf.slice(i, end);
+      row.push(f);
+      if (k < n && buf.charCodeAt(k) === 44){
+        i = k + 1;
+        if (i < n) continue;
+        if (!final) return -1;
+        row.push("");
+      }
+      if (row.length > 1 || row[0] !== "") rows.push(row);
+      return k < n ? k + 1 : n;
+    }
+  }
+
+  // Incremental parser over text pieces: push() returns the rows completed so far, end() the rest.
+  function csvStreamParser(){
+    let carry = "", pending = [], size = 0;
+    const flush = (final) => {
+      const buf = carry + pending.join("");
+      pending = [];
+      size = 0;
+      const rows = [];
+      carry = buf.slice(parseCsvRows(buf, rows, final));
+      return rows;
+    };
+    return {
+      push(text){
+        pending.push(text);
+        size += text.length;
+        return size >= CSV_BATCH_CHARS ? flush(false) : [];
+      },
+      end(){ return flush(true); }
+    };
+  }
+
+  // Members of a zip archive from its central directory (ZIP64 aware), with where their data starts.
+  async function zipEntries(file){
+    const view = async (start, end) => new DataView(await file.slice(start, end).arrayBuffer());
+    const tailStart = Math.max(0, file.size - 65557);   // EOCD (22 bytes) + max comment length
+    const tail = await view(tailStart, file.size);
+    let eocd = -1;
+    for (let k = tail.byteLength - 22; k >= 0; k--) if (tail.getUint32(k, true) === 0x06054b50){ eocd = k; break; }
+    if (eocd < 0) throw new Error(`${file.name}: not a zip archive`);
+    let count = tail.getUint16(eocd + 10, true);
+    let cdSize = tail.getUint32(eocd + 12, true);
+    let cdOffset = tail.getUint32(eocd + 16, true);
+    if ((count === 0xFFFF || cdSize === 0xFFFFFFFF || cdOffset === 0xFFFFFFFF) && eocd >= 20 &&
+        tail.getUint32(eocd - 20, true) === 0x07064b50){
+      const rec = await view(Number(tail.getBigUint64(eocd - 12, true)), file.size);
+      count = Number(rec.getBigUint64(32, true));
+      cdSize = Number(rec.getBigUint64(40, true));
+      cdOffset = Number(rec.getBigUint64(48, true));
+    }
+    const cd = await view(cdOffset, cdOffset + cdSize);
+    const names = new TextDecoder();
+    const out = [];
+    for (let k = 0, e = 0; e < count; e++){
+      if (cd.getUint32(k, true) !== 0x02014b50) throw new Error(`${file.name}: corrupt zip central directory`);
+      const method = cd.getUint16(k + 10, true);
+      let compSize = cd.getUint32(k + 20, true), size = cd.getUint32(k + 24, true);
+      const nameLen = cd.getUint16(k + 28, true), extraLen = cd.getUint16(k + 30, true), commentLen = cd.getUint16(k + 32, true);
+      let offset = cd.getUint32(k + 42, true);
+      const name = names.decode(new Uint8Array(cd.buffer, cd.byteOffset + k + 46, nameLen));
+      for (let x = k + 46 + nameLen, xe = x + extraLen; x + 4 <= xe; x += 4 + cd.getUint16(x + 2, true)){
+        if (cd.getUint16(x, true) !== 0x0001) continue;   // ZIP64 extended information
+        let y = x + 4;
+        if (size === 0xFFFFFFFF){ size = Number(cd.getBigUint64(y, true)); y += 8; }
+        if (compSize === 0xFFFFFFFF){ compSize = Number(cd.getBigUint64(y, true)); y += 8; }
+        if (offset === 0xFFFFFFFF){ offset = Number(cd.getBigUint64(y, true)); y += 8; }
+      }
+      out.push({name, method, compSize, size, offset});
+      k += 46 + nameLen + extraLen + commentLen;
+    }
+    for (const m of out){
+      const local = await view(m.offset, m.offset + 30);
+      m.dataStart = m.offset + 30 + local.getUint16(26, true) + local.getUint16(28, true);
+    }
+    return out;
+  }
+
+  // Decompressed byte streams of a .csv.gz (one) or a .zip (its CSV members, in archive order);
+  // `counted` wraps each compressed stream so progress can be reported in file bytes.
+  async function decompressedStreams(file, counted){
+    if (typeof DecompressionStream === "undefined"){
+      throw new Error("this browser cannot decompress files (no DecompressionStream); decompress the CUR first");
+    }
+    if (!/\.zip$/i.test(file.name)) return [counted(file.stream(), 0).pipeThrough(new DecompressionStream("gzip"))];
+    const members = (await zipEntries(file)).filter(m => /\.csv$/i.test(m.name) && !m.name.endsWith("/"));
+    if (!members.length) throw new Error(`${file.name}: no .csv member in the zip`);
+    return members.map(m => {
+      const raw = counted(file.slice(m.dataStart, m.dataStart + m.compSize).stream(), m.dataStart);
+      if (m.method === 0) return raw;
+      if (m.method !== 8) throw new Error(`${file.name}: ${m.name} uses unsupported zip compression method ${m.method}`);
+      return raw.pipeThrough(new DecompressionStream("deflate-raw"));
+    });
+  }
+
+  // Stream a compressed CUR into acc. Zip members after the first must repeat the first header.
+  async function consumeCompressed(acc, file, onChunk){
+    let cursor = 0;
+    const counted = (stream, base) => {
+      let read = 0;
+      return stream.pipeThrough(new TransformStream({transform(chunk, ctl){
+        read += chunk.byteLength;
+        cursor = base + read;
+        ctl.enqueue(chunk);
+      }}));
+    };
+    let header = null;
+    for (const stream of await decompressedStreams(file, counted)){
+      const reader = stream.pipeThrough(new TextDecoderStream()).getReader();
+      const parser = csvStreamParser();
+      let first = true;
+      for (;;){
+        const {done, value} = await reader.read();
+        let rows = done ? parser.end() : parser.push(value);
+        if (first && rows.length){
+          first = false;
+          if (header === null) header = rows[0].join("\n");
+          else if (rows[0].join("\n") !== header) throw new Error(`${file.name}: zip members have different columns`);
+          else rows = rows.slice(1);
+        }
+        if (rows.length) onChunk(rows, cursor);
+        if (done) break;
+      }
+    }
+  }
+
+  // -----------------------------
+  // Sharded plain CSVs: one large file is split into byte ranges parsed by several workers. A
+  // split must fall on a row boundary, i.e. a newline outside quoted fields; a byte lies inside
+  // one exactly when an odd number of quotes precedes it (an escaped "" counts twice), so the
+  // workers first count quotes per range in parallel and the page aligns the splits from those
+  // parities (see shardRanges). Merging shard partials approximates one pass: sums differ in the
+  // last bits, and the merged Space-Saving lists of resources can rank and count differently.
+  // -----------------------------
+  async function countQuotes(blob){
+    const reader = blob.stream().getReader();
+    let n = 0;
+    for (;;){
+      const {done, value} = await reader.read();
+      if (done) return n;
+      for (let j=0;j<value.length;j++) if (value[j] === 34) n++;
+    }
+  }
+
+  // Parse one shard (a Blob slice starting on a row boundary) as it streams. `header`, the file's
+  // first row, stands in for the one only the first shard has (null for that shard).
+  async function consumeRange(blob, header, onChunk){
+    let cursor = 0;
+    const reader = blob.stream()
+      .pipeThrough(new TransformStream({transform(chunk, ctl){
+        cursor += chunk.byteLength;
+        ctl.enqueue(chunk);
+      }}))
+      .pipeThrough(new TextDecoderStream()).getReader();
+    const parser = csvStreamParser();
+    if (header) onChunk([header], 0);
+    for (;;){
+      const {done, value} = await reader.read();
+      const rows = done ? parser.end() : parser.push(value);
+      if (rows.length) onChunk(rows, cursor);
+      if (done) break;
+    }
+  }
+
+  // Per-file ingestion stats from a columnar accumulator (call before endColumnar drops the state).
+  // Dictionary values are small (tens to a few thousand strings), so the page can take exact
+  // distinct counts across files.
+  function columnarStats(acc){
+    const c = acc.columnar;
+    if (!c) return {rows: acc.rowCount, distinct: {lineType: [], productCode: [], usageType: [], service: [], day: []}, usageStarts: 0, classes: 0};
+    return {
+      rows: acc.rowCount,
+      distinct: {lineType: c.lt.values, productCode: c.pc.values, usageType: c.ut.values,
+                 service: c.svc.values, day: c.day.values},
+      usageStarts: c.hourOf.size,   // distinct UsageStartDate strings (hourly CURs: ~24 per day)
+      classes: c.flagsOf.size      // distinct (UsageType bits, ProductCode, LineItemType) classified
+    };
+  }
+
+  // -----------------------------
+  // Sampled preview. Before a large plain CSV is scanned, byte blocks spread evenly over it are
+  // read, cut to their complete rows and folded per ProductCode × LineItemType stratum. A block's
+  // rows stand for the bytes around it, so the sampled strata scaled by (population bytes /
+  // sampled bytes) estimate every sum of the scan. Strata seen in only a few blocks (monthly
+  // fees, tax, credits: a handful of large lines) would be blown up by that factor; they are
+  // counted as sampled, unscaled, until the exact scan has them. Intervals come from a
+  // delete-a-group jackknife: the blocks are dealt round-robin into PREVIEW_GROUPS groups (each
+  // spanning the whole file) and the estimate is repeated without each.
+  // -----------------------------
+  const PREVIEW_GROUPS = 16;
+
+  // A block (bytes from inside a plain CSV, header excluded) → {bytes, rows, strata: [{key, net,
+  // partial}]}, or null when its rows are not all as wide as the header (it started inside a
+  // quoted field that holds a newline; CURs rarely have those). `bytes` counts its complete rows
+  // only; a stratum key is "ProductCode\tLineItemType".
+  function sampleBlock(opts, header, block){
+    const a = block.indexOf(10) + 1, b = block.lastIndexOf(10) + 1;
+    if (!a || b <= a) return null;
+    const rows = [];
+    parseCsvRows(new TextDecoder().decode(block.subarray(a, b)), rows, true);
+    if (!rows.length || rows.some(r => r.length !== header.length)) return null;
+    const iPc = header.indexOf("lineItem/ProductCode"), iLt = header.indexOf("lineItem/LineItemType");
+    const byStratum = new Map();
+    for (const r of rows){
+      const key = `${r[iPc] ?? "Unknown"}\t${r[iLt] ?? "Unknown"}`;
+      let group = byStratum.get(key);
+      if (!group) byStratum.set(key, group = []);
+      group.push(r);
+    }
+    const strata = [];
+    for (const [key, group] of byStratum){
+      const acc = endColumnar(consumeColumnarChunk(consumeColumnarChunk(initDashboard(opts), [header]), group));
+      let net = 0;
+      for (const p of acc.periods.values()) net += p.totalBill;
+      strata.push({key, net, partial: {rowCount: acc.rowCount, periods: acc.periods}});   // no index, rules or memo
+    }
+    return {bytes: b - a, rows: rows.length, strata};
+  }
+
+  // Every additive figure of a period multiplied by factor (HyperLogLog registers are left as is).
+  function scalePeriod(p, factor){
+    p.rowCount *= factor;
+    for (const k of PERIOD_SUMS) p[k] *= factor;
+    p.poolNet = p.poolNet.map(v => v * factor);
+    p.poolPublic = p.poolPublic.map(v => v * factor);
+    for (const m of [p.dailyVar, p.hourlyVar, p.hourlyCompute, p.serviceSpend]) for (const [k, v] of m) m.set(k, v * factor);
+    for (const days of p.serviceDays.values()) for (let i=0;i<DAY_SLOTS;i++) days[i] *= factor;
+    for (const [name] of RESOURCE_POOLS){
+      scaleTopK(p.resources[name].ids, factor);
+      scaleTopK(p.resources[name].types, factor);
+    }
+    return p;
+  }
+
+  // Estimated scan summary from `exact` (partials of the bytes already scanned, or null) plus the
+  // sample blocks of the rest: each block's common strata (b.partial) scaled up to the
+  // `population` bytes, its rare strata (b.rare, or null) as they are. Returns {summary,
+  // replicates, fpc, sampledBytes}: replicates are the jackknife summaries, fpc the
+  // finite-population correction for their variance.
+  function previewSummaries(opts, exact, blocks, population){
+    const G = Math.min(PREVIEW_GROUPS, blocks.length);
+    const groups = Array.from({length: G}, () => ({acc: initDashboard(opts), bytes: 0}));
+    blocks.forEach((b, k) => {
+      const g = groups[k % G];
+      mergeDashboardPartials(g.acc, b.partial);
+      g.bytes += b.bytes;
+    });
+    const sampledBytes = groups.reduce((t, g) => t + g.bytes, 0);
+    const estimate = (skip) => {
+      const sample = initDashboard(opts);
+      let bytes = 0;
+      groups.forEach((g, k) => {
+        if (k === skip) return;
+        mergeDashboardPartials(sample, g.acc);
+        bytes += g.bytes;
+      });
+      for (const p of sample.periods.values()) scalePeriod(p, population / bytes);
+      sample.rowCount *= population / bytes;
+      const acc = initDashboard(opts);
+      if (exact) mergeDashboardPartials(acc, exact);
+      for (const b of blocks) if (b.rare) mergeDashboardPartials(acc, b.rare);
+      return summarizeDashboard(mergeDashboardPartials(acc, sample));
+    };
+    return {summary: estimate(-1), replicates: G > 1 ? groups.map((g, k) => estimate(k)) : [],
+            fpc: Math.max(0, 1 - sampledBytes / population), sampledBytes};
+  }
+
+  // Worker entry point: parse one file (or one shard of it), reply with its (small) per-period
+  // partial and timings. Plain CSVs go through PapaParse, shards and .csv.gz / .zip through the
+  // streaming parser. parseMs is the wall time not spent folding (reading, inflating, splitting).
+  // {task: "quotes", blob} only counts the quotes of a byte range; {task: "sample", blocks,
+  // header, opts} folds preview blocks (Blob slices of one file) with sampleBlock.
+  if (typeof document === "undefined" && typeof importScripts === "function"){
+    self.onmessage = (e) => {
+      if (e.data.task === "quotes"){
+        countQuotes(e.data.blob).then((count) => self.postMessage({type: "done", count}),
+          (err) => self.postMessage({type: "error", message: String(err && err.message || err)}));
+        return;
+      }
+      if (e.data.task === "sample"){
+        const {blocks, header, opts} = e.data;
+        (async () => {
+          const out = [];
+          for (const blob of blocks) out.push(sampleBlock(opts, header, new Uint8Array(await blob.arrayBuffer())));
+          return out;
+        })().then((out) => self.postMessage({type: "done", blocks: out}),
+          (err) => self.postMessage({type: "error", message: String(err && err.message || err)}));
+        return;
+      }
+      const {file, opts, shard} = e.data;
+      const acc = initDashboard(opts);
+      const t0 = performance.now();
+      let foldMs = 0;
+      let failed = false;
+      const fold = (rows, cursor) => {
+        const t = performance.now();
+        consumeColumnarChunk(acc, rows);
+        foldMs += performance.now() - t;
+        self.postMessage({type: "progress", cursor, rows: acc.rowCount});
+      };
+      const fail = (err) => {
+        failed = true;
+        self.postMessage({type: "error", message: String(err && (err.stack || err.message) || err)});
+      };
+      const finish = () => {
+        if (failed) return;
+        const t = performance.now();
+        const stats = columnarStats(acc);
+        endColumnar(acc);   // only the small per-period partial is posted back
+        const t1 = performance.now();
+        Object.assign(stats, {parseMs: t - t0 - foldMs, foldMs, finishMs: t1 - t, wallMs: t1 - t0});
+        self.postMessage({type: "done", partial: acc, stats});
+      };
+
+      if (shard){
+        consumeRange(file, shard.header, fold).then(finish, fail);
+        return;
+      }
+      if (/\.(gz|zip)$/i.test(file.name)){
+        consumeCompressed(acc, file, fold).then(finish, fail);
+        return;
+      }
+      Papa.parse(file, {
+        header: false,
+        skipEmptyLines: true,
+        chunk: (results, parser) => {
+          if (failed) return;
+          try{
+            fold(results.data || [], results.meta.cursor);
+          } catch (err){
+            parser.abort();
+            fail(err);
+          }
+        },
+        complete: finish,
+        error: (err) => fail(err)
+      });
+    };
+  }
+</script>
+
+<script>
+  // -----------------------------
+  // Utilities
+  // -----------------------------
+  const eur = (x, d=0) => {
+    const n = (isFinite(x) ? x : 0);
+    return "€" + n.toLocaleString(undefined, {minimumFractionDigits:d, maximumFractionDigits:d});
+  };
+  const pct = (x, d=1) => {
+    const n = (isFinite(x) ? x : 0);
+    return (n*100).toFixed(d) + "%";
+  };
+  const setStatus = (kind, msg) => {
+    const dot = document.getElementById("statusDot");
+    dot.classList.remove("ok","bad");
+    if (kind === "ok") dot.classList.add("ok");
+    if (kind === "bad") dot.classList.add("bad");
+    document.getElementById("statusText").textContent = msg;
+  };
+
+  const esc = (v) => String(v).replace(/[&<>"]/g, ch => ({"&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;"})[ch]);
+
+  // A figure as shown; while the result is a sampled preview, "≈" and its 95% interval (res.ci).
+  const fig = (ci, key, v, fmt) => ci && ci[key] !== undefined
+    ? `≈${fmt(v)} <span class="sub">±${fmt(ci[key])}</span>` : fmt(v);
+
+  const parseList = (s) => s.split(",").map(x=>x.trim()).filter(Boolean).map(x=>parseFloat(x)).filter(x=>isFinite(x) && x>0 && x<=1);
+
+  // -----------------------------
+  // Third-party scripts: nothing loads up front. --offline pages carry them gzip + base64 and
+  // inflate them on first use; otherwise the pinned CDN builds are fetched then. Plotly (the
+  // "basic" partial bundle: scatter, bar, pie) is only requested once there is data to chart.
+  // -----------------------------
+  const CDN = {
+    papaparse: "https://cdn.jsdelivr.net/npm/papaparse@5.4.1/papaparse.min.js",
+    plotly: "https://cdn.plot.ly/plotly-cartesian-2.30.0.min.js"
+  };
+
+  // Embedded gzip + base64 payload (report cube, inlined scripts) → text
+  async function gunzipBase64(b64){
+    const bytes = Uint8Array.from(atob(b64), ch => ch.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).text();
+  }
+
+  // Resolves to the inlined source of a script, or null when the page was built without it.
+  const scriptSources = {};
+  function scriptSource(name){
+    return scriptSources[name] ||= (async () => {
+      const el = document.getElementById(`asset-${name}`);
+      const b64 = el ? el.textContent.trim() : "";
+      return b64 ? gunzipBase64(b64) : null;
+    })();
+  }
+
+  let plotlyLoad = null;
+  function loadPlotly(){
+    if (typeof Plotly !== "undefined") return Promise.resolve(Plotly);
+    return plotlyLoad ||= scriptSource("plotly").then((src) => new Promise((resolve, reject) => {
+      const t0 = performance.now();
+      const s = document.createElement("script");
+      const loaded = () => {
+        performance.measure("cur:Load chart library", {start: t0, end: performance.now()});
+        resolve(Plotly);
+      };
+      if (src != null){
+        s.textContent = src;          // inline scripts run synchronously on insertion
+        document.head.appendChild(s);
+        return loaded();
+      }
+      s.src = CDN.plotly;
+      s.onload = loaded;
+      s.onerror = () => {
+        plotlyLoad = null;            // let a later render retry
+        reject(new Error(`could not load ${CDN.plotly}`));
+      };
+      document.head.appendChild(s);
+    }));
+  }
+
+  // Charts and tables below the fold are drawn when they scroll near the viewport. A render asked
+  // for while its element is off-screen replaces the one still waiting, so parameter edits only
+  // pay for what is on screen. Without IntersectionObserver everything is drawn right away.
+  const LAZY_MARGIN = "400px 0px";
+  const lazy = new Map();       // element id → {fn, resolve} waiting to be drawn
+  const onScreen = new Set();   // element ids within LAZY_MARGIN of the viewport
+  const observer = typeof IntersectionObserver === "undefined" ? null : new IntersectionObserver((entries) => {
+    for (const e of entries){
+      const id = e.target.id;
+      if (!e.isIntersecting){
+        onScreen.delete(id);
+        continue;
+      }
+      onScreen.add(id);
+      const job = lazy.get(id);
+      if (job){
+        lazy.delete(id);
+        job.resolve(job.fn());
+      }
+    }
+  }, {rootMargin: LAZY_MARGIN});
+
+  // Runs fn now when the element is on screen, otherwise once it gets there. Resolves to fn's
+  // result (undefined when a later render replaced this one before it ran).
+  function whenVisible(id, fn){
+    if (!observer || onScreen.has(id)) return Promise.resolve(fn());
+    const prev = lazy.get(id);
+    if (prev) prev.resolve(undefined);
+    return new Promise((resolve) => {
+      lazy.set(id, {fn, resolve});
+      observer.observe(document.getElementById(id));   // no-op when already observed
+    });
+  }
+
+  // Draws once Plotly is available and the chart is in view; the rest of the page never waits for
+  // it. Plotly.react updates a chart in place, redrawing only what changed, and a chart whose data
+  // and layout are the same as last time is left alone. Resolves to the chart element (undefined
+  // when Plotly could not be loaded or a later render replaced this one).
+  const drawn = new Map();   // chart id → JSON of the data and layout it shows
+  function plot(id, data, layout, config){
+    const key = JSON.stringify([data, layout]);
+    if (drawn.get(id) === key && !lazy.has(id)) return Promise.resolve(document.getElementById(id));
+    return whenVisible(id, () => {
+      drawn.set(id, key);
+      return loadPlotly().then(
+        (P) => P.react(id, data, layout, config),
+        (e) => {
+          console.error(e);
+          drawn.delete(id);
+          document.getElementById(id).textContent = "Chart library unavailable (offline?). Regenerate the page with --offline.";
+        });
+    });
+  }
+
+  // Long tables and lists keep only the rows around their scroll window in the DOM, with spacers
+  // standing in for the rest, so a 50,000-value tag list costs about as much as a 60-row one.
+  // Rows must be of equal height; the first window measures it.
+  const VIRTUAL_MIN_ROWS = 200;
+  const VIRTUAL_OVERSCAN = 20;
+  const VIRTUAL_HEIGHT = 480;   // px; scroll box of a long table
+  const virtual = new WeakMap();   // tbody / list element → {scroller, items, row, rowHeight}
+
+  // Fills a <tbody> (scrolling in the <div> around its table) or a list element (scrolling in its
+  // parent) with row(item, index) for every item.
+  function renderRows(el, items, row){
+    let v = virtual.get(el);
+    if (items.length <= VIRTUAL_MIN_ROWS){
+      if (v && v.items){
+        v.items = null;
+        if (el.tagName === "TBODY") v.scroller.style.maxHeight = "";
+      }
+      el.innerHTML = items.map(row).join("");
+      return;
+    }
+    if (!v){
+      const tbody = el.tagName === "TBODY";
+      v = {scroller: tbody ? el.parentElement.parentElement : el.parentElement, items: null, rowHeight: 0,
+           spacer: tbody ? (h) => `<tr aria-hidden="true"><td colspan="99" style="height:${h}px;padding:0;border:0"></td></tr>`
+                         : (h) => `<div aria-hidden="true" style="height:${h}px"></div>`};
+      virtual.set(el, v);
+      let queued = false;
+      v.scroller.addEventListener("scroll", () => {
+        if (queued || !v.items) return;
+        queued = true;
+        requestAnimationFrame(() => {
+          queued = false;
+          if (v.items) drawRowWindow(el, v);
+        });
+      });
+    }
+    if (!v.items) v.scroller.scrollTop = 0;
+    if (el.tagName === "TBODY") v.scroller.style.maxHeight = `${VIRTUAL_HEIGHT}px`;
+    v.items = items;
+    v.row = row;
+    drawRowWindow(el, v);
+  }
+
+  function drawRowWindow(el, v){
+    const {items, scroller} = v;
+    const h = v.rowHeight || 24;   // until measured
+    const first = Math.max(0, Math.min(items.length, Math.floor(scroller.scrollTop / h)) - VIRTUAL_OVERSCAN);
+    const last = Math.min(items.length, first + Math.ceil((scroller.clientHeight || VIRTUAL_HEIGHT) / h) + 2 * VIRTUAL_OVERSCAN);
+    const rows = [];
+    for (let i = first; i < last; i++) rows.push(v.row(items[i], i));
+    el.innerHTML = v.spacer(first * h) + rows.join("") + v.spacer((items.length - last) * h);
+    if (!v.rowHeight && last > first){
+      const measured = el.children[1].getBoundingClientRect().height;
+      if (measured > 0){
+        v.rowHeight = measured;
+        drawRowWindow(el, v);
+      }
+    }
+  }
+
+  const renderTable = (id, items, row) => whenVisible(id, () => renderRows(document.getElementById(id), items, row));
+
+  // -----------------------------
+  // Diagnostics: each run's phases are bracketed with performance.mark/measure ("cur:<phase>", so
+  // they also show in the browser's performance timeline); counters and heap samples are kept
+  // with them for the Diagnostics panel and its JSON export.
+  // -----------------------------
+  let diag = null;
+  const heap = () => performance.memory ? {   // Chromium only
+    usedJSHeapSize: performance.memory.usedJSHeapSize,
+    totalJSHeapSize: performance.memory.totalJSHeapSize,
+    jsHeapSizeLimit: performance.memory.jsHeapSizeLimit
+  } : null;
+
+  function sampleHeap(){
+    const m = heap();
+    if (diag && m) diag.memory.peakUsedJSHeapSize = Math.max(diag.memory.peakUsedJSHeapSize || 0, m.usedJSHeapSize);
+  }
+
+  function startRun(kind, label){
+    if (diag){
+      for (const ph of diag.phases){
+        performance.clearMarks(`cur:${ph.name}:start`);
+        performance.clearMeasures(`cur:${ph.name}`);
+      }
+    }
+    diag = {kind, label, startedAt: new Date().toISOString(), t0: performance.now(), totalMs: 0,
+            phases: [], counters: {}, files: [], memory: {start: heap(), end: null}};
+    sampleHeap();
+    return diag;
+  }
+
+  // sub: a breakdown of the previous phase (e.g. CPU time summed over workers), not a wall-clock slice.
+  function addPhase(name, ms, sub = false){
+    if (diag) diag.phases.push(sub ? {name, ms, sub} : {name, ms});
+  }
+
+  // Run fn (sync, or async returning a promise) as a named phase of the current run.
+  function phase(name, fn){
+    const start = `cur:${name}:start`;
+    performance.mark(start);
+    const t0 = performance.now();
+    const end = () => {
+      let m = null;
+      try{ m = performance.measure(`cur:${name}`, start); } catch (e){ /* old browsers: no return value */ }
+      addPhase(name, (m && m.duration) ?? performance.now() - t0);
+      sampleHeap();
+    };
+    const out = fn();
+    if (out && typeof out.then === "function") return out.then((v) => { end(); return v; }, (e) => { end(); throw e; });
+    end();
+    return out;
+  }
+
+  function endRun(counters){
+    if (!diag) return;
+    diag.totalMs = performance.now() - diag.t0;
+    Object.assign(diag.counters, counters);
+    diag.memory.end = heap();
+    sampleHeap();
+    renderDiagnostics();
+  }
+
+  // Distinct keys of a merged accumulator (days and services are unions over billing periods).
+  function accCounters(acc){
+    const days = new Set(), services = new Set();
+    for (const p of acc.periods.values()){
+      for (const k of p.dailyVar.keys()) days.add(k);
+      for (const k of p.serviceSpend.keys()) services.add(k);
+    }
+    return {rows: acc.rowCount, billingPeriods: acc.periods.size, days: days.size, services: services.size};
+  }
+
+  // Exact distinct LineItemType / ProductCode / UsageType counts across files, from worker stats.
+  function fileCounters(stats){
+    const sets = {lineType: new Set(), productCode: new Set(), usageType: new Set()};
+    let usageStarts = 0, classes = 0;
+    for (const st of stats){
+      for (const k of Object.keys(sets)) for (const v of st.distinct[k]) sets[k].add(v);
+      usageStarts += st.usageStarts;
+      classes += st.classes;
+    }
+    return {distinctLineTypes: sets.lineType.size, distinctProductCodes: sets.productCode.size,
+            distinctUsageTypes: sets.usageType.size, distinctUsageStartsPerFileSum: usageStarts,
+            classifiedCombinationsPerFileSum: classes};
+  }
+
+  const COUNTER_LABELS = {
+    files: "Files", cachedFiles: "Files served from cache", bytes: "Bytes read", workers: "Parse workers",
+    rows: "CUR rows", rowsPerSec: "Rows/s (parse + aggregate)", billingPeriods: "Billing periods",
+    days: "Usage days", services: "Services", distinctLineTypes: "Distinct LineItemType",
+    distinctProductCodes: "Distinct ProductCode", distinctUsageTypes: "Distinct UsageType",
+    distinctUsageStartsPerFileSum: "Distinct UsageStartDate (sum over files)",
+    classifiedCombinationsPerFileSum: "Classified type/product/usage combinations (sum over files)",
+    cubeCells: "Cube cells", cubePayloadBytes: "Embedded cube (base64 bytes)",
+    indexCells: "Drill-down index cells", indexGroups: "Drill-down groups (account × region × tags)",
+    previewBlocks: "Preview sample blocks", previewBytes: "Preview bytes sampled"
+  };
+
+  const fmtBytes = (b) => b >= 1e9 ? `${(b/1e9).toFixed(2)} GB` : `${(b/1e6).toFixed(b >= 1e7 ? 0 : 1)} MB`;
+  const fmtMs = (ms) => ms >= 1000 ? `${(ms/1000).toFixed(2)} s` : `${ms.toFixed(1)} ms`;
+
+  // Status line while workers parse: bytes, rows, throughput and a bytes-based ETA.
+  function progressText(pr, nFiles, elapsedMs){
+    const sec = elapsedMs / 1000;
+    const rate = pr.rows / Math.max(sec, 1e-3);
+    const eta = (pr.bytes > 0 && pr.bytes < pr.totalBytes) ? (pr.totalBytes - pr.bytes) * sec / pr.bytes : 0;
+    const etaText = eta ? ` · ETA ${eta < 90 ? `${eta.toFixed(0)} s` : `${(eta/60).toFixed(1)} min`}` : "";
+    return `Parsing CSV… ${pr.done}/${nFiles} files · ${fmtBytes(pr.bytes)} of ${fmtBytes(pr.totalBytes)} · ` +
+           `${pr.rows.toLocaleString()} rows · ${Math.round(rate).toLocaleString()} rows/s${etaText}`;
+  }
+
+  function renderDiagnostics(){
+    const d = diag;
+    document.getElementById("diagCard").style.display = "";
+    const rows = d.counters.rows || 0;
+    document.getElementById("diagSummary").textContent =
+      `${d.label} · ${fmtMs(d.totalMs)}` + (rows ? ` · ${rows.toLocaleString()} rows` : "");
+    document.getElementById("diagPhases").innerHTML = d.phases.map(ph => `
+      <tr>
+        <td${ph.sub ? ' style="padding-left:22px;color:var(--muted)"' : ""}>${ph.name}</td>
+        <td style="text-align:right">${fmtMs(ph.ms)}</td>
+        <td style="text-align:right">${d.totalMs && !ph.sub ? pct(ph.ms / d.totalMs) : ""}</td>
+      </tr>
+    `).join("");
+    const mem = [];
+    if (d.memory.end){
+      mem.push(["JS heap used (end)", fmtBytes(d.memory.end.usedJSHeapSize)]);
+      mem.push(["JS heap used (peak sampled)", fmtBytes(d.memory.peakUsedJSHeapSize)]);
+      mem.push(["JS heap limit", fmtBytes(d.memory.end.jsHeapSizeLimit)]);
+    } else {
+      mem.push(["JS heap", "n/a (performance.memory is Chromium-only)"]);
+    }
+    const counters = Object.entries(d.counters)
+      .map(([k,v]) => [COUNTER_LABELS[k] || k, typeof v === "number" ? v.toLocaleString(undefined, {maximumFractionDigits: 0}) : v]);
+    document.getElementById("diagCounters").innerHTML = counters.concat(mem).map(([k,v]) => `
+      <tr><td>${k}</td><td style="text-align:right">${v}</td></tr>
+    `).join("");
+    document.getElementById("diagFilesWrap").style.display = d.files.length ? "" : "none";
+    document.getElementById("diagFiles").innerHTML = d.files.map(f => `
+      <tr>
+        <td>${esc(f.name)}${f.shards > 1 ? ` <span class="sub">(${f.shards} shards)</span>` : ""}</td>
+        <td style="text-align:right">${fmtBytes(f.bytes)}</td>
+        <td style="text-align:right">${f.rows.toLocaleString()}</td>
+        <td style="text-align:right">${f.cached ? "cached" : fmtMs(f.parseMs)}</td>
+        <td style="text-align:right">${f.cached ? "" : fmtMs(f.foldMs)}</td>
+        <td style="text-align:right">${f.cached ? "" : Math.round(f.rows / Math.max(f.wallMs/1000, 1e-3)).toLocaleString()}</td>
+      </tr>
+    `).join("");
+  }
+
+  function exportDiagnostics(){
+    if (!diag) return;
+    const {t0, ...run} = diag;
+    const doc = {
+      version: 1,
+      exportedAt: new Date().toISOString(),
+      environment: {userAgent: navigator.userAgent, hardwareConcurrency: navigator.hardwareConcurrency || null,
+                    deviceMemoryGB: navigator.deviceMemory || null},
+      run,
+      measures: performance.getEntriesByType("measure").filter(m => m.name.startsWith("cur:"))
+        .map(m => ({name: m.name, startTime: m.startTime, duration: m.duration}))
+    };
+    download(new Blob([JSON.stringify(doc, null, 2)], {type: "application/json"}),
+             `cur-diagnostics-${run.startedAt.replace(/[:.]/g, "-")}.json`);
+  }
+
+  function download(blob, name){
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement("a");
+    a.href = url;
+    a.download = name;
+    a.click();
+    setTimeout(() => URL.revokeObjectURL(url), 0);
+  }
+
+  // -----------------------------
+  // Parallel reduction: one worker per core, each reduces whole files to per-period partials
+  // -----------------------------
+  // Papa Parse is prepended to the worker source when inlined, imported from the CDN otherwise.
+  let workerUrl = null;
+  function workerScriptUrl(){
+    return workerUrl ||= scriptSource("papaparse").then((papa) => {
+      const engineSrc = document.getElementById("curEngine").textContent;
+      const src = `${papa != null ? papa : `importScripts(${JSON.stringify(CDN.papaparse)});`}\n${engineSrc}`;
+      return URL.createObjectURL(new Blob([src], {type: "text/javascript"}));
+    });
+  }
+
+  // Per-file partials (and their ingestion stats) survive between runs: re-running on the same
+  // files never re-reads them.
+  const partialCache = new Map();
+  const fileKey = (f) => `${f.webkitRelativePath || f.name}|${f.size}|${f.lastModified}`;
+
+  // -----------------------------
+  // Persistent scan cache (IndexedDB): each file's per-period partial and ingestion stats, so
+  // reopening a CUR in a new session skips parsing entirely. Entries are keyed by a fingerprint
+  // (path, size, lastModified, hash of sampled bytes) plus the rules in effect; the least
+  // recently used ones are evicted once the stored partials exceed the quota.
+  // -----------------------------
+  const SCAN_CACHE_DB = "cur-scan-cache";
+  const SCAN_CACHE_FORMAT = 5;          // bump when the partial layout changes
+  const FINGERPRINT_SAMPLE = 64 * 1024; // bytes hashed at the start, middle and end of a file
+  const DEFAULT_CACHE_QUOTA_MB = 256;
+
+  const idbRequest = (req) => new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+  const idbDone = (tx) => new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = tx.onabort = () => reject(tx.error);
+  });
+
+  // Resolves to the database, or null where IndexedDB is unavailable (the cache is then off).
+  let scanCacheDb = null;
+  function openScanCache(){
+    return scanCacheDb ||= new Promise((resolve, reject) => {
+      if (typeof indexedDB === "undefined") return reject(new Error("IndexedDB is not available"));
+      const req = indexedDB.open(SCAN_CACHE_DB, 1);
+      req.onupgradeneeded = () => {
+        // scans: key → {partial, stats}; entries: key → {key, name, bytes, usedAt} (small, for LRU)
+        req.result.createObjectStore("scans", {keyPath: "key"});
+        req.result.createObjectStore("entries", {keyPath: "key"}).createIndex("usedAt", "usedAt");
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    }).catch((e) => {
+      console.warn("Scan cache disabled:", e);
+      return null;
+    });
+  }
+
+  async function digestHex(buf){
+    if (typeof crypto !== "undefined" && crypto.subtle){
+      const d = new Uint8Array(await crypto.subtle.digest("SHA-256", buf));
+      return Array.from(d, b => b.toString(16).padStart(2, "0")).join("");
+    }
+    // non-secure contexts have no crypto.subtle: FNV-1a
+    const bytes = new Uint8Array(buf);
+    let h = 0x811c9dc5;
+    for (let i=0;i<bytes.length;i++) h = Math.imul(h ^ bytes[i], 0x01000193);
+    return (h >>> 0).toString(16).padStart(8, "0");
+  }
+
+  async function fingerprint(file){
+    const n = FINGERPRINT_SAMPLE;
+    const slices = file.size <= 3 * n ? [file] :
+      [file.slice(0, n), file.slice(Math.floor(file.size / 2) - n / 2, Math.floor(file.size / 2) + n / 2), file.slice(file.size - n)];
+    return `${fileKey(file)}|${await digestHex(await new Blob(slices).arrayBuffer())}`;
+  }
+
+  // Everything a partial depends on besides the file: cache format and classification inputs.
+  let scanContext = null;
+  async function scanContextKey(opts){
+    const ctx = JSON.stringify([SCAN_CACHE_FORMAT, opts.rules, opts.computeCodes]);
+    if (!scanContext || scanContext.json !== ctx){
+      scanContext = {json: ctx, hash: (await digestHex(new TextEncoder().encode(ctx).buffer)).slice(0, 16)};
+    }
+    return scanContext.hash;
+  }
+
+  function cacheQuotaBytes(){
+    const mb = parseFloat(document.getElementById("cacheQuota").value);
+    return (isFinite(mb) && mb >= 0 ? mb : DEFAULT_CACHE_QUOTA_MB) * 1e6;
+  }
+
+  // Stored size of a record, approximated by its JSON (Maps as entry lists) plus its typed arrays.
+  function recordBytes(rec){
+    let binary = 0;
+    const json = JSON.stringify(rec, (k, v) => {
+      if (v instanceof Map) return Array.from(v);
+      if (ArrayBuffer.isView(v)){
+        binary += v.byteLength;
+        return 0;
+      }
+      return v;
+    });
+    return json.length + binary;
+  }
+
+  // Fills partialCache from IndexedDB for the files not in memory. Resolves to the fingerprint
+  // of every file (persistScans stores fresh partials under it) and the number of hits.
+  async function restoreScans(files, opts){
+    const db = await openScanCache();
+    if (!db) return {keys: [], hits: 0};
+    const ctx = await scanContextKey(opts);
+    const keys = await Promise.all(files.map(async f => partialCache.has(fileKey(f)) ? null : `${ctx}|${await fingerprint(f)}`));
+    const tx = db.transaction(["scans", "entries"], "readwrite");
+    const scans = tx.objectStore("scans"), entries = tx.objectStore("entries");
+    const found = await Promise.all(keys.map(k => k ? idbRequest(scans.get(k)) : null));
+    let hits = 0;
+    const now = Date.now();
+    found.forEach((rec, i) => {
+      if (!rec) return;
+      hits++;
+      partialCache.set(fileKey(files[i]), {partial: rec.partial, stats: rec.stats});
+      entries.put({key: rec.key, name: rec.name, bytes: rec.bytes, usedAt: now});
+    });
+    await idbDone(tx);
+    return {keys, hits};
+  }
+
+  // Stores freshly scanned partials, then evicts least recently used entries beyond the quota.
+  async function persistScans(files, keys, partials, stats){
+    const db = await openScanCache();
+    if (!db) return;
+    const tx = db.transaction(["scans", "entries"], "readwrite");
+    const now = Date.now();
+    files.forEach((f, i) => {
+      if (!keys[i] || stats[i].cached) return;
+      const {cached, ...st} = stats[i];
+      const rec = {key: keys[i], name: f.webkitRelativePath || f.name,
+                   partial: {rowCount: partials[i].rowCount, periods: partials[i].periods, index: partials[i].index},
+                   stats: st};
+      rec.bytes = recordBytes(rec);
+      tx.objectStore("scans").put(rec);
+      tx.objectStore("entries").put({key: rec.key, name: rec.name, bytes: rec.bytes, usedAt: now});
+    });
+    await idbDone(tx);
+    await evictScans(db, cacheQuotaBytes());
+  }
+
+  async function evictScans(db, quota){
+    const tx = db.transaction(["scans", "entries"], "readwrite");
+    const entries = tx.objectStore("entries");
+    const all = await idbRequest(entries.index("usedAt").getAll());   // oldest first
+    let total = all.reduce((t, e) => t + e.bytes, 0);
+    let n = all.length;
+    for (const e of all){
+      if (total <= quota) break;
+      tx.objectStore("scans").delete(e.key);
+      entries.delete(e.key);
+      total -= e.bytes;
+      n--;
+    }
+    await idbDone(tx);
+    showCacheInfo(n, total);
+  }
+
+  async function refreshCacheInfo(){
+    const db = await openScanCache();
+    if (!db){
+      document.getElementById("cacheInfo").textContent = "Scan cache unavailable in this browser.";
+      return;
+    }
+    const all = await idbRequest(db.transaction("entries").objectStore("entries").getAll());
+    showCacheInfo(all.length, all.reduce((t, e) => t + e.bytes, 0));
+  }
+
+  function showCacheInfo(n, bytes){
+    document.getElementById("cacheInfo").textContent =
+      `Scan cache: ${n.toLocaleString()} file(s), ${fmtBytes(bytes)} of ${fmtBytes(cacheQuotaBytes())}.`;
+  }
+
+  async function clearScans(){
+    partialCache.clear();
+    const db = await openScanCache();
+    if (db){
+      const tx = db.transaction(["scans", "entries"], "readwrite");
+      tx.objectStore("scans").clear();
+      tx.objectStore("entries").clear();
+      await idbDone(tx);
+    }
+    await refreshCacheInfo();
+  }
+
+  // A pool of engine workers; run(msg, onProgress) queues a job and resolves with its "done" message.
+  function workerPool(url, size){
+    const idle = [], queue = [], all = [];
+    const next = () => {
+      while (idle.length && queue.length) start(idle.pop(), queue.shift());
+    };
+    const start = (w, job) => {
+      w.onmessage = (e) => {
+        const m = e.data;
+        if (m.type === "progress"){
+          if (job.onProgress) job.onProgress(m);
+          return;
+        }
+        idle.push(w);
+        next();
+        if (m.type === "error") job.reject(new Error(m.message));
+        else job.resolve(m);
+      };
+      w.onerror = (e) => job.reject(new Error(e.message || "worker failed"));
+      w.postMessage(job.msg);
+    };
+    for (let k=0;k<size;k++){
+      const w = new Worker(url);
+      all.push(w);
+      idle.push(w);
+    }
+    return {
+      run: (msg, onProgress) => new Promise((resolve, reject) => {
+        queue.push({msg, onProgress, resolve, reject});
+        next();
+      }),
+      terminate: () => all.forEach(w => w.terminate())
+    };
+  }
+
+  // Plain CSVs of at least SHARD_MIN_BYTES are split across the cores the other files leave idle.
+  const SHARD_MIN_BYTES = 32 << 20;
+  const shardable = (f) => /\.csv$/i.test(f.name) && f.size >= 2 * SHARD_MIN_BYTES;
+
+  // Row-aligned byte ranges for k shards of a plain CSV, plus its header row. The pool counts
+  // the quotes of k nominal ranges; the quote parity before each nominal cut then tells where the
+  // first newline outside quotes after it is.
+  async function shardRanges(pool, file, k){
+    const cuts = Array.from({length: k + 1}, (_, s) => Math.round(file.size * s / k));
+    const counts = await Promise.all(cuts.slice(0, -1).map((c, s) =>
+      pool.run({task: "quotes", blob: file.slice(c, cuts[s + 1])})));
+    const starts = [0];
+    let parity = 0;
+    for (let s=1;s<k;s++){
+      parity ^= counts[s - 1].count & 1;
+      const at = await rowStart(file, cuts[s], parity);
+      if (at > starts[starts.length - 1] && at < file.size) starts.push(at);
+    }
+    starts.push(file.size);
+    const head = [];
+    parseCsvRows(await file.slice(0, Math.min(file.size, starts[1], 1 << 20)).text(), head, false);
+    if (!head.length) throw new Error("header row not found in the first MB");
+    return {header: head[0], ranges: starts.slice(0, -1).map((a, s) => [a, starts[s + 1]])};
+  }
+
+  // Offset just past the first newline at or after `from` outside quotes, given the quote parity
+  // of the bytes before `from` (file.size when there is none).
+  async function rowStart(file, from, parity){
+    const WINDOW = 1 << 20;
+    for (let at = from; at < file.size; at += WINDOW){
+      const bytes = new Uint8Array(await file.slice(at, at + WINDOW).arrayBuffer());
+      for (let j=0;j<bytes.length;j++){
+        if (bytes[j] === 34) parity ^= 1;
+        else if (bytes[j] === 10 && !parity) return at + j + 1;
+      }
+    }
+    return file.size;
+  }
+
+  // One file's partial and stats from those of its shards (in file order).
+  function mergeShards(opts, msgs, wallMs){
+    const acc = initDashboard(opts);
+    for (const m of msgs) mergeDashboardPartials(acc, m.partial);
+    acc.index = mergeIndexes(msgs.map(m => m.partial.index));
+    const distinct = {};
+    for (const k of Object.keys(msgs[0].stats.distinct)){
+      distinct[k] = Array.from(new Set([].concat(...msgs.map(m => m.stats.distinct[k]))));
+    }
+    const sum = (k) => msgs.reduce((t, m) => t + m.stats[k], 0);
+    return {partial: acc, stats: {rows: sum("rows"), distinct, usageStarts: sum("usageStarts"), classes: sum("classes"),
+                                  parseMs: sum("parseMs"), foldMs: sum("foldMs"), finishMs: sum("finishMs"),
+                                  wallMs, shards: msgs.length}};
+  }
+
+  // Resolves to {partials, stats, workers}, per file in input order; the caller merges the
+  // partials in that order, so the result does not depend on which worker finished first.
+  // onProgress({done, bytes, totalBytes, rows}) counts only the files actually being read.
+  // With fewer files than cores, large plain CSVs are sharded (shardSplit: false turns it off).
+  // onRange(i, start, end, partial) is told of each file or shard as soon as it is scanned.
+  async function reduceFiles(files, opts, onProgress, shardSplit = true, onRange = null){
+    const cached = files.map(f => partialCache.get(fileKey(f)));
+    const partials = cached.map(c => c && c.partial);
+    const stats = cached.map(c => c && {...c.stats, cached: true});
+    const todo = files.map((f,i) => i).filter(i => !cached[i]);
+    if (!todo.length) return {partials, stats, workers: 0};
+
+    const cores = navigator.hardwareConcurrency || 4;
+    const spare = Math.max(1, Math.floor(cores / todo.length));
+    const shards = todo.map(i => shardSplit && shardable(files[i])
+      ? Math.min(spare, Math.floor(files[i].size / SHARD_MIN_BYTES)) : 1);
+    const nWorkers = Math.min(cores, shards.reduce((t, k) => t + k, 0));
+    const cursor = files.map(() => 0);
+    const rows = files.map(() => 0);
+    const totalBytes = todo.reduce((t,i) => t + files[i].size, 0);
+    let done = files.length - todo.length;
+    const report = () => {
+      if (!onProgress) return;
+      let bytes = 0, n = 0;
+      for (const i of todo){ bytes += cursor[i]; n += rows[i]; }
+      onProgress({done, bytes, totalBytes, rows: n});
+    };
+
+    const pool = workerPool(await workerScriptUrl(), nWorkers);
+    const reduceFile = async (i, k) => {
+      const file = files[i];
+      const t0 = performance.now();
+      let m;
+      if (k === 1){
+        m = await pool.run({file, opts}, (pr) => {
+          cursor[i] = pr.cursor;
+          rows[i] = pr.rows;
+          report();
+        });
+        if (onRange) onRange(i, 0, file.size, m.partial);
+      } else {
+        const {header, ranges} = await shardRanges(pool, file, k);
+        const at = ranges.map(() => 0), n = ranges.map(() => 0);
+        const msgs = await Promise.all(ranges.map(([a, b], s) =>
+          pool.run({file: file.slice(a, b), opts, shard: {header: s ? header : null}}, (pr) => {
+            at[s] = pr.cursor;
+            n[s] = pr.rows;
+            cursor[i] = at.reduce((t, v) => t + v, 0);
+            rows[i] = n.reduce((t, v) => t + v, 0);
+            report();
+          }).then((msg) => {
+            if (onRange) onRange(i, a, b, msg.partial);
+            return msg;
+          })));
+        m = mergeShards(opts, msgs, performance.now() - t0);
+      }
+      partials[i] = m.partial;
+      stats[i] = {...m.stats, cached: false};
+      partialCache.set(fileKey(file), {partial: m.partial, stats: m.stats});
+      cursor[i] = file.size;
+      rows[i] = m.stats.rows;
+      done++;
+      report();
+    };
+    try{
+      await Promise.all(todo.map((i, t) => reduceFile(i, shards[t]).catch((e) => {
+        throw new Error(`${files[i].name}: ${e.message}`);
+      })));
+    } finally {
+      pool.terminate();
+    }
+    return {partials, stats, workers: nWorkers};
+  }
+
+  // Sampled preview (see sampleBlock): when the files still to scan are plain CSVs of at least
+  // PREVIEW_MIN_BYTES, PREVIEW_BLOCKS blocks evenly spaced over their data bytes are folded first
+  // and the estimate is shown while the exact scan runs. Each file or shard the scan finishes
+  // replaces its share of the estimate with exact figures (refinePreview).
+  const PREVIEW_MIN_BYTES = 256 << 20;
+  const PREVIEW_BLOCKS = 96;
+  const PREVIEW_BLOCK_BYTES = 192 << 10;
+  const PREVIEW_Z = 1.96;                // 95% intervals
+  const PREVIEW_STRATA = 12;             // strata listed
+  const PREVIEW_RARE_BLOCKS = 3;         // strata seen in fewer blocks get no reliable interval
+
+  const wantsPreview = (files, partials) => {
+    const todo = files.filter((f, i) => !partials[i]);
+    return todo.length > 0 && todo.every(f => /\.csv$/i.test(f.name)) &&
+           todo.reduce((t, f) => t + f.size, 0) >= PREVIEW_MIN_BYTES;
+  };
+
+  // Folds the sample blocks of the files not in `partials` (file index → cached partial) in a few
+  // workers; resolves to the preview state refinePreview and previewScan work on.
+  async function samplePreview(files, partials, opts){
+    const todo = files.map((f, i) => i).filter(i => !partials[i]);
+    const heads = new Map();
+    for (const i of todo){
+      const end = await rowStart(files[i], 0, 0);
+      const head = [];
+      parseCsvRows(await files[i].slice(0, end).text(), head, true);
+      if (!head.length) throw new Error(`${files[i].name}: no header row`);
+      heads.set(i, {header: head[0], bytes: end});
+    }
+    const data = todo.map(i => files[i].size - heads.get(i).bytes);
+    const total = data.reduce((t, n) => t + n, 0);
+
+    // block j starts at a random point of the j-th of PREVIEW_BLOCKS equal slices of the data bytes:
+    // one block per slice keeps the sample spread over the files, the random offset keeps it from
+    // lining up with the periodic layout of a sorted CUR (e.g. one day's rows after another). The
+    // generator (xorshift32) is seeded with the size, so a rerun reads the same blocks.
+    let seed = (total >>> 0) || 1;
+    const uniform = () => {
+      seed ^= seed << 13;
+      seed ^= seed >>> 17;
+      seed ^= seed << 5;
+      return (seed >>> 0) / 4294967296;
+    };
+    const plan = todo.map(() => []);
+    for (let j=0, t=0, base=0; j<PREVIEW_BLOCKS; j++){
+      const x = (j + uniform()) * total / PREVIEW_BLOCKS;
+      while (t < data.length - 1 && x >= base + data[t]){ base += data[t]; t++; }
+      const i = todo[t], f = files[i], h = heads.get(i).bytes;
+      plan[t].push(Math.max(h, Math.min(f.size - PREVIEW_BLOCK_BYTES, Math.round(h + x - base))));
+    }
+    const cores = navigator.hardwareConcurrency || 4;
+    const per = Math.ceil(PREVIEW_BLOCKS / Math.min(cores, 4));
+    const jobs = [];
+    plan.forEach((at, t) => {
+      for (let k=0;k<at.length;k+=per) jobs.push({t, at: at.slice(k, k + per)});
+    });
+    const pool = workerPool(await workerScriptUrl(), Math.min(cores, jobs.length));
+    let replies;
+    try{
+      replies = await Promise.all(jobs.map(({t, at}) => pool.run({
+        task: "sample", header: heads.get(todo[t]).header, opts,
+        blocks: at.map(a => files[todo[t]].slice(a, a + PREVIEW_BLOCK_BYTES))})));
+    } finally {
+      pool.terminate();
+    }
+    const blocks = [];
+    let rejected = 0;
+    replies.forEach((m, k) => m.blocks.forEach((b, n) => {
+      if (b) blocks.push({...b, file: todo[jobs[k].t], at: jobs[k].at[n]});
+      else rejected++;
+    }));
+    if (!blocks.length) throw new Error("no sample block could be parsed");
+
+    // per block: common strata into one partial (scaled up), rare ones into another (counted as is)
+    const seen = new Map();
+    for (const b of blocks) for (const st of b.strata) seen.set(st.key, (seen.get(st.key) || 0) + 1);
+    for (const b of blocks){
+      b.partial = initDashboard(opts);
+      b.rare = null;
+      for (const st of b.strata){
+        if (seen.get(st.key) >= PREVIEW_RARE_BLOCKS) mergeDashboardPartials(b.partial, st.partial);
+        else mergeDashboardPartials(b.rare || (b.rare = initDashboard(opts)), st.partial);
+        delete st.partial;
+      }
+    }
+
+    const exact = initDashboard(opts);
+    partials.forEach(part => { if (part) mergeDashboardPartials(exact, part); });
+    return {opts, files, heads, blocks, rejected, totalBytes: total, exact, done: files.map(() => [])};
+  }
+
+  // A finished file or shard: its partial joins the exact part, its blocks leave the sample.
+  function refinePreview(pv, i, start, end, partial){
+    mergeDashboardPartials(pv.exact, partial);
+    pv.done[i].push([start, end]);
+  }
+
+  // The preview state → {summary, replicates, fpc, ...} for the bytes not scanned yet, or null
+  // when no sample block is left among them.
+  function previewScan(pv){
+    const blocks = pv.blocks.filter(b => !pv.done[b.file].some(([a, e]) => b.at >= a && b.at < e));
+    let population = pv.totalBytes;
+    pv.done.forEach((ranges, i) => {
+      const h = pv.heads.has(i) ? pv.heads.get(i).bytes : 0;
+      for (const [a, e] of ranges) population -= e - Math.max(a, h);
+    });
+    if (!blocks.length || population <= 0) return null;
+    return {...previewSummaries(pv.opts, pv.exact, blocks, population), blocks: blocks.length,
+            exactShare: 1 - population / pv.totalBytes};
+  }
+
+  // ProductCode × LineItemType strata of the whole sample: estimated net (as sampled for rare
+  // strata), 95% half-width (null for rare strata) and the blocks each was seen in, largest first.
+  function previewStrata(pv){
+    const G = Math.min(PREVIEW_GROUPS, pv.blocks.length);
+    const sampled = pv.blocks.reduce((t, b) => t + b.bytes, 0);
+    const groupBytes = new Array(G).fill(0);
+    const strata = new Map();
+    pv.blocks.forEach((b, k) => {
+      groupBytes[k % G] += b.bytes;
+      for (const {key, net} of b.strata){
+        let s = strata.get(key);
+        if (!s) strata.set(key, s = {key, net: 0, seen: 0, groups: new Array(G).fill(0)});
+        s.net += net;
+        s.seen++;
+        s.groups[k % G] += net;
+      }
+    });
+    const fpc = Math.max(0, 1 - sampled / pv.totalBytes);
+    return Array.from(strata.values(), s => {
+      const [productCode, lineType] = s.key.split("\t");
+      if (s.seen < PREVIEW_RARE_BLOCKS) return {productCode, lineType, net: s.net, seen: s.seen, ci: null};
+      const reps = s.groups.map((v, g) => (s.net - v) * pv.totalBytes / (sampled - groupBytes[g]));
+      return {productCode, lineType, net: s.net * pv.totalBytes / sampled, seen: s.seen,
+              ci: G > 1 ? jackknifeHalfWidth(reps, fpc) : null};
+    }).sort((a, b) => Math.abs(b.net) - Math.abs(a.net));
+  }
+
+  const jackknifeHalfWidth = (reps, fpc) => {
+    const G = reps.length;
+    const mean = reps.reduce((t, v) => t + v, 0) / G;
+    const ss = reps.reduce((t, v) => t + (v - mean) * (v - mean), 0);
+    return PREVIEW_Z * Math.sqrt((G - 1) / G * ss * fpc);
+  };
+
+  // Numeric figures of a dashboard result by name ("totalBill", "ptRows.2.monthlySavings", …).
+  function resultFigures(res){
+    const out = {};
+    for (const [k, v] of Object.entries(res)) if (typeof v === "number") out[k] = v;
+    for (const t of ["ptRows", "spotScenario"]){
+      res[t].forEach((r, i) => {
+        for (const [k, v] of Object.entries(r)) if (typeof v === "number") out[`${t}.${i}.${k}`] = v;
+      });
+    }
+    return out;
+  }
+
+  // 95% half-widths of a preview result's figures, from its jackknife replicates' results.
+  function previewIntervals(reps, fpc){
+    if (reps.length < 2) return null;
+    const figs = reps.map(resultFigures);
+    const ci = {};
+    for (const k of Object.keys(figs[0])) ci[k] = jackknifeHalfWidth(figs.map(f => f[k] ?? 0), fpc);
+    return ci;
+  }
+
+  const CUR_FILE = /\.(csv|csv\.gz|zip)$/i;
+
+  // Selected files / folder → CUR part files. With a delivery folder, the period-level
+  // *Manifest.json files decide which parts belong to the current assembly of each period.
+  async function resolveInputFiles(list){
+    const all = Array.from(list || []);
+    const pathOf = (f) => f.webkitRelativePath || f.name;
+    const dirOf = (path) => path.includes("/") ? path.replace(/\/[^/]*$/, "") : "";
+    const manifests = all.filter(f => /Manifest\.json$/.test(f.name));
+    if (!manifests.length) return all.filter(f => CUR_FILE.test(f.name));
+
+    const byPath = new Map(all.map(f => [pathOf(f), f]));
+    manifests.sort((a,b) => (pathOf(a).split("/").length - pathOf(b).split("/").length) || (pathOf(a) < pathOf(b) ? -1 : 1));
+    const periodsSeen = new Set();
+    const seen = new Set();
+    const out = [];
+    for (const m of manifests){
+      let doc;
+      try{ doc = JSON.parse(await m.text()); } catch (e){ continue; }
+      const bp = doc.billingPeriod;
+      const key = bp ? `${bp.start}|${bp.end}` : dirOf(pathOf(m));
+      if (periodsSeen.has(key)) continue;
+      periodsSeen.add(key);
+
+      const dir = dirOf(pathOf(m));
+      for (const k of (doc.reportKeys || doc.dataFiles || [])){
+        const parts = k.replace(/^s3:\/\/[^/]+\//, "").split("/");
+        let f = null;
+        for (let i=0;i<parts.length && !f;i++) f = byPath.get((dir ? dir + "/" : "") + parts.slice(i).join("/")) || null;
+        if (!f) throw new Error(`${pathOf(m)}: part ${k} not found in the selected folder`);
+        if (!seen.has(f)){ seen.add(f); out.push(f); }
+      }
+    }
+    return out;
+  }
+
+  // -----------------------------
+  // Time series: daily or hourly, downsampled to the chart's width. A year of hourly data is
+  // 8,760 points per series; only ~2 per horizontal pixel of the visible x-range are drawn, and
+  // zooming or panning re-samples the new window from the full series.
+  // -----------------------------
+  const SERIES_POINTS_PER_PX = 2;
+
+  // Largest-Triangle-Three-Buckets over xs[lo..hi): indices of at most n points keeping the
+  // line's visual shape (first and last always kept; each bucket keeps the point spanning the
+  // largest triangle with its neighbours, so spikes survive).
+  function lttb(xs, ys, lo, hi, n){
+    const len = hi - lo;
+    if (len <= n || n < 3){
+      const all = new Array(len);
+      for (let i=0;i<len;i++) all[i] = lo + i;
+      return all;
+    }
+    const out = [lo];
+    const size = (len - 2) / (n - 2);
+    let a = lo;
+    for (let b=0;b<n-2;b++){
+      const start = lo + 1 + Math.floor(b * size);
+      const end = lo + 1 + Math.floor((b + 1) * size);
+      // average of the next bucket (the last point for the final bucket)
+      const nStart = end, nEnd = Math.min(hi - 1, lo + 1 + Math.floor((b + 2) * size));
+      let ax = 0, ay = 0;
+      if (nEnd > nStart){
+        for (let i=nStart;i<nEnd;i++){ ax += xs[i]; ay += ys[i]; }
+        ax /= nEnd - nStart; ay /= nEnd - nStart;
+      } else {
+        ax = xs[hi - 1]; ay = ys[hi - 1];
+      }
+      let best = start, bestArea = -1;
+      for (let i=start;i<end;i++){
+        const area = Math.abs((xs[a] - ax) * (ys[i] - ys[a]) - (xs[a] - xs[i]) * (ay - ys[a]));
+        if (area > bestArea){ bestArea = area; best = i; }
+      }
+      out.push(best);
+      a = best;
+    }
+    out.push(hi - 1);
+    return out;
+  }
+
+  // First index with xs[i] >= x (xs ascending).
+  function lowerBound(xs, x){
+    let lo = 0, hi = xs.length;
+    while (lo < hi){
+      const mid = (lo + hi) >> 1;
+      if (xs[mid] < x) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  // Plotly reports date ranges as "YYYY-MM-DD HH:MM:SS.sss" in the axis' (UTC) frame.
+  const axisTime = (v) => typeof v === "number" ? v : Date.parse(String(v).replace(" ", "T").slice(0, 23) + "Z");
+
+  let seriesView = null;   // {x, t, traces, points, inView}: the full series currently charted
+
+  function seriesOf(res, hourly){
+    const traces = hourly ? [
+      {name:"Variable spend", y: res.hourlyVarY},
+      {name:"Compute On-Demand equivalent (SP-eligible)", y: res.hourlyComputeY, line:{dash:"dot"}}
+    ] : [
+      {name:"Normalized daily spend", y: res.dailyNormY},
+      {name:"Variable usage only", y: res.dailyVarY, line:{dash:"dot"}}
+    ];
+    const x = hourly ? res.hourlyX.map(h => h + ":00") : res.dailyX;
+    return {x, t: x.map(v => Date.parse(v + (hourly ? ":00Z" : ""))), traces};
+  }
+
+  // Downsampled traces for the x-window [t0, t1] (the whole series when omitted).
+  function windowTraces(v, t0, t1, width){
+    const n = Math.max(64, Math.round(width * SERIES_POINTS_PER_PX));
+    const lo = t0 === undefined ? 0 : Math.max(0, lowerBound(v.t, t0) - 1);
+    const hi = t1 === undefined ? v.t.length : Math.min(v.t.length, lowerBound(v.t, t1) + 1);
+    v.points = 0;
+    v.inView = (hi - lo) * v.traces.length;
+    return v.traces.map(tr => {
+      const idx = lttb(v.t, tr.y, lo, hi, n);
+      v.points += idx.length;
+      return {x: idx.map(i => v.x[i]), y: idx.map(i => tr.y[i]), type:"scatter", mode:"lines", name: tr.name, line: tr.line};
+    });
+  }
+
+  function renderSeries(res){
+    const hourly = document.getElementById("seriesRes").value === "hourly";
+    const clip = document.getElementById("seriesClip").checked;
+    const v = seriesView = seriesOf(res, hourly);
+    const el = document.getElementById("chartDaily");
+    const width = el.clientWidth || 1000;
+
+    // clip so outlier postings (e.g., day-1 fees) don't dominate; p95 of the full series (from the scan)
+    const ymax = Math.max(1, (hourly ? res.hourlyP95 : res.dailyP95) * 1.25);
+    const marks = hourly || previewing() ? [] : spikeMarkers(res.spikes, clip ? ymax : Infinity);
+    const unit = hourly ? "€ / hour" : "€ / day";
+    const layout = {
+      title: (hourly ? "Hourly Spend & Compute Usage" : "Normalized Daily Spend (Run-rate view)") +
+        (previewing() ? ESTIMATE : "") + (hourly && filtered() ? UNFILTERED : ""),
+      height:360, margin:{l:50,r:20,t:55,b:45},
+      template:"plotly_white",
+      uirevision: hourly ? "hourly" : "daily",
+      yaxis: clip ? {range:[0, ymax], title:`${unit} (clipped view)`} : {autorange:true, title:unit}
+    };
+    Object.assign(v, {hourly, clip, marks});
+    plot("chartDaily", windowTraces(v, undefined, undefined, width).concat(marks), layout,
+         {displaylogo:false, modeBarButtons:[["zoom2d","pan2d","resetScale2d"]]}).then(bindSeriesZoom);
+    seriesNote(hourly, clip, v);
+  }
+
+  // Zooming or panning re-samples the shown series for the new x-window. Bound once per chart
+  // element (Plotly.react keeps it), so it works on whichever view is current.
+  function bindSeriesZoom(gd){
+    if (!gd || !gd.on || gd.curSeriesZoom) return;
+    gd.curSeriesZoom = true;
+    gd.on("plotly_relayout", (ev) => {
+      const v = seriesView;
+      if (!v) return;
+      let t0, t1;
+      if (ev["xaxis.range[0]"] !== undefined){
+        t0 = axisTime(ev["xaxis.range[0]"]);
+        t1 = axisTime(ev["xaxis.range[1]"]);
+      } else if (Array.isArray(ev["xaxis.range"])){
+        [t0, t1] = ev["xaxis.range"].map(axisTime);
+      } else if (!ev["xaxis.autorange"]){
+        return;   // y-only change
+      }
+      const data = windowTraces(v, t0, t1, gd.clientWidth || 1000).concat(v.marks);
+      drawn.delete(gd.id);   // no longer the full-range traces plot() drew
+      Plotly.react(gd, data, gd.layout);
+      seriesNote(v.hourly, v.clip, v);
+    });
+  }
+
+  // Spike days as markers on the variable-spend line (pinned to the top edge when clipped).
+  function spikeMarkers(spikes, ymax){
+    if (!spikes.days.length) return [];
+    return [{
+      x: spikes.days.map(s => s.day), y: spikes.days.map(s => Math.min(s.value, ymax)),
+      type:"scatter", mode:"markers", name:"Spike (robust z > 3.5)", cliponaxis:false,
+      marker:{symbol:"triangle-up", size:11, color:"#d62728"},
+      text: spikes.days.map(s => `${eur(s.value,0)} · +${eur(s.excess,0)} vs typical day` +
+        (s.contributors.length ? `<br>${esc(s.contributors[0].service)} +${eur(s.contributors[0].excess,0)}` : "")),
+      hovertemplate:"%{x}<br>%{text}<extra></extra>"
+    }];
+  }
+
+  function renderSpikes(spikes){
+    document.getElementById("spikeCard").style.display = spikes.days.length && !previewing() ? "" : "none";
+    document.getElementById("spikeNote").innerHTML =
+      `Typical day ${eur(spikes.median,0)} of variable spend (median; MAD ${eur(spikes.mad,0)}). ` +
+      `Days above ${eur(spikes.threshold,0)} are flagged, largest excess first; contributors are the ` +
+      `services furthest above their own median day.`;
+    renderTable("spikeBody", spikes.days, s => `
+      <tr>
+        <td>${s.day}</td>
+        <td style="text-align:right">${eur(s.value,0)}</td>
+        <td style="text-align:right">+${eur(s.excess,0)}</td>
+        <td style="text-align:right">${s.z.toFixed(1)}</td>
+        <td>${s.contributors.map(c => `${esc(c.service)} <span class="sub">+${eur(c.excess,0)} (${pct(s.excess > 0 ? c.excess/s.excess : 0,0)})</span>`).join("<br>")}</td>
+      </tr>
+    `);
+  }
+
+  function seriesNote(hourly, clip, v){
+    const parts = [];
+    if (previewing()) parts.push("Preview: the series is scaled up from sampled blocks, so single days and hours are rough; spend spikes are flagged once the exact scan is done.");
+    if (clip) parts.push(`Chart uses a <b>clipped Y-axis</b> (p95×1.25) to keep the ${hourly ? "hourly" : "daily"} run-rate readable and avoid one-off postings dominating the view.`);
+    if (hourly) parts.push("Hourly view: fixed fees (RI / SP fees, support, tax…) are left out; the dotted line is SP-eligible compute at public On-Demand rates.");
+    if (hourly && !v.traces[0].y.some(y => y)) parts.push("This report carries no hourly data; regenerate it to get the hourly view.");
+    if (hourly && filtered()) parts.push("<b>The hourly series is not narrowed by the drill-down selection</b>: the index has no hourly cells.");
+    if (v.points < v.inView) parts.push(`Showing ${v.points.toLocaleString()} of ${v.inView.toLocaleString()} points in view (LTTB-downsampled); zoom in for full detail.`);
+    document.getElementById("dailyNote").innerHTML = parts.join(" ");
+  }
+
+  // -----------------------------
+  // Rendering
+  // -----------------------------
+  // Parts of the page that depend on the scan only (charts, period table, Spot KPIs).
+  function renderScan(res){
+    document.getElementById("kpiGrid").style.display = "";
+    document.getElementById("infoGrid").style.display = "";
+    document.getElementById("chartsGrid").style.display = "";
+
+    // Per-period breakdown (only meaningful with several billing periods)
+    const nPeriods = res.periods.length;
+    document.getElementById("periodCard").style.display = nPeriods > 1 ? "" : "none";
+    renderTable("periodBody", res.periods, r => `
+      <tr>
+        <td>${r.periodStart ? r.periodStart.toISOString().slice(0,10) : "n/a"} → ${r.periodEnd ? r.periodEnd.toISOString().slice(0,10) : "n/a"}</td>
+        <td style="text-align:right">${eur(r.totalBill,0)}</td>
+        <td style="text-align:right">${eur(r.computePublicBaseline,0)}</td>
+        <td style="text-align:right">${pct(r.observedDiscount,1)}</td>
+        <td style="text-align:right">${pct(r.currentCoverage,1)}</td>
+        <td style="text-align:right">${pct(r.spotShareCompute,2)}</td>
+      </tr>
+    `);
+
+    // Extra pools defined in the rules
+    document.getElementById("poolCard").style.display = res.pools.length ? "" : "none";
+    renderTable("poolBody", res.pools, r => `
+      <tr>
+        <td>${esc(r.name)}</td>
+        <td style="text-align:right">${eur(r.net,0)}</td>
+        <td style="text-align:right">${eur(r.publicOD,0)}</td>
+        <td style="text-align:right">${pct(res.totalBill>0 ? r.net/res.totalBill : 0,2)}</td>
+      </tr>
+    `);
+
+    renderSeries(res);
+    renderSpikes(res.spikes);
 
     // Top services chart (now below daily, full width)
-    Plotly.newPlot("chartTop", [{
+    plot("chartTop", [{
       x: res.topSvcCosts,
       y: res.topSvcNames,
       type:"bar",
       orientation:"h",
       name:"Net cost"
     }], {
-      title:"Top 10 services by Net cost",
+      title:"Top 10 services by Net cost" + (previewing() ? ESTIMATE : ""),
       height:420, margin:{l:220,r:20,t:55,b:45},
       template:"plotly_white"
     }, {displayModeBar:false});
 
-    // Pass-through table (removed Bosch retained discount)
-    document.getElementById("ptNote").textContent =
-      `Discount proxy = observed effective compute discount (${pct(res.observedDiscount,1)}). Incremental slice affected = ${pct(res.affectedSliceTotalBill,1)} of total bill.`;
-
-    document.getElementById("ptBody").innerHTML = res.ptRows.map(r => `
-      <tr>
-        <td>${Math.round(r.pt*100)}%</td>
-        <td style="text-align:right">${pct(r.discToCustomer,1)}</td>
-        <td style="text-align:right">${pct(r.overallReduction,2)}</td>
-        <td style="text-align:right">${eur(r.monthlySavings,0)}</td>
-        <td style="text-align:right">${eur(r.annualSavings,0)}</td>
-      </tr>
-    `).join("");
-
     // Spot KPIs + note (no spot-by-product chart)
     document.getElementById("spotNote").innerHTML =
       `Spot detected via <code>lineItem/UsageType</code> containing <code>SpotUsage</code> (plus Spot-like lineItem types). Current Spot share of compute is <b>${pct(res.spotShareCompute,2)}</b>.`;
 
+    const f = (key, fmt) => fig(res.ci, key, res[key], fmt);
     const spotKpis = [
-      ["Spot spend (Net)", eur(res.spotNet,2)],
-      ["Spot share of total bill", pct(res.spotShareTotal,2)],
-      ["Spot share of compute", pct(res.spotShareCompute,2)],
-      ["EC2 instance-hours proxy (BoxUsage) — Net", eur(res.ec2BoxNet,2)],
-      ["ECS/Fargate — Net", eur(res.ecsNet,2)],
-      ["Fargate Spot — Net", eur(res.fargateSpotNet,2)],
+      ["Spot spend (Net)", f("spotNet", x => eur(x,2))],
+      ["Spot share of total bill", f("spotShareTotal", x => pct(x,2))],
+      ["Spot share of compute", f("spotShareCompute", x => pct(x,2))],
+      ["EC2 instance-hours proxy (BoxUsage) — Net", f("ec2BoxNet", x => eur(x,2))],
+      ["ECS/Fargate — Net", f("ecsNet", x => eur(x,2))],
+      ["Fargate Spot — Net", f("fargateSpotNet", x => eur(x,2))],
     ];
     document.getElementById("spotKpiGrid").innerHTML = spotKpis.map(([k,v]) =>
       `<div class="card third"><div class="note">${k}</div><div style="font-size:22px;font-weight:800">${v}</div></div>`
     ).join("");
+  }
+
+  // Parts that depend on the scenario parameters; cheap enough to redraw on every keystroke.
+  function renderScenarios(res, fileName){
+    shown = res;
+    document.getElementById("tablesExport").style.display = "";
+    // KPIs (several billing periods → monthly averages)
+    const nPeriods = res.periods.length;
+    const f = (key, fmt) => fig(res.ci, key, res[key], fmt);
+    const kpis = [
+      [nPeriods > 1 ? `Avg monthly AWS bill (${nPeriods} periods)` : "Total monthly AWS bill", f("totalBill", x => eur(x, 2))],
+      ["Compute OD baseline (SP-eligible)", f("computePublicBaseline", x => eur(x, 2))],
+      ["Compute actual cost (SP-eligible)", f("computeActualCost", x => eur(x, 2))],
+      ["Compute share of total bill", f("computeShareTotal", x => pct(x, 1))],
+      ["Observed effective compute discount", f("observedDiscount", x => pct(x, 1))],
+      ["Current SP coverage (OD-basis)", f("currentCoverage", x => pct(x, 1))],
+      ["Proposed additional coverage", pct(res.addCoverage, 1)],
+      ["Target coverage (OD-basis)", f("targetCoverage", x => pct(x, 1))],
+      ["Incremental SP commitment (OD-equiv)", f("incrementalCommitmentOD", x => eur(x, 2))],
+      ["Total-bill slice affected (compute share × add)", f("affectedSliceTotalBill", x => pct(x, 1))]
+    ];
+
+    document.getElementById("kpiGrid").innerHTML = kpis.map(([k,v]) =>
+      `<div class="card kpi"><div class="k">${k}</div><div class="v">${v}</div></div>`
+    ).join("");
+
+    // SP explanation
+    const ps = res.periodStart ? res.periodStart.toISOString().slice(0,10) : "n/a";
+    const pe = res.periodEnd ? res.periodEnd.toISOString().slice(0,10) : "n/a";
+    document.getElementById("spExplain").innerHTML = `
+      <b>SP sizing logic (CUR-backed):</b>
+      Compute universe = ProductCode ∈ {AmazonEC2, AmazonECS, AWSFargate, AWSLambda} and LineItemType ∈ Usage / SavingsPlanCoveredUsage / SavingsPlanNegation.
+      Underwriting baseline uses <code>pricing/publicOnDemandCost</code>.
+      Current SP coverage = OD-baseline of SavingsPlanCoveredUsage ÷ OD-baseline of total compute usage.
+      <br/><br/>
+      <b>Incremental +${Math.round(res.addCoverage*100)}% coverage:</b>
+      commitment sized as ${pct(res.addCoverage,1)} × compute OD baseline (= ${eur(res.incrementalCommitmentOD,2)}).
+      Only ${pct(res.affectedSliceTotalBill,1)} of the total bill is affected by this incremental move (compute share × additional coverage).
+      <br/><br/>
+      <span class="badge">Input: ${esc(fileName)}</span> <span class="badge">Billing period: ${ps} → ${pe}</span>
+      ${nPeriods > 1 ? `<span class="badge">${nPeriods} billing periods (figures are monthly averages)</span>` : ""}
+    `;
+
+    // Pass-through table (removed Bosch retained discount)
+    document.getElementById("ptNote").textContent =
+      `Discount proxy = observed effective compute discount (${pct(res.observedDiscount,1)}). Incremental slice affected = ${pct(res.affectedSliceTotalBill,1)} of total bill.`;
+
+    renderTable("ptBody", res.ptRows, (r, i) => `
+      <tr>
+        <td>${Math.round(r.pt*100)}%</td>
+        <td style="text-align:right">${fig(res.ci, `ptRows.${i}.discToCustomer`, r.discToCustomer, x => pct(x,1))}</td>
+        <td style="text-align:right">${fig(res.ci, `ptRows.${i}.overallReduction`, r.overallReduction, x => pct(x,2))}</td>
+        <td style="text-align:right">${fig(res.ci, `ptRows.${i}.monthlySavings`, r.monthlySavings, x => eur(x,0))}</td>
+        <td style="text-align:right">${fig(res.ci, `ptRows.${i}.annualSavings`, r.annualSavings, x => eur(x,0))}</td>
+      </tr>
+    `);
 
     // Spot scenarios table
     document.getElementById("spotScTitle").textContent =
       `Spot adoption scenarios (conservative ${Math.round(res.spotDisc*100)}% Spot discount)`;
 
-    document.getElementById("spotBody").innerHTML = res.spotScenario.map(s => `
+    renderTable("spotBody", res.spotScenario, (s, i) => `
       <tr>
         <td>${Math.round(s.a*100)}%</td>
-        <td style="text-align:right">${eur(s.savEC2,0)}</td>
-        <td style="text-align:right">${pct(s.overallEC2,2)}</td>
-        <td style="text-align:right">${eur(s.savECS,0)}</td>
-        <td style="text-align:right">${pct(s.overallECS,2)}</td>
+        <td style="text-align:right">${fig(res.ci, `spotScenario.${i}.savEC2`, s.savEC2, x => eur(x,0))}</td>
+        <td style="text-align:right">${fig(res.ci, `spotScenario.${i}.overallEC2`, s.overallEC2, x => pct(x,2))}</td>
+        <td style="text-align:right">${fig(res.ci, `spotScenario.${i}.savECS`, s.savECS, x => eur(x,0))}</td>
+        <td style="text-align:right">${fig(res.ci, `spotScenario.${i}.overallECS`, s.overallECS, x => pct(x,2))}</td>
       </tr>
-    `).join("");
+    `);
+
+    renderCandidates(res);
+    renderCommitment(res);
+  }
+
+  const POOL_LABELS = {ec2Box: "EC2 BoxUsage", ecs: "ECS/Fargate"};
+
+  function renderCandidates(res){
+    const r = res.resources;
+    const poolNet = {ec2Box: res.ec2BoxNet, ecs: res.ecsNet};
+    document.getElementById("candCard").style.display = res.spotCandidates.length && !previewing() ? "" : "none";
+    const pools = Object.keys(POOL_LABELS).filter(k => r[k].distinctResources || r[k].instanceTypes.length);
+    document.getElementById("candNote").innerHTML = (filtered()
+      ? "<b>Whole CUR, not narrowed by the drill-down selection</b>: the index keeps no resource IDs. " : "") + pools.map(k => {
+      const types = r[k].instanceTypes.slice(0, 5).map(t => `${esc(t.id)} ${eur(t.net,0)}`).join(", ");
+      return `<b>${POOL_LABELS[k]}</b>: ~${r[k].distinctResources.toLocaleString()} distinct resources` +
+        (types ? `; top instance types ${types}` : "") + ".";
+    }).join(" ") + ` Savings assume the whole resource moves to Spot at ${pct(res.spotDisc,0)} off. ` +
+      `Costs are upper bounds from a bounded top-${RESOURCE_TOPK} summary; a resource's cost may be ` +
+      `overstated by at most the “±” shown.`;
+    renderTable("candBody", res.spotCandidates, (c, i) => `
+      <tr>
+        <td>${i + 1}</td>
+        <td><code>${esc(c.id)}</code></td>
+        <td>${POOL_LABELS[c.pool]}</td>
+        <td>${esc(c.instanceType || "—")}</td>
+        <td style="text-align:right">${eur(c.net,0)}${c.overcount >= 0.5 ? ` <span class="sub">±${eur(c.overcount,0)}</span>` : ""}</td>
+        <td style="text-align:right">${pct(poolNet[c.pool] > 0 ? c.net / poolNet[c.pool] : 0,2)}</td>
+        <td style="text-align:right">${eur(c.savings,0)}</td>
+      </tr>
+    `);
+  }
+
+  // Hourly SP commitment: the optimum, the load-duration curve with the optimal level, and net
+  // savings / utilization along the commitment axis.
+  function renderCommitment(res){
+    const c = res.commitment, o = c.optimum;
+    const nPeriods = res.periods.length;
+    if (!c.hours){
+      document.getElementById("commitNote").textContent =
+        "No hourly SP-eligible usage (lineItem/UsageStartDate) in this scan, so there is no load-duration curve to optimize.";
+      document.getElementById("commitKpiGrid").innerHTML = "";
+      return;
+    }
+    document.getElementById("commitNote").innerHTML = (filtered()
+      ? "<b>Whole CUR, not narrowed by the drill-down selection</b>: the index has no hourly cells. " : "") +
+      `SP-eligible compute at public On-Demand rates over ${c.hours.toLocaleString()} hours, sorted into a load-duration curve. ` +
+      `At a ${pct(c.spDiscount,1)} SP discount, a commitment pays for itself on the usage level present in at least ` +
+      `${pct(1 - c.spDiscount,1)} of the hours; that level is the optimum. ` +
+      `The flat sizing above targets ${pct(res.targetCoverage,1)} coverage; the hourly optimum covers <b>${pct(o.coverage,1)}</b>.`;
+    const kpis = [
+      ["Optimal hourly commitment (SP rates)", `${eur(o.commitment,2)} / h`],
+      ["On-Demand equivalent per hour", `${eur(o.commitmentOD,2)} / h`],
+      [nPeriods > 1 ? "Net savings vs On-Demand (avg / month)" : "Net savings vs On-Demand / month", eur(o.savings,0)],
+      ["Utilization at the optimum", pct(o.utilization,1)],
+      ["Coverage at the optimum (OD basis)", pct(o.coverage,1)],
+      ["Current SP coverage (OD basis)", pct(res.currentCoverage,1)]
+    ];
+    document.getElementById("commitKpiGrid").innerHTML = kpis.map(([k,v]) =>
+      `<div class="card" style="grid-column:span 4"><div class="note">${k}</div><div style="font-size:20px;font-weight:750">${v}</div></div>`
+    ).join("");
+
+    const ld = c.loadDuration;
+    plot("chartLoadDuration", [
+      {x: ld.share.map(s => s * 100), y: ld.level, type:"scatter", mode:"lines", name:"SP-eligible OD / hour", fill:"tozeroy"},
+      {x: [0, 100], y: [o.commitmentOD, o.commitmentOD], type:"scatter", mode:"lines", name:"Optimal commitment (OD equiv.)",
+       line:{dash:"dash"}}
+    ], {
+      title:"Load-duration curve" + (previewing() ? ESTIMATE : "") + (filtered() ? UNFILTERED : ""), height:340, margin:{l:60,r:20,t:55,b:50},
+      template:"plotly_white", showlegend:true, legend:{orientation:"h", y:-0.25},
+      xaxis:{title:"Share of hours (%)"}, yaxis:{title:"€ / hour (On-Demand)"}
+    }, {displayModeBar:false});
+    plot("chartCommitCurve", [
+      {x: c.curve.commitmentOD, y: c.curve.savings, type:"scatter", mode:"lines", name:"Net savings / month"},
+      {x: c.curve.commitmentOD, y: c.curve.utilization.map(u => u * 100), type:"scatter", mode:"lines",
+       name:"Utilization (%)", yaxis:"y2", line:{dash:"dot"}},
+      {x: [o.commitmentOD], y: [o.savings], type:"scatter", mode:"markers", name:"Optimum", marker:{size:10}}
+    ], {
+      title:"Savings and utilization by commitment" + (previewing() ? ESTIMATE : "") + (filtered() ? UNFILTERED : ""), height:340, margin:{l:60,r:60,t:55,b:50},
+      template:"plotly_white", showlegend:true, legend:{orientation:"h", y:-0.25},
+      xaxis:{title:"Commitment (On-Demand equivalent € / hour)"}, yaxis:{title:"€ / month"},
+      yaxis2:{title:"Utilization (%)", overlaying:"y", side:"right", range:[0, 105]}
+    }, {displayModeBar:false});
+  }
+
+  // Scenario sweep heatmaps: SP savings over coverage × pass-through, Spot savings over adoption ×
+  // discount, and their sum over coverage × adoption (selected pass-through, Spot discount input).
+  // The dashed contour is the break-even line where a surface reaches the target savings.
+  // The sweep is rebuilt only for new metrics or a new pass-through list, and a heatmap is only
+  // handed to plot() again when its sweep, target or slice changed.
+  let sweep = null;   // + m: the metrics it was built from, ms: build time, id: build count
+  let sweepBuilds = 0;
+  const sweepShown = new Map();   // heatmap id → key of the sweep, target and slice it shows
+  function renderSweep(m, opts){
+    const rebuild = !sweep || sweep.m !== m || String(sweep.axes.passThrough) !== String(opts.passThrough);
+    if (rebuild){
+      const t0 = performance.now();
+      sweep = sweepScenarios(m, opts.passThrough);
+      Object.assign(sweep, {m, ms: performance.now() - t0, id: ++sweepBuilds});
+    }
+    const {axes, sp, spotEC2, spotECS, total} = sweep;
+    const C = axes.addCoverage.length, P = axes.passThrough.length;
+    const D = axes.spotDiscount.length, A = axes.spotAdoption.length;
+
+    const sel = document.getElementById("sweepPt");
+    const prev = parseInt(sel.value, 10);
+    const j = prev >= 0 && prev < P ? prev : P - 1;
+    if (rebuild) sel.innerHTML = axes.passThrough.map((pt, k) => `<option value="${k}">${Math.round(pt*100)}%</option>`).join("");
+    sel.value = String(j);
+    const c = Math.round(Math.max(0, Math.min(1, opts.addCoverage)) * (C - 1));
+    const d = Math.min(D - 1, Math.round(opts.spotDiscount * 20));
+    const typed = parseFloat(document.getElementById("sweepTarget").value);
+    const target = isFinite(typed) ? typed : sp[c*P + j];
+
+    const pcts = (v) => v.map(x => Math.round(x * 100));
+    const grid = (rows, cols, f) => Array.from({length: rows}, (_, r) => Array.from({length: cols}, (_, k) => f(r, k)));
+    const stale = (id, slice) => {
+      const key = `${sweep.id} ${target} ${slice}`;
+      if (drawn.has(id) && sweepShown.get(id) === key) return false;
+      sweepShown.set(id, key);
+      return true;
+    };
+    if (stale("chartSweepSP", "")){
+      sweepHeatmap("chartSweepSP", pcts(axes.addCoverage), pcts(axes.passThrough), grid(P, C, (r, k) => sp[k*P + r]),
+                   target, "SP savings / month", "Additional SP coverage (%)", "Pass-through (%)");
+    }
+    if (stale("chartSweepSpot", "")){
+      sweepHeatmap("chartSweepSpot", pcts(axes.spotAdoption), pcts(axes.spotDiscount),
+                   grid(D, A, (r, k) => spotEC2[r*A + k] + spotECS[r*A + k]),
+                   target, "Spot savings / month (EC2 + ECS/Fargate)", "Shift to Spot (%)", "Spot discount (%)");
+    }
+    if (stale("chartSweepTotal", `${j} ${d}`)){
+      sweepHeatmap("chartSweepTotal", pcts(axes.addCoverage), pcts(axes.spotAdoption),
+                   grid(A, C, (r, k) => total[((k*P + j)*D + d)*A + r]), target,
+                   `SP + Spot savings / month (pass-through ${Math.round(axes.passThrough[j]*100)}%, Spot discount ${Math.round(axes.spotDiscount[d]*100)}%)`,
+                   "Additional SP coverage (%)", "Shift to Spot (%)");
+    }
+
+    document.getElementById("sweepNote").textContent =
+      `${(C*P*D*A).toLocaleString()} scenarios evaluated in ${fmtMs(sweep.ms)}. Break-even line at ${eur(target,0)} / month ` +
+      (isFinite(typed) ? "(target)" : `(current SP plan: +${c}% coverage at ${Math.round(axes.passThrough[j]*100)}% pass-through)`) +
+      ". SP and Spot savings are added as independent levers, as in the tables above." +
+      (previewing() ? " Preview: the surfaces are drawn from the sampled estimate." : "");
+  }
+
+  function sweepHeatmap(id, x, y, z, target, title, xTitle, yTitle){
+    const data = [{type:"heatmap", x, y, z, colorscale:"Viridis", colorbar:{title:"€ / mo", thickness:12},
+                   hovertemplate:`${xTitle}: %{x}<br>${yTitle}: %{y}<br>€%{z:,.0f} / month<extra></extra>`}];
+    if (target > 0){
+      data.push({type:"contour", x, y, z, autocontour:false, showscale:false, hoverinfo:"skip", name:"Break-even",
+                 contours:{coloring:"none", start:target, end:target, size:1},
+                 line:{color:"#ffffff", width:2, dash:"dash"}});
+    }
+    plot(id, data, {
+      title, height:340, margin:{l:60,r:20,t:55,b:50},
+      template:"plotly_white",
+      xaxis:{title:xTitle}, yaxis:{title:yTitle}
+    }, {displayModeBar:false});
+  }
+
+  function exportSweep(){
+    if (!sweep) return;
+    const {axes, totalBill, sp, spotEC2, spotECS, total} = sweep;
+    const {addCoverage: cov, passThrough: pt, spotDiscount: sd, spotAdoption: sa} = axes;
+    const P = pt.length, D = sd.length, A = sa.length;
+    const parts = [SWEEP_CSV_COLUMNS.join(",") + "\n"];
+    const lines = [];
+    let o = 0;
+    for (let c=0;c<cov.length;c++) for (let p=0;p<P;p++){
+      for (let d=0;d<D;d++) for (let a=0;a<A;a++, o++){
+        const t = total[o];
+        lines.push(`${cov[c]},${pt[p]},${sd[d]},${sa[a]},${sp[c*P + p]},${spotEC2[d*A + a]},${spotECS[d*A + a]},` +
+                   `${t},${t * 12},${totalBill > 0 ? t / totalBill : 0}\n`);
+      }
+      parts.push(lines.join(""));
+      lines.length = 0;
+    }
+    download(new Blob(parts, {type: "text/csv"}), "cur-scenario-sweep.csv");
+  }
+
+  // -----------------------------
+  // Table export: the shown result as Arrow IPC files (one per table, zipped), with the schema of
+  // cur_engine.py's export_tables / write_export (which also writes Parquet and the cube)
+  // -----------------------------
+  const EXPORT_SUMMARY_COLUMNS = [
+    "totalBill", "computePublicBaseline", "computeActualCost", "computeShareTotal", "observedDiscount",
+    "currentCoverage", "addCoverage", "targetCoverage", "incrementalCommitmentOD", "affectedSliceTotalBill",
+    "spotNet", "spotShareTotal", "spotShareCompute", "ec2BoxNet", "ecsNet", "fargateSpotNet", "spotDisc",
+  ];
+  const EXPORT_SCHEMA = {
+    summary: [["scope", "utf8"], ["periodStart", "timestamp"], ["periodEnd", "timestamp"],
+              ...EXPORT_SUMMARY_COLUMNS.map(c => [c, "float64"])],
+    daily: [["date", "date32"], ["variableCost", "float64"], ["normalizedCost", "float64"]],
+    hourly: [["hour", "timestamp"], ["variableCost", "float64"], ["computePublicOD", "float64"]],
+    services: [["rank", "int32"], ["service", "utf8"], ["netCost", "float64"], ["top", "bool"]],
+    passThrough: [["passThrough", "float64"], ["discToCustomer", "float64"], ["overallReduction", "float64"],
+                  ["monthlySavings", "float64"], ["annualSavings", "float64"]],
+    spotScenario: [["adoption", "float64"], ["savEC2", "float64"], ["overallEC2", "float64"],
+                   ["savECS", "float64"], ["overallECS", "float64"]],
+    pools: [["pool", "utf8"], ["net", "float64"], ["publicOD", "float64"]],
+  };
+  let shown = null;   // the result currently rendered (drill-down included)
+
+  const epochMs = (s) => {
+    const t = s ? Date.parse(s) : NaN;
+    return isNaN(t) ? null : t;
+  };
+
+  // Result → {table: {column: values}}; timestamps in ms and dates in days since the epoch (UTC).
+  function exportTables(res){
+    const table = (name, rows) => Object.fromEntries(EXPORT_SCHEMA[name].map(([c], k) => [c, rows.map(r => r[k])]));
+    const scoped = [["combined", res], ...(res.periods || []).map(p => ["period", p])];
+    return {
+      summary: table("summary", scoped.map(([scope, r]) =>
+        [scope, epochMs(r.periodStart), epochMs(r.periodEnd), ...EXPORT_SUMMARY_COLUMNS.map(c => r[c])])),
+      daily: table("daily", res.dailyX.map((d, i) =>
+        [epochMs(d + "T00:00:00Z") / (24 * 3600 * 1000), res.dailyVarY[i], res.dailyNormY[i]])),
+      hourly: table("hourly", res.hourlyX.map((h, i) =>
+        [epochMs(h + ":00:00Z"), res.hourlyVarY[i], res.hourlyComputeY[i]])),
+      services: table("services", res.svcNames.map((n, i) => [i + 1, n, res.svcCosts[i], i < TOP_SERVICES])),
+      passThrough: table("passThrough", res.ptRows.map(r =>
+        [r.pt, r.discToCustomer, r.overallReduction, r.monthlySavings, r.annualSavings])),
+      spotScenario: table("spotScenario", res.spotScenario.map(r => [r.a, r.savEC2, r.overallEC2, r.savECS, r.overallECS])),
+      pools: table("pools", res.pools.map(r => [r.name, r.net, r.publicOD])),
+    };
+  }
+
+  // Minimal FlatBuffers encoder for Arrow's IPC metadata. Objects are laid out front to back, each
+  // after whatever points at it (uoffsets only point forward). A table lists [kind, value] per field
+  // id (holes for absent fields); "off" values are fbTable / fbVector / fbString nodes.
+  const FB_SIZE = {u8: 1, bool: 1, i16: 2, i32: 4, u32: 4, i64: 8, off: 4};
+  const fbTable = (fields) => ({t: "table", fields});
+  const fbVector = (items, size = 4, align = 4) => ({t: "vector", items, size, align});   // items: nodes, or struct field lists
+  const fbString = (s) => ({t: "string", s});
+
+  function fbEncode(root){
+    let buf = new Uint8Array(1024), len = 0;
+    const reserve = (n, align = 1, before = 0) => {
+      while ((len + before) % align) len++;
+      if (len + n > buf.length){
+        const b = new Uint8Array(Math.max(2 * buf.length, len + n));
+        b.set(buf);
+        buf = b;
+      }
+      len += n;
+      return len - n;
+    };
+    const put = (kind, at, v) => {
+      const dv = new DataView(buf.buffer);
+      if (kind === "u8" || kind === "bool") dv.setUint8(at, +v);
+      else if (kind === "i16") dv.setInt16(at, v, true);
+      else if (kind === "i32") dv.setInt32(at, v, true);
+      else if (kind === "u32") dv.setUint32(at, v, true);
+      else if (kind === "i64") dv.setBigInt64(at, BigInt(v), true);
+    };
+    const pending = [];   // [slot, node]: uoffsets to patch once the node is placed
+    const place = (node) => {
+      if (node.t === "string"){
+        const bytes = new TextEncoder().encode(node.s);
+        const at = reserve(4 + bytes.length + 1, 4);
+        put("u32", at, bytes.length);
+        buf.set(bytes, at + 4);
+        return at;
+      }
+      if (node.t === "vector"){
+        const at = reserve(4 + node.size * node.items.length, Math.max(4, node.align), 4);
+        put("u32", at, node.items.length);
+        node.items.forEach((item, i) => {
+          let o = at + 4 + i * node.size;
+          if (item.t) pending.push([o, item]);
+          else for (const [kind, v] of item){
+            if (kind !== "pad") put(kind, o, v);
+            o += kind === "pad" ? v : FB_SIZE[kind];
+          }
+        });
+        return at;
+      }
+      // vtable, then the table: its soffset back to the vtable and each field aligned to its size
+      const offs = [];
+      let size = 4;
+      node.fields.forEach((f, id) => {
+        if (!f) return;
+        const s = FB_SIZE[f[0]];
+        size = Math.ceil(size / s) * s;
+        offs[id] = size;
+        size += s;
+      });
+      const vt = reserve(4 + 2 * node.fields.length, 2);
+      const at = reserve(size, 8);
+      put("i16", vt, 4 + 2 * node.fields.length);
+      put("i16", vt + 2, size);
+      node.fields.forEach((f, id) => {
+        put("i16", vt + 4 + 2 * id, f ? offs[id] : 0);
+        if (!f) return;
+        if (f[0] === "off") pending.push([at + offs[id], f[1]]);
+        else put(f[0], at + offs[id], f[1]);
+      });
+      put("i32", at, at - vt);
+      return at;
+    };
+    pending.push([reserve(4), root]);
+    while (pending.length){
+      const [slot, node] = pending.shift();
+      put("u32", slot, place(node) - slot);
+    }
+    reserve(0, 8);
+    return buf.slice(0, len);
+  }
+
+  // Arrow type unions: [Type id, fields of its table]
+  const ARROW_TYPES = {
+    float64: () => [3, [["i16", 2]]],                                       // FloatingPoint{DOUBLE}
+    int32: () => [2, [["i32", 32], ["bool", true]]],                        // Int{32, signed}
+    int64: () => [2, [["i32", 64], ["bool", true]]],
+    utf8: () => [5, []],
+    bool: () => [6, []],                                                    // Bool (bit-packed)
+    date32: () => [8, [["i16", 0]]],                                        // Date{DAY}
+    timestamp: () => [10, [["i16", 1], ["off", fbString("UTC")]]],          // Timestamp{MILLISECOND, "UTC"}
+  };
+
+  // One Arrow IPC file (schema + a single record batch), readable zero-copy by pyarrow, DuckDB, Polars…
+  function arrowFile(schema, cols){
+    const n = schema.length ? cols[schema[0][0]].length : 0;
+    const schemaNode = fbTable([["i16", 0], ["off", fbVector(schema.map(([name, type]) => {
+      const [id, fields] = ARROW_TYPES[type]();
+      return fbTable([["off", fbString(name)], ["bool", true], ["u8", id], ["off", fbTable(fields)],
+                      undefined, ["off", fbVector([])]]);
+    }))]]);
+
+    const body = [], nodes = [], buffers = [];
+    let bodyLength = 0;
+    const addBuffer = (bytes) => {
+      buffers.push([["i64", bodyLength], ["i64", bytes.byteLength]]);
+      const padded = new Uint8Array(Math.ceil(bytes.byteLength / 8) * 8);
+      padded.set(new Uint8Array(bytes.buffer, bytes.byteOffset, bytes.byteLength));
+      body.push(padded);
+      bodyLength += padded.length;
+    };
+    for (const [name, type] of schema){
+      const values = cols[name];
+      const valid = new Uint8Array(Math.ceil(n / 8));
+      let nulls = 0;
+      values.forEach((v, i) => {
+        if (v === null || v === undefined || (typeof v === "number" && isNaN(v) && type !== "float64")) nulls++;
+        else valid[i >> 3] |= 1 << (i & 7);
+      });
+      nodes.push([["i64", n], ["i64", nulls]]);
+      addBuffer(nulls ? valid : new Uint8Array(0));
+      const isNull = (i) => !(valid[i >> 3] & (1 << (i & 7)));
+      if (type === "utf8"){
+        const enc = new TextEncoder();
+        const parts = values.map((v, i) => isNull(i) ? new Uint8Array(0) : enc.encode(String(v)));
+        const offsets = new Int32Array(n + 1);
+        parts.forEach((b, i) => { offsets[i + 1] = offsets[i] + b.length; });
+        const data = new Uint8Array(offsets[n]);
+        parts.forEach((b, i) => data.set(b, offsets[i]));
+        addBuffer(offsets);
+        addBuffer(data);
+      } else if (type === "bool"){
+        const bits = new Uint8Array(Math.ceil(n / 8));
+        values.forEach((v, i) => { if (v) bits[i >> 3] |= 1 << (i & 7); });
+        addBuffer(bits);
+      } else if (type === "int64" || type === "timestamp"){
+        addBuffer(BigInt64Array.from(values, (v, i) => isNull(i) ? 0n : BigInt(Math.round(v))));
+      } else if (type === "int32" || type === "date32"){
+        addBuffer(Int32Array.from(values, (v, i) => isNull(i) ? 0 : v));
+      } else {
+        addBuffer(Float64Array.from(values, (v, i) => isNull(i) ? 0 : v));
+      }
+    }
+    const batchNode = fbTable([["i64", n], ["off", fbVector(nodes, 16, 8)], ["off", fbVector(buffers, 16, 8)]]);
+
+    // encapsulated message: continuation marker, metadata length, flatbuffer (8-byte padded), body
+    const message = (headerType, header, bodyBytes) => {
+      const meta = fbEncode(fbTable([["i16", 4], ["u8", headerType], ["off", header], ["i64", bodyBytes]]));
+      const out = new Uint8Array(8 + meta.length);
+      const dv = new DataView(out.buffer);
+      dv.setUint32(0, 0xFFFFFFFF, true);
+      dv.setInt32(4, meta.length, true);
+      out.set(meta, 8);
+      return out;
+    };
+    const magic = new TextEncoder().encode("ARROW1");
+    const parts = [new Uint8Array(8)];
+    parts[0].set(magic);
+    const schemaMsg = message(1, schemaNode, 0);          // MessageHeader.Schema
+    const batchMsg = message(3, batchNode, bodyLength);   // MessageHeader.RecordBatch
+    const batchAt = 8 + schemaMsg.length;
+    parts.push(schemaMsg, batchMsg, ...body, new Uint8Array([255, 255, 255, 255, 0, 0, 0, 0]));
+    const footer = fbEncode(fbTable([["i16", 4], ["off", schemaNode], ["off", fbVector([], 24, 8)],
+      ["off", fbVector([[["i64", batchAt], ["i32", batchMsg.length], ["pad", 4], ["i64", bodyLength]]], 24, 8)]]));
+    const tail = new Uint8Array(4 + magic.length);
+    new DataView(tail.buffer).setInt32(0, footer.length, true);
+    tail.set(magic, 4);
+    parts.push(footer, tail);
+    const out = new Uint8Array(parts.reduce((t, p) => t + p.length, 0));
+    let o = 0;
+    for (const p of parts){
+      out.set(p, o);
+      o += p.length;
+    }
+    return out;
+  }
+
+  // Uncompressed ("stored") zip of [name, bytes] entries.
+  function zipStore(entries){
+    const enc = new TextEncoder();
+    const local = [], central = [];
+    let offset = 0;
+    for (const [name, data] of entries){
+      const crc = crc32(data);
+      const fname = enc.encode(name);
+      const header = (sig, size) => {
+        const h = new DataView(new ArrayBuffer(size));
+        h.setUint32(0, sig, true);
+        return h;
+      };
+      const lh = header(0x04034b50, 30);
+      [[4, 20], [6, 0x0800], [8, 0], [10, 0], [12, 0x21]].forEach(([at, v]) => lh.setUint16(at, v, true));
+      [[14, crc], [18, data.length], [22, data.length]].forEach(([at, v]) => lh.setUint32(at, v, true));
+      lh.setUint16(26, fname.length, true);
+      const ch = header(0x02014b50, 46);
+      [[4, 20], [6, 20], [8, 0x0800], [10, 0], [12, 0], [14, 0x21]].forEach(([at, v]) => ch.setUint16(at, v, true));
+      [[16, crc], [20, data.length], [24, data.length], [42, offset]].forEach(([at, v]) => ch.setUint32(at, v, true));
+      ch.setUint16(28, fname.length, true);
+      local.push(new Uint8Array(lh.buffer), fname, data);
+      central.push(new Uint8Array(ch.buffer), fname);
+      offset += 30 + fname.length + data.length;
+    }
+    const size = central.reduce((t, p) => t + p.length, 0);
+    const end = new DataView(new ArrayBuffer(22));
+    end.setUint32(0, 0x06054b50, true);
+    end.setUint16(8, entries.length, true);
+    end.setUint16(10, entries.length, true);
+    end.setUint32(12, size, true);
+    end.setUint32(16, offset, true);
+    return new Blob([...local, ...central, new Uint8Array(end.buffer)], {type: "application/zip"});
+  }
+
+  function exportArrow(){
+    if (!shown) return;
+    const tables = exportTables(shown);
+    download(zipStore(Object.entries(tables).map(([name, cols]) => [`${name}.arrow`, arrowFile(EXPORT_SCHEMA[name], cols)])),
+             "cur-tables.zip");
   }
 
   // -----------------------------
@@ -583,75 +3964,539 @@ html = r"""<!doctype html>
   document.getElementById("generatedAt").textContent = "Loaded: " + new Date().toISOString().slice(0,16).replace("T"," ");
 
   const fileInput = document.getElementById("fileInput");
+  const folderInput = document.getElementById("folderInput");
   const runBtn = document.getElementById("runBtn");
+  let selected = [];
 
-  fileInput.addEventListener("change", () => {
-    const f = fileInput.files && fileInput.files[0];
-    document.getElementById("fileName").textContent = f ? f.name : "No file selected";
-  });
-
-  runBtn.addEventListener("click", () => {
-    const f = fileInput.files && fileInput.files[0];
-    if (!f){
-      setStatus("bad", "Please select a CUR CSV file first.");
-      return;
-    }
+  const onSelect = (input) => () => {
+    selected = Array.from(input.files || []);
+    const label = selected.length === 1 ? selected[0].name
+      : selected.length ? `${selected.length} files selected` : "No file selected";
+    document.getElementById("fileName").textContent = label;
+    showCacheBadge(0, 0);
+  };
+  fileInput.addEventListener("change", onSelect(fileInput));
+  folderInput.addEventListener("change", onSelect(folderInput));
 
+  // Scenario inputs → opts, or an error message for the status line.
+  const COMPUTE_CODES = ["AmazonEC2","AmazonECS","AWSFargate","AWSLambda"];
+  const RULES = JSON.parse(document.getElementById("curRules").textContent);
+  function readOptions(){
     const addCoverage = parseFloat(document.getElementById("addCoverage").value);
     const spotDiscount = parseFloat(document.getElementById("spotDiscount").value);
     const passThrough = parseList(document.getElementById("passThrough").value);
 
     if (!isFinite(addCoverage) || addCoverage < 0 || addCoverage > 1){
-      setStatus("bad", "Additional SP coverage must be a number between 0 and 1 (e.g., 0.30).");
-      return;
+      return {error: "Additional SP coverage must be a number between 0 and 1 (e.g., 0.30)."};
     }
     if (!isFinite(spotDiscount) || spotDiscount < 0 || spotDiscount > 0.95){
-      setStatus("bad", "Spot discount must be a number between 0 and 0.95 (e.g., 0.60).");
-      return;
+      return {error: "Spot discount must be a number between 0 and 0.95 (e.g., 0.60)."};
     }
     if (!passThrough.length){
-      setStatus("bad", "Pass-through list must contain values in (0,1], e.g., 0.3,0.5,1.0");
-      return;
+      return {error: "Pass-through list must contain values in (0,1], e.g., 0.3,0.5,1.0"};
     }
+    const spText = document.getElementById("spDiscount").value.trim();
+    const spDiscount = spText === "" ? null : parseFloat(spText);   // null → observed discount
+    if (spDiscount !== null && !(isFinite(spDiscount) && spDiscount >= 0 && spDiscount < 1)){
+      return {error: "SP discount must be a number between 0 and 1 (e.g., 0.28), or blank for the observed discount."};
+    }
+    return {opts: {addCoverage, spotDiscount, passThrough, spDiscount, computeCodes: COMPUTE_CODES, rules: RULES}};
+  }
 
-    setStatus("", "Parsing CSV… (large CURs may take a few seconds)");
-    Papa.parse(f, {
-      header: true,
-      skipEmptyLines: true,
-      worker: true,
-      complete: (results) => {
-        try{
-          const rows = results.data || [];
-          if (!rows.length){
-            setStatus("bad", "CSV parsed but contains no rows.");
-            return;
-          }
+  // Last scan summary shown on the page; parameter edits re-evaluate it without any I/O. While a
+  // sampled preview is shown, scan.preview holds its jackknife replicates.
+  let scan = null;
+  const ESTIMATE = " (estimate)";
+  const previewing = () => Boolean(scan && scan.preview);
+  const UNFILTERED = " (whole CUR, not filtered)";
+  const filtered = () => Boolean(scan && scan.filtered);
 
-          const res = computeDashboard(rows, {
-            addCoverage,
-            spotDiscount,
-            passThrough,
-            computeCodes: ["AmazonEC2","AmazonECS","AWSFargate","AWSLambda"]
-          });
+  // The shown scan's dashboard result; a preview's also carries 95% half-widths (res.ci). The
+  // intervals only cover the combined figures, so the replicates skip the per-period results.
+  function evaluateScan(opts){
+    const res = evaluateDashboard(scan.summary, opts);
+    const pv = scan.preview;
+    if (pv) res.ci = previewIntervals(pv.replicates.map(s => evaluateScenarios(s.combined, opts, s.periods.length)), pv.fpc);
+    return res;
+  }
 
-          renderAll(res, f.name);
-          setStatus("ok", "Done. Scenarios computed successfully.");
-        } catch (e){
-          console.error(e);
-          setStatus("bad", "Failed to compute dashboard. Check console for details.");
+  function showScan(summary, label, opts){
+    scan = {summary, label};
+    document.getElementById("previewCard").style.display = "none";
+    const res = phase("Evaluate scenarios", () => evaluateScan(opts));
+    phase("Render charts & scan tables", () => renderScan(res));
+    phase("Render scenario tables", () => renderScenarios(res, label));
+    phase("Scenario sweep", () => renderSweep(summary.combined, opts));
+  }
+
+  // The preview's current estimate (exact where the scan has finished, sampled elsewhere) in place
+  // of a scan; false once no sample block is left to estimate from.
+  function showPreview(pv, label){
+    const est = previewScan(pv);
+    if (!est) return false;
+    const {opts: edited, error} = readOptions();
+    const opts = error ? pv.opts : edited;
+    scan = {summary: est.summary, label, preview: est};
+    const res = evaluateScan(opts);
+    renderScan(res);
+    renderScenarios(res, label);
+    renderSweep(est.summary.combined, opts);
+
+    document.getElementById("previewCard").style.display = "";
+    document.getElementById("previewNote").innerHTML =
+      `Figures marked ≈ are estimates with 95% intervals, scaled up from ${pv.blocks.length} blocks ` +
+      `(${fmtBytes(pv.blocks.reduce((t, b) => t + b.bytes, 0))}) read evenly across ${fmtBytes(pv.totalBytes)}` +
+      (pv.rejected ? ` (${pv.rejected} unparseable blocks skipped)` : "") + `. The exact scan is running and replaces ` +
+      `them file by file: <b>${pct(est.exactShare,0)}</b> of the bytes are exact so far. Strata seen in fewer than ` +
+      `${PREVIEW_RARE_BLOCKS} blocks (typically monthly fees, tax and credits) are counted as sampled, not scaled up, ` +
+      `and their other lines are missing until then. Spend spikes, Spot candidates and drill-down wait for the exact scan.`;
+    renderTable("previewStrataBody", pv.strata.slice(0, PREVIEW_STRATA), r => `
+      <tr>
+        <td>${esc(r.productCode)}</td>
+        <td>${esc(r.lineType)}</td>
+        <td style="text-align:right">${eur(r.net,0)}</td>
+        <td style="text-align:right">${r.ci === null ? `<span class="sub">rare: as sampled</span>` : `±${eur(r.ci,0)}`}</td>
+        <td style="text-align:right">${r.seen}</td>
+      </tr>
+    `);
+    return true;
+  }
+
+  const liveUpdate = () => {
+    if (!scan) return;
+    const {opts, error} = readOptions();
+    if (error){
+      setStatus("bad", error);
+      return;
+    }
+    const t0 = performance.now();
+    renderScenarios(evaluateScan(opts), scan.label);
+    renderSweep(scan.summary.combined, opts);
+    setStatus("ok", `Scenarios updated in ${(performance.now()-t0).toFixed(1)} ms (scan reused, file not re-read).`);
+  };
+  for (const id of ["addCoverage","spotDiscount","passThrough","spDiscount"]){
+    document.getElementById(id).addEventListener("input", liveUpdate);
+  }
+  for (const id of ["sweepPt","sweepTarget"]){
+    document.getElementById(id).addEventListener("change", () => {
+      const {opts, error} = readOptions();
+      if (scan && !error) renderSweep(scan.summary.combined, opts);
+    });
+  }
+  document.getElementById("sweepExport").addEventListener("click", exportSweep);
+  document.getElementById("tablesExport").addEventListener("click", exportArrow);
+  for (const id of ["seriesRes","seriesClip"]){
+    document.getElementById(id).addEventListener("change", () => { if (scan) renderSeries(scan.summary.combined); });
+  }
+
+  // Drill-down: the last upload's merged group-by index and unfiltered accumulator. A selection
+  // replays the matching index cells into a fresh accumulator; nothing is re-read.
+  let drill = null;
+  function showDrill(base, index, summary, label){
+    const card = document.getElementById("drillCard");
+    const dimsEl = document.getElementById("drillDims");
+    card.style.display = "";
+    drill = base && index && index.dims.length ? {base, index, summary, label, totals: indexValueTotals(index)} : null;
+    if (!drill){
+      dimsEl.innerHTML = "";
+      document.getElementById("drillNote").textContent = !base
+        ? "Drill-down needs the CUR files: report pages only embed the aggregate cube."
+        : index && index.truncated
+        ? `Drill-down is off: these files have more account × region × tag combinations than fit in ` +
+          `${INDEX_MAX_CELLS.toLocaleString()} index cells.`
+        : "These files carry no account, region or resourceTags/user:* columns to drill into.";
+      return;
+    }
+    // value lists are virtualized: only the checkboxes in view exist, the picks live in drill.selected
+    drill.selected = index.dims.map(() => new Set());
+    dimsEl.innerHTML = index.dims.map((d, k) => `
+        <div>
+          <div class="sub">${esc(d.name)} (${d.values.length.toLocaleString()})</div>
+          <div class="input vlist"><div data-dim="${k}"></div></div>
+        </div>`).join("");
+    index.dims.forEach((d, k) => {
+      const total = drill.totals[k], picked = drill.selected[k];
+      const order = d.values.map((v, i) => i).sort((a, b) => total[b] - total[a]);
+      renderRows(dimsEl.querySelector(`[data-dim="${k}"]`), order, (i) =>
+        `<label><input type="checkbox" value="${i}"${picked.has(i) ? " checked" : ""} /> ${esc(d.values[i] || "(none)")} · ${eur(total[i],0)}</label>`);
+    });
+    document.getElementById("drillNote").textContent =
+      `${index.groups.length.toLocaleString()} groups, ${index.cells.net.length.toLocaleString()} index cells. Tick several values to combine them.` +
+      (index.otherGroups ? ` A file had more than ${INDEX_MAX_GROUPS.toLocaleString()} combinations; later ones are ` +
+        `grouped as ${INDEX_OTHER} in every dimension.` : "") +
+      " The hourly series, the commitment optimizer and the Spot candidates always cover the whole CUR.";
+  }
+
+  function applyDrill(){
+    if (!drill) return;
+    const {opts, error} = readOptions();
+    if (error){
+      setStatus("bad", error);
+      return;
+    }
+    const t0 = performance.now();
+    const filter = drill.selected;
+    let summary = drill.summary, label = drill.label;
+    if (filter.some(f => f.size)){
+      const acc = consumeIndex(initDashboard(opts), drill.index, indexGroupMask(drill.index, filter));
+      if (!acc.rowCount){
+        setStatus("bad", "No CUR lines match this drill-down selection.");
+        return;
+      }
+      // the index has no hourly cells or resources: keep the unfiltered hourly series and Spot candidates
+      for (const [key, p] of acc.periods){
+        const q = drill.base.periods.get(key);
+        if (q){
+          p.hourlyVar = q.hourlyVar;
+          p.hourlyCompute = q.hourlyCompute;
+          p.resources = q.resources;
         }
-      },
-      error: (err) => {
-        console.error(err);
-        setStatus("bad", "CSV parsing error. Check console for details.");
       }
+      summary = summarizeDashboard(acc);
+      label = `${drill.label} · ` + drill.index.dims.map((d, k) => filter[k].size
+        ? `${d.name}: ${filter[k].size === 1 ? d.values[filter[k].values().next().value] || "(none)" : `${filter[k].size} values`}`
+        : null).filter(Boolean).join(", ");
+    }
+    scan = {summary, label, filtered: summary !== drill.summary};
+    const res = evaluateDashboard(summary, opts);
+    renderScan(res);
+    renderScenarios(res, label);
+    renderSweep(summary.combined, opts);
+    setStatus("ok", `${scan.filtered ? "Drill-down applied" : "Drill-down cleared"} in ${fmtMs(performance.now() - t0)} (from the index, file not re-read).`);
+  }
+  document.getElementById("drillDims").addEventListener("change", (ev) => {
+    const list = ev.target.closest("[data-dim]");
+    if (!drill || !list) return;
+    const picked = drill.selected[+list.dataset.dim];
+    if (ev.target.checked) picked.add(+ev.target.value);
+    else picked.delete(+ev.target.value);
+    applyDrill();
+  });
+  document.getElementById("drillReset").addEventListener("click", () => {
+    if (!drill) return;
+    for (const picked of drill.selected) picked.clear();
+    for (const box of document.querySelectorAll("#drillDims input")) box.checked = false;
+    applyDrill();
+  });
+
+  // Report mode: the embedded cube stands in for the upload until files are selected.
+  let cube = null;
+  let cubeSummary = null;
+  let cubeDecodeMs = 0;
+  async function loadEmbeddedCube(){
+    const el = document.getElementById("curCube");
+    const b64 = el ? el.textContent.trim() : "";
+    if (!b64) return null;
+    return JSON.parse(await gunzipBase64(b64));
+  }
+  const cubeLabel = (c) => {
+    const files = (c.source && c.source.files) || [];
+    return files.length === 1 ? files[0] : `${files.length} files`;
+  };
+
+  function renderFromCube(opts){
+    const t0 = performance.now();
+    const label = `${cubeLabel(cube)} (precomputed)`;
+    startRun("cube", label);
+    if (!cubeSummary){
+      diag.t0 -= cubeDecodeMs;   // decoding ran at page load, before this run started
+      addPhase("Decode embedded cube", cubeDecodeMs);
+      const acc = phase("Replay cube", () => consumeCube(initDashboard({...opts, rules: cube.rules}), cube));
+      cubeSummary = phase("Summarize scan", () => summarizeDashboard(acc));
+    }
+    showScan(cubeSummary, label, opts);
+    showDrill(null);
+    const rows = (cube.source && cube.source.rows) || 0;
+    const el = document.getElementById("curCube");
+    endRun({rows, files: ((cube.source && cube.source.files) || []).length, billingPeriods: cube.periods.length,
+            days: cube.dims.day.filter(Boolean).length, services: cube.dims.service.length,
+            distinctLineTypes: cube.dims.lineType.length, distinctProductCodes: cube.dims.productCode.length,
+            cubeCells: cube.cells.net.length, cubePayloadBytes: el ? el.textContent.trim().length : 0});
+    setStatus("ok", `Done. Rebuilt from the embedded aggregate (${rows.toLocaleString()} CUR rows, ${cube.cells.net.length.toLocaleString()} cells) in ${(performance.now()-t0).toFixed(0)} ms.`);
+  }
+
+  runBtn.addEventListener("click", async () => {
+    if (!selected.length && !cube){
+      setStatus("bad", "Please select a CUR file first.");
+      return;
+    }
+
+    const {opts, error} = readOptions();
+    if (error){
+      setStatus("bad", error);
+      return;
+    }
+
+    if (!selected.length){
+      try{
+        renderFromCube(opts);
+      } catch (e){
+        console.error(e);
+        setStatus("bad", "Failed to compute dashboard. Check console for details.");
+      }
+      return;
+    }
+
+    let files;
+    try{
+      files = await resolveInputFiles(selected);
+    } catch (e){
+      console.error(e);
+      setStatus("bad", e.message);
+      return;
+    }
+    if (!files.length){
+      setStatus("bad", "No CUR files (.csv, .csv.gz, .zip) found in the selection.");
+      return;
+    }
+
+    const label = files.length === 1 ? files[0].name : `${files.length} files`;
+    const run = startRun("upload", label);
+    setStatus("", "Parsing CSV… (large CURs may take a few seconds)");
+
+    // Each file is parsed and aggregated inside a worker; only its small per-period
+    // partial comes back to the page, so no CUR rows are ever held on the main thread.
+    // Files scanned before (in this session or, via the scan cache, an earlier one) are
+    // served from partialCache.
+    const restored = await phase("Scan cache lookup", () => restoreScans(files, opts).catch((e) => {
+      console.warn("Scan cache lookup failed:", e);
+      return {keys: [], hits: 0};
+    }));
+    // Large plain CSVs: a sampled estimate is shown first and refined as files and shards finish.
+    let pv = null;
+    const cachedParts = files.map(f => (partialCache.get(fileKey(f)) || {}).partial);
+    if (document.getElementById("previewCsv").checked && wantsPreview(files, cachedParts)){
+      pv = await phase("Sampled preview", () => samplePreview(files, cachedParts, opts).then((state) => {
+        state.strata = previewStrata(state);
+        document.getElementById("drillCard").style.display = "none";
+        drill = null;
+        showPreview(state, label);
+        return state;
+      })).catch((e) => {
+        console.warn("Sampled preview failed:", e);
+        return null;
+      });
+    }
+    const refine = pv && ((i, start, end, partial) => {
+      refinePreview(pv, i, start, end, partial);
+      showPreview(pv, label);
     });
+
+    let reduced;
+    const tParse = performance.now();
+    try{
+      reduced = await phase("Parse + aggregate (workers)", () => reduceFiles(files, opts, (pr) => {
+        sampleHeap();
+        setStatus("", progressText(pr, files.length, performance.now() - tParse));
+      }, document.getElementById("shardCsv").checked, refine));
+    } catch (e){
+      console.error(e);
+      endRun({files: files.length});
+      if (pv) document.getElementById("previewNote").textContent = "The exact scan failed; the figures marked ≈ remain estimates.";
+      setStatus("bad", "CSV parsing error. Check console for details.");
+      return;
+    }
+    const parseMs = performance.now() - tParse;
+    const {partials, stats, workers} = reduced;
+    run.files = stats.map((st, i) => ({name: files[i].webkitRelativePath || files[i].name, bytes: files[i].size,
+                                       rows: st.rows, parseMs: st.parseMs, foldMs: st.foldMs, shards: st.shards || 1,
+                                       finishMs: st.finishMs, wallMs: st.wallMs, cached: st.cached}));
+    const fresh = stats.filter(st => !st.cached);
+    showCacheBadge(files.length - fresh.length, files.length);
+    if (fresh.length){
+      // worker time, summed over files (workers run concurrently, so this can exceed wall time)
+      addPhase("Worker CSV parsing (sum)", fresh.reduce((t, st) => t + st.parseMs, 0), true);
+      addPhase("Worker aggregation (sum)", fresh.reduce((t, st) => t + st.foldMs + st.finishMs, 0), true);
+      persistScans(files, restored.keys, partials, stats).catch((e) => console.warn("Scan cache update failed:", e));
+    }
+
+    try{
+      const acc = phase("Merge partials", () => {
+        const acc = initDashboard(opts);
+        for (const part of partials) mergeDashboardPartials(acc, part);
+        return acc;
+      });
+      const index = phase("Merge drill-down index", () => mergeIndexes(partials.map(part => part.index)));
+      const freshRows = fresh.reduce((t, st) => t + st.rows, 0);
+      const counters = {files: files.length, cachedFiles: files.length - fresh.length,
+                        bytes: files.reduce((t, f, i) => t + (stats[i].cached ? 0 : f.size), 0), workers,
+                        ...accCounters(acc), rowsPerSec: freshRows / Math.max(parseMs / 1000, 1e-3),
+                        ...fileCounters(stats), indexCells: index.cells.net.length, indexGroups: index.groups.length,
+                        ...(pv ? {previewBlocks: pv.blocks.length, previewBytes: pv.blocks.reduce((t, b) => t + b.bytes, 0)} : {})};
+      if (!acc.rowCount){
+        endRun(counters);
+        setStatus("bad", "CSV parsed but contains no rows.");
+        return;
+      }
+
+      const summary = phase("Summarize scan", () => summarizeDashboard(acc));
+      showScan(summary, label, opts);
+      phase("Build drill-down selectors", () => showDrill(acc, index, summary, label));
+      endRun(counters);
+      const cachedNote = fresh.length < files.length ? `, ${files.length - fresh.length} served from cache` : "";
+      setStatus("ok", `Done. Scenarios computed successfully (${files.length} file(s)${cachedNote}, ${summary.periods.length} billing period(s), ${fmtMs(diag.totalMs)}).`);
+    } catch (e){
+      console.error(e);
+      endRun({});
+      setStatus("bad", "Failed to compute dashboard. Check console for details.");
+    }
+  });
+
+  document.getElementById("diagExport").addEventListener("click", exportDiagnostics);
+
+  function showCacheBadge(cached, total){
+    const badge = document.getElementById("cacheBadge");
+    badge.style.display = cached ? "" : "none";
+    badge.textContent = cached === total ? "⚡ Served from cache" : `⚡ ${cached} of ${total} files from cache`;
+  }
+  document.getElementById("cacheClear").addEventListener("click", () => {
+    showCacheBadge(0, 0);
+    clearScans().catch((e) => console.warn("Could not clear the scan cache:", e));
+  });
+  const quotaInput = document.getElementById("cacheQuota");
+  try{ quotaInput.value = localStorage.getItem("curScanCacheQuotaMB") || quotaInput.value; } catch (e){ /* storage blocked */ }
+  quotaInput.addEventListener("change", async () => {
+    try{ localStorage.setItem("curScanCacheQuotaMB", quotaInput.value); } catch (e){ /* storage blocked */ }
+    const db = await openScanCache();
+    if (db) evictScans(db, cacheQuotaBytes()).catch((e) => console.warn("Scan cache eviction failed:", e));
+  });
+  refreshCacheInfo().catch((e) => console.warn("Scan cache unavailable:", e));
+
+  const tDecode = performance.now();
+  loadEmbeddedCube().then((c) => {
+    if (!c) return;
+    cube = c;
+    cubeDecodeMs = performance.now() - tDecode;
+    document.getElementById("fileName").textContent = `Embedded report: ${cubeLabel(c)}`;
+    runBtn.click();
+  }).catch((e) => {
+    console.error(e);
+    setStatus("bad", "Could not read the embedded report data. Check console for details.");
   });
 </script>
 </body>
 </html>
 """
 
-OUT_HTML.write_text(html, encoding="utf-8")
-print(f"✅ Generated: {OUT_HTML.resolve()}")
+def inline_asset(asset_dir: Path, name: str) -> str:
+    """gzip + base64 of a pinned script from asset_dir, checked against its pinned version."""
+    version, url = ASSETS[name]
+    path = asset_dir / url.rsplit("/", 1)[1]
+    if not path.is_file():
+        raise SystemExit(f"❌ {path} not found (download it from {url}).")
+    src = path.read_bytes()
+    if f"v{version}".encode("ascii") not in src[:512]:
+        raise SystemExit(f"❌ {path} is not the pinned {name} v{version} ({url}).")
+    return base64.b64encode(gzip.compress(src, compresslevel=9, mtime=0)).decode("ascii")
+
+
+
+# Optional report mode: pre-aggregate CURs into a compact cube embedded in the page, so viewers
+# get the dashboard without uploading anything (CLI arguments, or set CUR_INPUTS in the notebook).
+CUR_INPUTS: list[str] = []
+
+ap = argparse.ArgumentParser(description="Generate the FinOps CUR dashboard HTML.")
+ap.add_argument("cur", nargs="*",
+                help="CUR files (.csv, .csv.gz, .zip, .parquet), *Manifest.json files or delivery folders to pre-aggregate")
+ap.add_argument("-o", "--out", default=str(OUT_HTML), help=f"output HTML (default: {OUT_HTML})")
+ap.add_argument("--workers", type=int, default=None, help="processes for the CUR scan (default: one per core)")
+ap.add_argument("--rules", metavar="PATH", help="classification rules JSON (default: cur_engine.DEFAULT_RULES)")
+ap.add_argument("--offline", metavar="DIR",
+                help="inline the pinned Papa Parse / Plotly builds from DIR (papaparse.min.js, "
+                     "plotly-cartesian-2.30.0.min.js) so the page works without network access")
+ap.add_argument("--export", metavar="DIR",
+                help="also write the dashboard's tables (summary, daily, hourly, services, passThrough, spotScenario, "
+                     "pools) and the cube as Arrow IPC and Parquet files to DIR (needs pyarrow)")
+ap.add_argument("--state", metavar="DIR",
+                help="checkpoint per-part partials in DIR: later runs rescan only new or changed parts "
+                     "and leave an up-to-date page alone")
+ap.add_argument("--watch", type=float, metavar="SECONDS",
+                help="with --state: re-check the inputs every SECONDS and regenerate the page when they change")
+args = ap.parse_args([] if "ipykernel" in sys.modules else None)
+OUT_HTML = Path(args.out)
+
+rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+inputs = args.cur or CUR_INPUTS
+if (args.state or args.watch or args.export) and not inputs:
+    raise SystemExit("❌ --state / --watch / --export need CUR files or a delivery folder.")
+if args.watch and not args.state:
+    raise SystemExit("❌ --watch needs --state DIR.")
+if args.export:
+    # checked before any scan or write: a missing pyarrow would otherwise only surface after the page
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise SystemExit("❌ --export requires pyarrow (pip install pyarrow).")
+
+assets = {name: "" for name in ASSETS}
+if args.offline:
+    assets = {name: inline_asset(Path(args.offline), name) for name in ASSETS}
+    print(f"✅ Inlined: {', '.join(f'{n} v{ASSETS[n][0]}' for n in ASSETS)} "
+          f"({sum(map(len, assets.values())) / 1e6:.2f} MB embedded)")
+
+# "</" cannot appear inside the inline JSON script
+rules_json = json.dumps(rules).replace("</", "<\\/")
+template = (html.replace("__CUR_RULES__", rules_json)
+            .replace("__CUR_PAPAPARSE__", assets["papaparse"]).replace("__CUR_PLOTLY__", assets["plotly"]))
+
+
+def write_page(cube: dict | None) -> None:
+    payload = ""
+    if cube:
+        cube["source"]["generatedAt"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        payload = cube_payload(cube)
+        print(f"✅ Aggregated: {cube['source']['rows']:,} rows → {len(cube['cells']['net']):,} cells "
+              f"({len(payload) / 1e6:.2f} MB embedded)")
+    OUT_HTML.write_text(template.replace("__CUR_CUBE__", payload), encoding="utf-8")
+    print(f"✅ Generated: {OUT_HTML.resolve()}")
+    if cube and args.export:
+        # the tables the page shows for the default scenario inputs, rebuilt from the cube like the page does
+        opts = DashboardOptions(rules=rules)
+        res = evaluate_dashboard(DashboardAccumulator(opts).consume_cube(cube).summarize(), opts)
+        written = write_export(export_tables(res, cube), args.export)
+        print(f"✅ Exported: {Path(args.export).resolve()} ({len(written)} Arrow / Parquet files)")
+
+
+def refresh_report(checkpoint: ScanCheckpoint) -> None:
+    """Rescan new / changed parts and regenerate OUT_HTML unless it already shows this data."""
+    t0 = time.perf_counter()
+    files = expand_inputs(inputs)
+    rescanned = checkpoint.update(files, args.workers)
+    # the outputs are a function of the merged partials, the template (rules, inlined assets) and --export
+    key = hashlib.sha256((checkpoint.digest + hashlib.sha256(template.encode("utf-8")).hexdigest()
+                          + str(args.export and Path(args.export).resolve())).encode("utf-8")).hexdigest()
+    marker = checkpoint.dir / "pages.json"
+    try:
+        pages = json.loads(marker.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pages = {}
+    if OUT_HTML.is_file() and pages.get(str(OUT_HTML.resolve())) == key:
+        print(f"✅ Up to date: {OUT_HTML.resolve()} ({len(files)} part(s) unchanged, "
+              f"{(time.perf_counter() - t0) * 1e3:.0f} ms)")
+        return
+    acc = checkpoint.merged()
+    if not acc.row_count:
+        raise ValueError("CSV parsed but contains no rows.")
+    print(f"✅ Checkpoint: {len(rescanned)} of {len(files)} part(s) rescanned "
+          f"in {time.perf_counter() - t0:.2f}s")
+    write_page(acc.to_cube({"files": [f.name for f in files], "rows": acc.row_count}))
+    pages[str(OUT_HTML.resolve())] = key
+    marker.write_text(json.dumps(pages, indent=1), encoding="utf-8")
+
 
+if args.state:
+    checkpoint = ScanCheckpoint(args.state, DashboardOptions(rules=rules), CubeAccumulator)
+    while True:
+        try:
+            refresh_report(checkpoint)
+        except (OSError, ValueError) as e:
+            # e.g. a manifest listing parts that are still being synced: retry on the next tick
+            if not args.watch:
+                raise SystemExit(f"❌ {e}")
+            print(f"❌ {e}")
+        if not args.watch:
+            break
+        sys.stdout.flush()
+        time.sleep(args.watch)
+else:
+    write_page(build_cube(inputs, args.workers, rules) if inputs else None)
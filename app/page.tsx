@@ -86,53 +86,87 @@ interface DashboardResult {
   }>
 }
 
-function computeDashboard(rows: any[], opts: {
+interface DashboardOptions {
   addCoverage: number
   spotDiscount: number
   passThrough: number[]
   computeCodes: string[]
-}): DashboardResult {
-  const col = {
-    net: (r: any) => num(r['lineItem/NetUnblendedCost'] ?? r['lineItem/UnblendedCost']),
-    publicOD: (r: any) => num(r['pricing/publicOnDemandCost']),
-    lineType: (r: any) => str(r['lineItem/LineItemType'] ?? 'Unknown'),
-    productCode: (r: any) => str(r['lineItem/ProductCode'] ?? 'Unknown'),
-    usageType: (r: any) => str(r['lineItem/UsageType'] ?? ''),
-    service: (r: any) => str(r['product/ProductName'] ?? r['lineItem/ProductCode'] ?? 'Unknown'),
-    usageStart: (r: any) => str(r['lineItem/UsageStartDate'] ?? ''),
-    billStart: (r: any) => str(r['bill/BillingPeriodStartDate'] ?? ''),
-    billEnd: (r: any) => str(r['bill/BillingPeriodEndDate'] ?? '')
-  }
-
-  const bs = col.billStart(rows[0])
-  const be = col.billEnd(rows[0])
-  const periodStart = bs ? new Date(bs) : null
-  const periodEnd = be ? new Date(be) : null
-  const daysInMonth = (periodStart && periodEnd) ? Math.max(1, Math.round((periodEnd.getTime() - periodStart.getTime()) / (24 * 3600 * 1000))) : 30
-
-  const fixedTypes = new Set(['SavingsPlanRecurringFee', 'RIFee', 'Fee', 'EdpDiscount', 'SavingsPlanNegation'])
-  const dailyVar = new Map<string, number>()
-  const serviceSpend = new Map<string, number>()
-
-  const computeCodes = new Set(opts.computeCodes)
-  const computeUsageLineTypes = new Set(['Usage', 'SavingsPlanCoveredUsage', 'SavingsPlanNegation'])
+}
 
-  let totalBill = 0
-  let fixedMonthly = 0
+const col = {
+  net: (r: any) => num(r['lineItem/NetUnblendedCost'] ?? r['lineItem/UnblendedCost']),
+  publicOD: (r: any) => num(r['pricing/publicOnDemandCost']),
+  lineType: (r: any) => str(r['lineItem/LineItemType'] ?? 'Unknown'),
+  productCode: (r: any) => str(r['lineItem/ProductCode'] ?? 'Unknown'),
+  usageType: (r: any) => str(r['lineItem/UsageType'] ?? ''),
+  service: (r: any) => str(r['product/ProductName'] ?? r['lineItem/ProductCode'] ?? 'Unknown'),
+  usageStart: (r: any) => str(r['lineItem/UsageStartDate'] ?? ''),
+  billStart: (r: any) => str(r['bill/BillingPeriodStartDate'] ?? ''),
+  billEnd: (r: any) => str(r['bill/BillingPeriodEndDate'] ?? '')
+}
 
-  let computePublicBaseline = 0
-  let computeActualCost = 0
-  let coveredPublic = 0
+const fixedTypes = new Set(['SavingsPlanRecurringFee', 'RIFee', 'Fee', 'EdpDiscount', 'SavingsPlanNegation'])
+const computeUsageLineTypes = new Set(['Usage', 'SavingsPlanCoveredUsage', 'SavingsPlanNegation'])
+const ecsCodes = new Set(['AmazonECS', 'AWSFargate'])
+
+// Streaming accumulator: running sums plus small keyed maps (days, services),
+// so memory stays flat no matter how many CUR rows are consumed.
+interface DashboardAccumulator {
+  opts: DashboardOptions
+  computeCodes: Set<string>
+  rowCount: number
+  billStart: string
+  billEnd: string
+  dailyVar: Map<string, number>
+  serviceSpend: Map<string, number>
+  totalBill: number
+  fixedMonthly: number
+  computePublicBaseline: number
+  computeActualCost: number
+  coveredPublic: number
+  spotNet: number
+  ec2BoxNet: number
+  ec2BoxPublic: number
+  ecsNet: number
+  ecsPublic: number
+  fargateSpotNet: number
+}
 
-  let spotNet = 0
+function initDashboard(opts: DashboardOptions): DashboardAccumulator {
+  return {
+    opts,
+    computeCodes: new Set(opts.computeCodes),
+    rowCount: 0,
+    billStart: '',
+    billEnd: '',
+    dailyVar: new Map<string, number>(),
+    serviceSpend: new Map<string, number>(),
+    totalBill: 0,
+    fixedMonthly: 0,
+    computePublicBaseline: 0,
+    computeActualCost: 0,
+    coveredPublic: 0,
+    spotNet: 0,
+    ec2BoxNet: 0,
+    ec2BoxPublic: 0,
+    ecsNet: 0,
+    ecsPublic: 0,
+    fargateSpotNet: 0
+  }
+}
 
-  let ec2BoxNet = 0
-  let ec2BoxPublic = 0
+// Rows are folded in file order, so results are identical to a single pass over all rows.
+function consumeDashboardChunk(acc: DashboardAccumulator, rows: any[]): DashboardAccumulator {
+  if (!rows.length) return acc
+  if (acc.rowCount === 0) {
+    // billing period comes from the first row, as before
+    acc.billStart = col.billStart(rows[0])
+    acc.billEnd = col.billEnd(rows[0])
+  }
 
-  const ecsCodes = new Set(['AmazonECS', 'AWSFargate'])
-  let ecsNet = 0
-  let ecsPublic = 0
-  let fargateSpotNet = 0
+  const { dailyVar, serviceSpend, computeCodes } = acc
+  let { totalBill, fixedMonthly, computePublicBaseline, computeActualCost, coveredPublic,
+    spotNet, ec2BoxNet, ec2BoxPublic, ecsNet, ecsPublic, fargateSpotNet } = acc
 
   for (const r of rows) {
     const net = col.net(r)
@@ -179,6 +213,23 @@ function computeDashboard(rows: any[], opts: {
     }
   }
 
+  Object.assign(acc, { totalBill, fixedMonthly, computePublicBaseline, computeActualCost, coveredPublic,
+    spotNet, ec2BoxNet, ec2BoxPublic, ecsNet, ecsPublic, fargateSpotNet })
+  acc.rowCount += rows.length
+  return acc
+}
+
+function finalizeDashboard(acc: DashboardAccumulator): DashboardResult {
+  const opts = acc.opts
+  const { dailyVar, serviceSpend, totalBill, fixedMonthly, computePublicBaseline, computeActualCost,
+    coveredPublic, spotNet, ec2BoxNet, ec2BoxPublic, ecsNet, ecsPublic, fargateSpotNet } = acc
+
+  const bs = acc.billStart
+  const be = acc.billEnd
+  const periodStart = bs ? new Date(bs) : null
+  const periodEnd = be ? new Date(be) : null
+  const daysInMonth = (periodStart && periodEnd) ? Math.max(1, Math.round((periodEnd.getTime() - periodStart.getTime()) / (24 * 3600 * 1000))) : 30
+
   const computeShareTotal = totalBill > 0 ? (computeActualCost / totalBill) : 0
   const observedDiscount = computePublicBaseline > 0 ? (1 - (computeActualCost / computePublicBaseline)) : 0
   const currentCoverage = computePublicBaseline > 0 ? (coveredPublic / computePublicBaseline) : 0
@@ -313,25 +364,42 @@ export default function Home() {
     setStatusKind('')
     setStatusText('Parsing CSV… (large CURs may take a few seconds)')
 
+    // Aggregate chunk by chunk as the worker parses; rows are dropped right after,
+    // so the full CUR is never materialized in memory.
+    const acc = initDashboard({
+      addCoverage: addCoverageNum,
+      spotDiscount: spotDiscountNum,
+      passThrough: passThroughList,
+      computeCodes: ['AmazonEC2', 'AmazonECS', 'AWSFargate', 'AWSLambda']
+    })
+    let failed = false
+
     Papa.parse(f, {
       header: true,
       skipEmptyLines: true,
       worker: true,
-      complete: (results) => {
+      chunk: (results, parser) => {
+        if (failed) return
+        try {
+          consumeDashboardChunk(acc, results.data || [])
+        } catch (e) {
+          failed = true
+          console.error(e)
+          setStatusKind('bad')
+          setStatusText('Failed to compute dashboard. Check console for details.')
+          parser.abort()
+        }
+      },
+      complete: () => {
+        if (failed) return
         try {
-          const rows = results.data || []
-          if (!rows.length) {
+          if (!acc.rowCount) {
             setStatusKind('bad')
             setStatusText('CSV parsed but contains no rows.')
             return
           }
 
-          const res = computeDashboard(rows, {
-            addCoverage: addCoverageNum,
-            spotDiscount: spotDiscountNum,
-            passThrough: passThroughList,
-            computeCodes: ['AmazonEC2', 'AmazonECS', 'AWSFargate', 'AWSLambda']
-          })
+          const res = finalizeDashboard(acc)
 
           setResult(res)
           setStatusKind('ok')
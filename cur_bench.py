@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Throughput benchmark for the CUR ingestion paths, on deterministic synthetic CURs (cur_synth.py).
+
+Each (size, path) case runs in a fresh interpreter so peak RSS is its own, and reports rows/s plus
+per-phase wall time:
+  read       decode + CSV/Parquet parse only (rows are iterated and dropped)
+  scan       read + classification/aggregation (what cur_engine.scan_files does)
+  summarize  per-period scan totals + monthly averaging
+  evaluate   scenario evaluation on the summary
+  encode     (cube path only) cube → JSON → gzip + base64 for the report page
+
+Paths: csv, gz (.csv.gz), parquet (needs pyarrow), parts (S3-style delivery, 4 .csv.gz parts per
+period, scanned with --workers processes), split (the plain .csv memory-mapped and split into byte
+ranges across --workers processes; the engine's 32 MB-per-range minimum is lowered to 1 MB so bench
+sizes are split too), cube (CUR_analysis.py's report aggregation on .csv.gz) and consume (the
+plain .csv, parsed a chunk of rows at a time outside the clock, so scan is DashboardAccumulator.consume
+alone and a slower per-row update is not diluted by I/O).
+Inputs are generated once into --data-dir and reused; results can be saved as a baseline and later
+runs compared against it (exit status 1 on a regression beyond --tolerance). With --repeat, each
+phase keeps its fastest time and peak RSS is the median of the runs. Each case also reports its
+share of the 1M rows/s per core target (TARGET_ROWS_PER_SEC), which no path reaches yet.
+
+How to use:
+  python cur_bench.py                                        # 100k and 1m, every path
+  python cur_bench.py --sizes 10m,50m --paths gz,parts --workers 8
+  python cur_bench.py --save-baseline bench-baseline.json
+  python cur_bench.py --baseline bench-baseline.json -o bench.json
+  python cur_bench.py --paths consume --repeat 5 --baseline bench-baseline.json   # hot-loop guard
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Sequence
+
+import cur_engine
+import cur_synth
+from cur_engine import (
+    CubeAccumulator, DashboardAccumulator, DashboardOptions, cube_payload, evaluate_dashboard,
+    expand_inputs, read_cur, scan_files,
+)
+
+PATHS = ("csv", "gz", "parquet", "parts", "split", "cube", "consume")
+DEFAULT_SIZES = "100k,1m"
+DELIVERY_PARTS = 4
+RESULTS_VERSION = 1
+BENCH_SPLIT_MIN_BYTES = 1 << 20     # bench inputs are small; the engine only splits 32 MB per range
+CONSUME_CHUNK_ROWS = 1024           # parsed rows handed to consume at a time (still in cache, as when streaming)
+TARGET_ROWS_PER_SEC = 1_000_000     # per core: the engine's throughput goal, not reached yet (see README)
+MULTI_PROCESS_PATHS = ("parts", "split")
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of this process and any reaped worker processes, in MB."""
+    scale = 1 if sys.platform == "darwin" else 1024     # ru_maxrss: bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        # ru_maxrss survives exec, so a case would inherit the (larger) benchmark driver's peak;
+        # the kernel's high-water mark is reset per address space
+        with open("/proc/self/status", encoding="ascii") as fh:
+            own = next(int(line.split()[1]) for line in fh if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    return max(own, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale / 1e6
+
+
+def input_path(data_dir: Path, path: str, rows: int, seed: int) -> Path:
+    stem = f"synthetic-{cur_synth.format_size(rows)}-s{seed}"
+    if path == "parts":
+        return data_dir / f"{stem}-p{DELIVERY_PARTS}"
+    return data_dir / (stem + {"csv": ".csv", "split": ".csv", "consume": ".csv", "parquet": ".parquet"}.get(path, ".csv.gz"))
+
+
+def ensure_input(data_dir: Path, path: str, rows: int, seed: int) -> Path:
+    """Generate the synthetic input for a case unless it is already in data_dir."""
+    target = input_path(data_dir, path, rows, seed)
+    if target.exists():
+        return target
+    t0 = time.perf_counter()
+    tmp = target.with_name("partial-" + target.name)    # keeps the suffix, which picks the format
+    if path == "parts":
+        cur_synth.generate_delivery(tmp, rows, seed, parts=DELIVERY_PARTS)
+    else:
+        cur_synth.generate_file(tmp, rows, seed)
+    tmp.rename(target)
+    print(f"✅ Generated: {target} ({rows:,} rows in {time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    return target
+
+
+def _size_on_disk(target: Path) -> int:
+    if target.is_dir():
+        return sum(f.stat().st_size for f in target.rglob("*") if f.is_file())
+    return target.stat().st_size
+
+
+def run_case(path: str, target: Path, workers: int | None) -> dict:
+    """Time one ingestion path in this process (called in a fresh interpreter by `measure`)."""
+    opts = DashboardOptions()
+    files = expand_inputs([target])
+    phases = {}
+    extra = {}
+    if path == "split":
+        cur_engine.SPLIT_MIN_BYTES = BENCH_SPLIT_MIN_BYTES
+        extra["ranges"] = max(1, min(workers or os.cpu_count() or 1, target.stat().st_size // BENCH_SPLIT_MIN_BYTES))
+
+    if path == "consume":
+        acc = DashboardAccumulator(opts)
+        phases["read"] = phases["scan"] = 0.0
+        for f in files:
+            with read_cur(f) as (header, rows):
+                while True:
+                    t0 = time.perf_counter()
+                    chunk = list(islice(rows, CONSUME_CHUNK_ROWS))
+                    t1 = time.perf_counter()
+                    phases["read"] += t1 - t0
+                    if not chunk:
+                        break
+                    acc.consume(header, chunk)
+                    phases["scan"] += time.perf_counter() - t1
+    else:
+        t0 = time.perf_counter()
+        for f in files:
+            with read_cur(f) as (_, rows):
+                for _ in rows:
+                    pass
+        phases["read"] = time.perf_counter() - t0
+
+        accumulator = CubeAccumulator if path == "cube" else DashboardAccumulator
+        t0 = time.perf_counter()
+        acc = scan_files(files, opts, workers if path in ("parts", "split") else 1, accumulator)
+        phases["scan"] = time.perf_counter() - t0
+
+    if path == "cube":
+        t0 = time.perf_counter()
+        payload = cube_payload(acc.to_cube())
+        phases["encode"] = time.perf_counter() - t0
+        extra = {"cubeCells": sum(len(c) for c in acc.periods.values()), "payloadBytes": len(payload)}
+    else:
+        t0 = time.perf_counter()
+        summary = acc.summarize()
+        phases["summarize"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        evaluate_dashboard(summary, opts)
+        phases["evaluate"] = time.perf_counter() - t0
+    return {"rows": acc.row_count, "files": len(files), "phases": phases,
+            "rowsPerSec": acc.row_count / max(phases["scan"], 1e-9), "peakRssMB": _peak_rss_mb(), **extra}
+
+
+def measure(path: str, target: Path, workers: int | None, repeat: int) -> dict:
+    """Best-of-`repeat` phase timings and median peak RSS for one case, each run in a fresh interpreter."""
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--run-case", path, str(target)]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    runs = [json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+            for _ in range(repeat)]
+    best = runs[0]
+    best["phases"] = {k: min(r["phases"][k] for r in runs) for k in best["phases"]}
+    best["rowsPerSec"] = best["rows"] / max(best["phases"]["scan"], 1e-9)
+    best["peakRssMB"] = statistics.median(r["peakRssMB"] for r in runs)
+    return best
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Annotate results with deltas vs the baseline; return the regressions found."""
+    base = {(r["size"], r["path"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get((r["size"], r["path"]))
+        if not b:
+            continue
+        r["deltaRowsPerSec"] = r["rowsPerSec"] / b["rowsPerSec"] - 1
+        r["deltaPeakRss"] = r["peakRssMB"] / b["peakRssMB"] - 1
+        if r["deltaRowsPerSec"] < -tolerance:
+            regressions.append(f"{r['size']}/{r['path']}: rows/s {r['deltaRowsPerSec']:+.1%}")
+        if r["deltaPeakRss"] > tolerance:
+            regressions.append(f"{r['size']}/{r['path']}: peak RSS {r['deltaPeakRss']:+.1%}")
+    return regressions
+
+
+def _cores(path: str, workers: int | None) -> int:
+    return max(1, workers or os.cpu_count() or 1) if path in MULTI_PROCESS_PATHS else 1
+
+
+def _ms(phases: dict, k: str) -> str:
+    return f"{phases[k] * 1e3:,.1f}" if k in phases else "-"
+
+
+def format_table(results: list[dict]) -> str:
+    head = ("size", "path", "rows/s", "of target", "read ms", "scan ms", "summ ms", "eval ms", "enc ms", "peak MB",
+            "Δrows/s", "ΔRSS")
+    lines = [head]
+    for r in results:
+        ph = r["phases"]
+        lines.append((r["size"], r["path"], f"{r['rowsPerSec']:,.0f}", f"{r['ofTarget']:.0%}", _ms(ph, "read"),
+                      _ms(ph, "scan"), _ms(ph, "summarize"), _ms(ph, "evaluate"), _ms(ph, "encode"),
+                      f"{r['peakRssMB']:,.1f}",
+                      f"{r['deltaRowsPerSec']:+.1%}" if "deltaRowsPerSec" in r else "",
+                      f"{r['deltaPeakRss']:+.1%}" if "deltaPeakRss" in r else ""))
+    widths = [max(len(row[i]) for row in lines) for i in range(len(head))]
+    return "\n".join("  ".join(c.ljust(w) if i < 2 else c.rjust(w) for i, (c, w) in enumerate(zip(row, widths)))
+                     for row in lines)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Benchmark CUR ingestion paths on synthetic CURs.")
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help=f"row counts, e.g. 100k,1m,10m,50m (default: {DEFAULT_SIZES})")
+    p.add_argument("--paths", default=",".join(PATHS), help=f"subset of {','.join(PATHS)} (default: all)")
+    p.add_argument("--seed", type=int, default=1, help="synthetic CUR seed (default: 1)")
+    p.add_argument("--data-dir", default=".bench-data", help="where generated inputs are cached (default: .bench-data)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="processes for the parts and split paths (default: one per core)")
+    p.add_argument("--repeat", type=int, default=1, help="runs per case; the best time and the median peak RSS are kept (default: 1)")
+    p.add_argument("-o", "--out", help="write the results JSON here")
+    p.add_argument("--save-baseline", metavar="PATH", help="write the results JSON as a baseline to PATH")
+    p.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline")
+    p.add_argument("--tolerance", type=float, default=0.10,
+                   help="allowed rows/s drop or peak RSS growth vs the baseline (default: 0.10)")
+    p.add_argument("--run-case", nargs=2, metavar=("PATH", "INPUT"), help=argparse.SUPPRESS)
+    return p
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case[0], Path(args.run_case[1]), args.workers)))
+        return 0
+
+    try:
+        sizes = [cur_synth.parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError as e:
+        raise SystemExit(str(e))
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        raise SystemExit(f"Unknown path(s): {', '.join(sorted(unknown))} (choose from {', '.join(PATHS)}).")
+    if "split" in paths and (args.workers or os.cpu_count() or 1) < 2:
+        print("❌ The split path needs --workers 2 or more (or a second core); it measures the csv scan here.",
+              file=sys.stderr)
+    if "parquet" in paths and not has_pyarrow():
+        print("❌ Skipping parquet: it requires pyarrow (pip install pyarrow).", file=sys.stderr)
+        paths.remove("parquet")
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for rows in sizes:
+        for path in paths:
+            target = ensure_input(data_dir, path, rows, args.seed)
+            r = measure(path, target, args.workers, max(1, args.repeat))
+            results.append({"size": cur_synth.format_size(rows), "path": path, "bytes": _size_on_disk(target), **r,
+                            "ofTarget": r["rowsPerSec"] / (TARGET_ROWS_PER_SEC * _cores(path, args.workers))})
+            print(f"✅ {results[-1]['size']}/{path}: {r['rowsPerSec']:,.0f} rows/s, "
+                  f"peak {r['peakRssMB']:,.1f} MB" + (f", {r['ranges']} byte ranges" if "ranges" in r else ""),
+                  file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    print(format_table(results))
+
+    best = max(results, key=lambda r: r["ofTarget"], default=None)
+    if best and best["ofTarget"] < 1:
+        print(f"❌ Below the {TARGET_ROWS_PER_SEC:,} rows/s per core target: the best case, "
+              f"{best['size']}/{best['path']}, reaches {best['ofTarget']:.0%} of it.", file=sys.stderr)
+
+    doc = {"version": RESULTS_VERSION, "env": environment(), "seed": args.seed,
+           "workers": args.workers, "targetRowsPerSecPerCore": TARGET_ROWS_PER_SEC, "results": results}
+    for out in (args.out, args.save_baseline):
+        if out:
+            Path(out).write_text(json.dumps(doc, indent=2), encoding="utf-8")
+            print(f"✅ Wrote: {Path(out).resolve()}", file=sys.stderr)
+    if regressions:
+        print(f"❌ Regressions vs {args.baseline} (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        for line in regressions:
+            print(f"   {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
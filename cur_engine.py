@@ -0,0 +1,2324 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Headless CUR aggregation engine — the Python twin of the dashboard's computeDashboard.
+
+Streams an AWS CUR (CSV, .csv.gz, .zip or Parquet) row by row in constant memory and produces the
+same result object the browser page renders (same camelCase keys), so scenarios can be
+computed in batch jobs or on CURs too large for a browser tab.
+
+Multi-file / multi-month: each part file is reduced in its own process into mergeable per-billing-
+period partials (PeriodAggregate), which are merged into per-period and cross-period results.
+Spare workers split a large plain CSV into quote-aware byte ranges of a memory map (csv_ranges).
+With --state the partials are also checkpointed on disk per part (ScanCheckpoint), so refreshing
+a delivery AWS has rewritten rescans only the parts whose content changed.
+
+Parity notes (vs. the embedded JavaScript):
+  - Rows are folded in file order, so every running sum matches the browser bit-for-bit.
+  - A large plain CSV split into byte ranges across processes (like the page's shards) is an
+    approximation of a serial scan: sums are added in another order and differ in the last bits,
+    and the per-range Space-Saving lists (`resources`, `spotCandidates`) are merged, which can
+    change their ranking, `net` and `overcount`. Every listed entry still bounds its true spend
+    (net - overcount <= true <= net). HyperLogLog distinct counts merge exactly.
+  - `num()` semantics: commas stripped, non-numeric / non-finite values count as 0.
+  - Dates without a timezone are read as UTC (the browser would use its local zone).
+
+How to use:
+  python cur_engine.py CUR.csv.gz -o dashboard.json
+  python cur_engine.py cur-delivery/ -o dashboard.json          # every part/period via *-Manifest.json
+  python cur_engine.py 2024-0*/part-*.csv.gz --workers 8 -o dashboard.json
+  python cur_engine.py huge-export.csv --workers 16 -o dashboard.json   # one CSV, byte ranges per core
+  python cur_engine.py CUR.csv.gz --to-parquet CUR.parquet     # one-off, needs pyarrow
+  python cur_engine.py CUR.parquet -o dashboard.json           # reads only the 10 scan columns
+  python cur_engine.py CUR.csv --add-coverage 0.4 --spot-discount 0.7 --pass-through 0.5,1.0
+  python cur_engine.py cur-delivery/ --state .cur-state -o dashboard.json   # refresh: only changed parts
+  python cur_engine.py CUR.csv.gz --save-scan scan.json -o dashboard.json
+  python cur_engine.py --from-scan scan.json --add-coverage 0.5 -o what-if.json   # no CUR re-read
+  python cur_engine.py --from-scan scan.json --sweep grid.csv -o what-if.json      # full scenario grid
+  python cur_engine.py CUR.csv.gz --export tables/ -o dashboard.json   # Arrow + Parquet tables, needs pyarrow
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import copy
+import csv
+import gzip
+import hashlib
+import io
+import json
+import math
+import mmap
+import os
+import pickle
+import re
+import sys
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from bisect import bisect_right
+from itertools import accumulate, chain, repeat
+from operator import itemgetter
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, Sequence, TextIO
+
+# -----------------------------
+# CUR columns & classification (same sets as the dashboard)
+# -----------------------------
+COL_NET = "lineItem/NetUnblendedCost"
+COL_UNBLENDED = "lineItem/UnblendedCost"
+COL_PUBLIC_OD = "pricing/publicOnDemandCost"
+COL_LINE_TYPE = "lineItem/LineItemType"
+COL_PRODUCT_CODE = "lineItem/ProductCode"
+COL_USAGE_TYPE = "lineItem/UsageType"
+COL_PRODUCT_NAME = "product/ProductName"
+COL_USAGE_START = "lineItem/UsageStartDate"
+COL_BILL_START = "bill/BillingPeriodStartDate"
+COL_BILL_END = "bill/BillingPeriodEndDate"
+COL_RESOURCE_ID = "lineItem/ResourceId"
+COL_INSTANCE_TYPE = "product/instanceType"
+
+FIXED_TYPES = frozenset(["SavingsPlanRecurringFee", "RIFee", "Fee", "EdpDiscount", "SavingsPlanNegation"])
+COMPUTE_USAGE_LINE_TYPES = frozenset(["Usage", "SavingsPlanCoveredUsage", "SavingsPlanNegation"])
+ECS_CODES = frozenset(["AmazonECS", "AWSFargate"])
+DEFAULT_COMPUTE_CODES = ("AmazonEC2", "AmazonECS", "AWSFargate", "AWSLambda")
+SPOT_ADOPTION = (0.10, 0.15, 0.20, 0.30)
+TOP_SERVICES = 10  # services charted on the page (the export lists all of them)
+
+# Line classification rules, shared verbatim with the page (embedded there as JSON). Each flag is
+# a list of alternatives (any may match); an alternative ANDs its conditions:
+#   lineType / productCode   exact values ("$computeCodes" = the SP-eligible codes option)
+#   lineTypeContains / usageTypeContains   case-insensitive substrings (any of them)
+# "pools" adds named cost pools (e.g. Lambda, SageMaker) with their own net / publicOnDemand sums.
+FLAG_NAMES = ("fixed", "compute", "spCovered", "spot", "ec2Box", "ecs", "fargateSpot")
+F_FIXED, F_COMPUTE, F_SP_COVERED, F_SPOT, F_EC2_BOX, F_ECS, F_FARGATE_SPOT = (1 << i for i in range(7))
+POOL_SHIFT = len(FLAG_NAMES)
+MAX_POOLS = 31 - POOL_SHIFT
+
+_USAGE_TYPES = sorted(COMPUTE_USAGE_LINE_TYPES)
+DEFAULT_RULES = {
+    "fixed": [{"lineType": sorted(FIXED_TYPES)}],
+    "compute": [{"productCode": "$computeCodes", "lineType": _USAGE_TYPES}],
+    "spCovered": [{"productCode": "$computeCodes", "lineType": ["SavingsPlanCoveredUsage"]}],
+    "spot": [{"usageTypeContains": ["spotusage"]}, {"lineTypeContains": ["spot"]}],
+    "ec2Box": [{"productCode": ["AmazonEC2"], "lineType": _USAGE_TYPES, "usageTypeContains": ["boxusage"]}],
+    "ecs": [{"productCode": sorted(ECS_CODES), "lineType": _USAGE_TYPES}],
+    "fargateSpot": [{"productCode": sorted(ECS_CODES), "lineType": _USAGE_TYPES, "usageTypeContains": ["spotusage"]}],
+    "pools": {},
+}
+_RULE_KEYS = frozenset(["lineType", "productCode", "lineTypeContains", "usageTypeContains"])
+
+# the only columns the aggregation reads (Parquet reads project to these)
+SCAN_COLUMNS = (
+    COL_NET, COL_UNBLENDED, COL_PUBLIC_OD, COL_LINE_TYPE, COL_PRODUCT_CODE, COL_USAGE_TYPE,
+    COL_PRODUCT_NAME, COL_USAGE_START, COL_BILL_START, COL_BILL_END, COL_RESOURCE_ID, COL_INSTANCE_TYPE,
+)
+
+DAY_MS = 24 * 3600 * 1000
+HOUR_MS = 3600 * 1000
+DAY_SLOTS = 31              # days of a billing period kept per service (a calendar month)
+PARQUET_BATCH_ROWS = 65_536
+PARQUET_ROW_GROUP_ROWS = 1_000_000
+
+
+@dataclass
+class DashboardOptions:
+    add_coverage: float = 0.30
+    spot_discount: float = 0.60
+    pass_through: Sequence[float] = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 1.0)
+    compute_codes: Sequence[str] = DEFAULT_COMPUTE_CODES
+    rules: dict | None = None  # None → DEFAULT_RULES
+    sp_discount: float | None = None  # Savings Plan rate discount for the optimizer; None → observed
+
+
+class ClassificationRules:
+    """Compiled classification rules: (lineType, productCode, UsageType bits) → flag bitmask.
+
+    UsageType only matters through the `usageTypeContains` substrings, so it is reduced to a
+    bitmask over `patterns` first (see usage_bits); the aggregate cube stores those bits.
+    """
+
+    def __init__(self, rules: dict | None = None, compute_codes: Sequence[str] = DEFAULT_COMPUTE_CODES):
+        self.rules = rules or DEFAULT_RULES
+        self.pool_names = list(self.rules.get("pools") or {})
+        if len(self.pool_names) > MAX_POOLS:
+            raise ValueError(f"at most {MAX_POOLS} pools are supported")
+        self.patterns: list[str] = []
+        codes = frozenset(compute_codes)
+        named = [(n, self.rules.get(n) or []) for n in FLAG_NAMES]
+        named += [(n, self.rules["pools"][n] or []) for n in self.pool_names]
+        self._flags = [(1 << i, [self._alternative(n, a, codes) for a in alts]) for i, (n, alts) in enumerate(named)]
+
+    def _alternative(self, name: str, alt: dict, compute_codes: frozenset) -> tuple:
+        unknown = set(alt) - _RULE_KEYS
+        if unknown:
+            raise ValueError(f"rule {name!r}: unknown condition(s) {sorted(unknown)}")
+
+        def values(key):
+            v = alt.get(key)
+            if v is None:
+                return None
+            return compute_codes if v == "$computeCodes" else frozenset(v)
+
+        ut_mask = 0
+        for pat in alt.get("usageTypeContains") or ():
+            pat = pat.lower()
+            if pat not in self.patterns:
+                self.patterns.append(pat)
+            ut_mask |= 1 << self.patterns.index(pat)
+        return (values("lineType"), values("productCode"),
+                tuple(x.lower() for x in alt.get("lineTypeContains") or ()), ut_mask)
+
+    def usage_bits(self, ut: str) -> int:
+        ut_l = ut.lower()
+        bits = 0
+        for i, pat in enumerate(self.patterns):
+            if pat in ut_l:
+                bits |= 1 << i
+        return bits
+
+    def classify(self, lt: str, pc: str, bits: int) -> int:
+        lt_l = lt.lower()
+        flags = 0
+        for bit, alts in self._flags:
+            for lts, pcs, lt_has, ut_mask in alts:
+                if ((lts is None or lt in lts) and (pcs is None or pc in pcs)
+                        and (not lt_has or any(x in lt_l for x in lt_has))
+                        and (not ut_mask or bits & ut_mask)):
+                    flags |= bit
+                    break
+        return flags
+
+
+def load_rules(path: str | Path) -> dict:
+    """Read a rules JSON file; missing flags fall back to DEFAULT_RULES."""
+    rules = json.loads(Path(path).read_text(encoding="utf-8"))
+    unknown = set(rules) - set(FLAG_NAMES) - {"pools"}
+    if unknown:
+        raise ValueError(f"{path}: unknown rule(s) {sorted(unknown)}")
+    return {**DEFAULT_RULES, **rules}
+
+
+# -----------------------------
+# Value parsing (mirrors num()/str()/new Date() in the page)
+# -----------------------------
+_ISO_DAY = re.compile(r"^(\d{4}-\d{2})-(\d{2})(.*)$")
+_NUM_PREFIX = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[+-]?Infinity")
+
+
+def parse_num(v) -> float:
+    """JS `num()`: strip commas, parseFloat the leading number, non-finite → 0."""
+    if v is None:
+        return 0.0
+    if isinstance(v, (int, float)):
+        return float(v) if math.isfinite(v) else 0.0
+    s = str(v).replace(",", "").strip()
+    m = _NUM_PREFIX.match(s)
+    if not m:
+        return 0.0
+    n = float(m.group(0).replace("Infinity", "inf"))
+    return n if math.isfinite(n) else 0.0
+
+
+def parse_date(s) -> datetime | None:
+    """`new Date(s)` for the ISO-8601 timestamps CURs carry; returns an aware UTC datetime."""
+    if isinstance(s, datetime):
+        dt = s
+    else:
+        if not s:
+            return None
+        s = str(s).strip()
+        try:
+            dt = datetime.fromisoformat(s)
+        except ValueError:
+            # JS rolls day-of-month overflow forward (2024-04-31 → 2024-05-01)
+            m = _ISO_DAY.match(s)
+            if not m or not 1 <= int(m.group(2)) <= 31:
+                return None
+            try:
+                dt = datetime.fromisoformat(m.group(1) + "-01" + m.group(3)) + timedelta(days=int(m.group(2)) - 1)
+            except ValueError:
+                return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def day_key(s) -> str | None:
+    """`new Date(s).toISOString().slice(0,10)`, or None for unparsable dates."""
+    dt = parse_date(s)
+    return dt.date().isoformat() if dt else None
+
+
+def time_keys(s) -> tuple[str, str] | None:
+    """(day, hour) keys of a usage start: `toISOString().slice(0,10)` and `.slice(0,13)`, or None."""
+    dt = parse_date(s)
+    if dt is None:
+        return None
+    hour = dt.isoformat()[:13]
+    return hour[:10], hour
+
+
+def js_iso(dt: datetime | None) -> str | None:
+    """JSON form of a JS Date (`toJSON()`)."""
+    if dt is None:
+        return None
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def js_round(x: float) -> int:
+    return math.floor(x + 0.5)
+
+
+# -----------------------------
+# Input
+# -----------------------------
+def open_cur_text(path: str | Path) -> TextIO:
+    """Open a CUR CSV as streamed text; `.gz` files are decompressed on the fly."""
+    path = Path(path)
+    if path.suffix.lower() == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def read_cur_csv(fh: TextIO) -> tuple[list[str], Iterator[list[str]]]:
+    """Return (header, row iterator) for an open CUR CSV; blank lines are skipped later."""
+    reader = csv.reader(fh)
+    header = next(reader, None) or []
+    return header, reader
+
+
+def is_zip(path: str | Path) -> bool:
+    return Path(path).suffix.lower() == ".zip"
+
+
+def zip_csv_members(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """The CSV members of an open CUR zip, in archive order."""
+    members = [i for i in zf.infolist() if not i.is_dir() and i.filename.lower().endswith(".csv")]
+    if not members:
+        raise ValueError(f"{zf.filename}: no .csv member in the zip")
+    return members
+
+
+def read_cur_zip(zf: zipfile.ZipFile) -> tuple[list[str], Iterator[list[str]]]:
+    """Return (header, row iterator) over the CSV members of an open CUR zip, inflated as they stream.
+
+    AWS puts one CSV in each zip part; several members are read in archive order and must share
+    the header (the page reads zips the same way).
+    """
+    members = zip_csv_members(zf)
+
+    def open_member(info: zipfile.ZipInfo) -> TextIO:
+        return io.TextIOWrapper(zf.open(info), encoding="utf-8-sig", newline="")
+
+    first = open_member(members[0])
+    header, first_rows = read_cur_csv(first)
+
+    def rows() -> Iterator[list[str]]:
+        with first:
+            yield from first_rows
+        for info in members[1:]:
+            with open_member(info) as fh:
+                h, more = read_cur_csv(fh)
+                if h != header:
+                    raise ValueError(f"{zf.filename}: {info.filename} has different columns than {members[0].filename}")
+                yield from more
+
+    return header, rows()
+
+
+def is_parquet(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet support requires pyarrow (pip install pyarrow)") from e
+    return pa, pc, pq
+
+
+def athena_name(col: str) -> str:
+    """CUR CSV header → Athena/CUR 2.0 Parquet name, e.g. lineItem/UsageType → line_item_usage_type."""
+    return "_".join(re.sub(r"(?<!^)(?=[A-Z])", "_", part).lower() for part in col.split("/"))
+
+
+def resolve_columns(names: Iterable[str], wanted: Iterable[str] = SCAN_COLUMNS) -> dict[str, str]:
+    """Map each wanted CSV-style column to the name it has in a file (CSV-style or Athena-style)."""
+    present = set(names)
+    out = {}
+    for c in wanted:
+        for cand in (c, athena_name(c)):
+            if cand in present:
+                out[c] = cand
+                break
+    return out
+
+
+def read_cur_parquet(path: str | Path, batch_rows: int = PARQUET_BATCH_ROWS) -> tuple[list[str], Iterator[tuple]]:
+    """Return (header, row iterator) over a CUR Parquet file, reading only SCAN_COLUMNS.
+
+    Row groups are walked in record batches of `batch_rows`; the header uses the CSV column names,
+    so the rows feed DashboardAccumulator.consume unchanged. Null strings read as "" (the CSV
+    equivalent); numbers and timestamps are passed through as Python floats / datetimes.
+    """
+    pa, pc, pq = _require_pyarrow()
+    pf = pq.ParquetFile(str(path))
+    mapping = resolve_columns(pf.schema_arrow.names)
+    header = list(mapping)
+    actual = [mapping[c] for c in header]
+
+    def rows() -> Iterator[tuple]:
+        for batch in pf.iter_batches(batch_size=batch_rows, columns=actual):
+            cols = []
+            for name in actual:
+                arr = batch.column(name)
+                if pa.types.is_dictionary(arr.type):
+                    arr = arr.dictionary_decode()
+                if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+                    arr = pc.fill_null(arr, "")
+                cols.append(arr.to_pylist())
+            yield from zip(*cols)
+
+    return header, rows()
+
+
+def convert_csv_to_parquet(src: str | Path, dst: str | Path, row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> int:
+    """Stream a CUR CSV (.csv / .csv.gz / .zip) into a zstd Parquet file; returns the row count.
+
+    All columns are kept (as strings, exactly as they appear in the CSV) so the file stays a
+    lossless stand-in for the CSV; later scans project the handful of columns they need. The CSV
+    members of a zip are appended in archive order and must share the header, as in read_cur_zip.
+    """
+    pa, _, pq = _require_pyarrow()
+    import pyarrow.csv as pacsv
+
+    with read_cur(src) as (header, _):
+        pass
+
+    def sources() -> Iterator:
+        if not is_zip(src):
+            yield str(src)   # pyarrow inflates .gz itself
+            return
+        with zipfile.ZipFile(src) as zf:
+            for info in zip_csv_members(zf):
+                with zf.open(info) as fh:
+                    yield fh
+
+    n = 0
+    writer = None
+    members = sources()
+    try:
+        for source in members:
+            reader = pacsv.open_csv(
+                source,
+                read_options=pacsv.ReadOptions(block_size=64 << 20),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={c: pa.string() for c in header}, strings_can_be_null=False),
+            )
+            if reader.schema.names != header:
+                raise ValueError(f"{src}: the zip's CSV members have different columns")
+            for batch in reader:
+                if writer is None:
+                    writer = pq.ParquetWriter(str(dst), batch.schema, compression="zstd")
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_rows)
+                n += batch.num_rows
+    finally:
+        members.close()
+        if writer is not None:
+            writer.close()
+    return n
+
+
+CUR_SUFFIXES = (".csv", ".csv.gz", ".zip", ".parquet", ".pq")
+
+
+def is_cur_file(path: str | Path) -> bool:
+    return Path(path).name.lower().endswith(CUR_SUFFIXES)
+
+
+def is_manifest(path: str | Path) -> bool:
+    """`<report>-Manifest.json` (legacy CUR) or `Manifest.json` (CUR 2.0 Data Exports)."""
+    return Path(path).name.endswith("Manifest.json")
+
+
+def manifest_files(manifest: str | Path) -> list[Path]:
+    """Local part files listed by a CUR manifest (`reportKeys`) or Data Exports manifest (`dataFiles`).
+
+    Keys are S3 keys; each is resolved against the manifest's folder using the longest key
+    suffix that exists locally, which matches how `aws s3 sync` lays a delivery bucket out.
+    """
+    manifest = Path(manifest)
+    doc = json.loads(manifest.read_text(encoding="utf-8"))
+    out = []
+    for key in doc.get("reportKeys") or doc.get("dataFiles") or []:
+        parts = PurePosixPath(re.sub(r"^s3://[^/]+/", "", key)).parts
+        for i in range(len(parts)):
+            cand = manifest.parent.joinpath(*parts[i:])
+            if cand.is_file():
+                out.append(cand)
+                break
+        else:
+            raise FileNotFoundError(f"{manifest}: part {key} not found under {manifest.parent}")
+    return out
+
+
+def period_manifests(root: str | Path) -> list[Path]:
+    """One manifest per billing period under a delivery folder.
+
+    Each assembly folder carries a copy of its manifest; the period-level one (shallowest) points
+    at the current assembly, so older assemblies are never double counted.
+    """
+    by_period: dict = {}
+    for m in sorted(Path(root).rglob("*Manifest.json"), key=lambda m: (len(m.parts), str(m))):
+        try:
+            bp = json.loads(m.read_text(encoding="utf-8")).get("billingPeriod") or {}
+        except (OSError, ValueError):
+            continue
+        key = (bp.get("start"), bp.get("end")) if bp else str(m.parent)
+        by_period.setdefault(key, m)
+    return sorted(by_period.values())
+
+
+def expand_inputs(paths: Iterable[str | Path]) -> list[Path]:
+    """Files, manifests and delivery folders → the ordered, de-duplicated list of CUR part files."""
+    files: list[Path] = []
+    seen = set()
+    for p in map(Path, paths):
+        if p.is_dir():
+            manifests = period_manifests(p)
+            if manifests:
+                found = [f for m in manifests for f in manifest_files(m)]
+            else:
+                found = sorted(f for f in p.rglob("*") if f.is_file() and is_cur_file(f))
+        elif is_manifest(p):
+            found = manifest_files(p)
+        else:
+            found = [p]
+        for f in found:
+            if f not in seen:
+                seen.add(f)
+                files.append(f)
+    return files
+
+
+@contextmanager
+def read_cur(path: str | Path) -> Iterator[tuple[list[str], Iterator[Sequence]]]:
+    """Yield (header, rows) for a CUR CSV, CSV.gz, zip or Parquet file."""
+    if is_parquet(path):
+        yield read_cur_parquet(path)
+        return
+    if is_zip(path):
+        with zipfile.ZipFile(path) as zf:
+            yield read_cur_zip(zf)
+        return
+    with open_cur_text(path) as fh:
+        yield read_cur_csv(fh)
+
+
+# Large uncompressed CSVs are split into newline-aligned byte ranges scanned by several processes
+SPLIT_MIN_BYTES = 32 << 20
+QUOTE = ord('"')
+
+
+def is_plain_csv(path: str | Path) -> bool:
+    return Path(path).suffix.lower() == ".csv"
+
+
+class MappedRange(io.RawIOBase):
+    """Read-only raw stream over bytes [start, end) of a memory map.
+
+    `readinto` copies straight from the mapped pages into the reader's buffer: nothing but that
+    buffer is allocated per read. Pages already read are dropped from the process every
+    RELEASE_BYTES (they stay in the OS page cache), so resident memory does not grow with the file.
+    """
+
+    RELEASE_BYTES = 16 << 20
+
+    def __init__(self, mm: mmap.mmap, start: int, end: int):
+        self._mm, self._view = mm, memoryview(mm)
+        self._pos, self._end = start, end
+        self._kept = start - start % mmap.PAGESIZE
+        self._release = hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), self._end - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        if self._release and self._pos - self._kept >= self.RELEASE_BYTES:
+            upto = self._pos - self._pos % mmap.PAGESIZE
+            self._mm.madvise(mmap.MADV_DONTNEED, self._kept, upto - self._kept)
+            self._kept = upto
+        return n
+
+    def close(self) -> None:
+        self._view.release()    # the map can only be closed once no view is left
+        super().close()
+
+
+@contextmanager
+def map_file(path: str | Path) -> Iterator[mmap.mmap]:
+    """Read-only memory map of a whole file, read ahead sequentially where the OS supports it."""
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        yield mm
+
+
+def count_quotes(path: str | Path, start: int, end: int) -> int:
+    """Double quotes in bytes [start, end) of a file, counted through one 1 MB buffer."""
+    buf, n = bytearray(1 << 20), 0
+    with map_file(path) as mm:
+        raw = MappedRange(mm, start, end)
+        while True:
+            k = raw.readinto(buf)
+            if not k:
+                break
+            n += (buf if k == len(buf) else buf[:k]).count(QUOTE)
+        raw.close()
+    return n
+
+
+def row_start(mm: mmap.mmap, pos: int, parity: int) -> int:
+    """Offset just past the first newline at or after `pos` outside quotes, given the quote parity
+    of the bytes before `pos` (the map's size when there is none)."""
+    size = len(mm)
+    while pos < size:
+        q = mm.find(b'"', pos)
+        if not parity:
+            nl = mm.find(b"\n", pos, q if q >= 0 else size)
+            if nl >= 0:
+                return nl + 1
+        if q < 0:
+            break
+        parity ^= 1
+        pos = q + 1
+    return size
+
+
+def csv_ranges(path: str | Path, k: int, map_fn=map) -> tuple[list[str], list[tuple[int, int]]]:
+    """Header row and up to k byte ranges of a plain CSV, each starting on a row boundary.
+
+    The quotes of k nominal ranges are counted (through `map_fn`, e.g. a process pool's map); the
+    quote parity before each nominal cut then tells which newline after it ends a row, so a quoted
+    field holding newlines never straddles two ranges.
+    """
+    size = Path(path).stat().st_size
+    cuts = [size * s // k for s in range(k + 1)]
+    counts = list(map_fn(count_quotes, repeat(path), cuts[:-1], cuts[1:]))
+    starts = [0]
+    with map_file(path) as mm:
+        parity = 0
+        for s in range(1, k):
+            parity ^= counts[s - 1] & 1
+            at = row_start(mm, cuts[s], parity)
+            if starts[-1] < at < size:
+                starts.append(at)
+        with read_csv_range(mm, 0, row_start(mm, 0, 0)) as (header, _):
+            pass
+    return header, list(zip(starts, starts[1:] + [size]))
+
+
+@contextmanager
+def read_csv_range(mm: mmap.mmap, start: int, end: int,
+                   header: list[str] | None = None) -> Iterator[tuple[list[str], Iterator[list[str]]]]:
+    """Yield (header, rows) for bytes [start, end) of a mapped CSV; `header` stands in for the
+    file's first row when the range does not start at 0."""
+    raw = MappedRange(mm, start, end)
+    with io.TextIOWrapper(io.BufferedReader(raw, 1 << 20), encoding="utf-8-sig" if start == 0 else "utf-8",
+                          newline="") as fh:
+        if header is None:
+            yield read_cur_csv(fh)
+        else:
+            yield header, csv.reader(fh)
+
+
+# -----------------------------
+# Spot candidates: bounded top-K resources / instance types + distinct resource counts
+# -----------------------------
+RESOURCE_TOPK = 256            # counters kept per ranking; the table grows to twice that between prunes
+RESOURCE_TOP_REPORTED = 20
+HLL_BITS = 12                  # 4096 registers, ~1.6% standard error
+RESOURCE_POOLS = (("ec2Box", F_EC2_BOX), ("ecs", F_ECS))
+F_RESOURCE_POOLS = F_EC2_BOX | F_ECS
+
+
+class SpaceSaving:
+    """Weighted Space-Saving top-K: at most 2·capacity counters however many keys are seen.
+
+    A key that is not tracked enters at `floor` (the largest count evicted so far) plus its
+    weight, so a count overstates the key's true total by at most its `overcount`. Evictions
+    are batched: once the table holds 2·capacity keys it is cut back to the `capacity` largest
+    (ties by key), which keeps the page's twin bit-identical. Weights must be positive.
+    """
+
+    def __init__(self, capacity: int = RESOURCE_TOPK):
+        self.capacity = capacity
+        self.floor = 0.0
+        self.items: dict[str, list] = {}    # key → [count, overcount, info]
+
+    def add(self, key: str, w: float, info: str = "") -> None:
+        e = self.items.get(key)
+        if e is not None:
+            e[0] += w
+            return
+        self.items[key] = [self.floor + w, self.floor, info]
+        if len(self.items) >= 2 * self.capacity:
+            self._prune()
+
+    def ranked(self) -> list[tuple[str, list]]:
+        return sorted(self.items.items(), key=lambda kv: (-kv[1][0], kv[0]))
+
+    def _prune(self) -> None:
+        kept = self.ranked()
+        if len(kept) > self.capacity:
+            self.floor = max(self.floor, kept[self.capacity][1][0])
+        self.items.clear()      # in place: the scan loop holds on to the table
+        self.items.update(kept[:self.capacity])
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Mergeable: a key missing on one side may have had up to that side's floor there."""
+        items = {}
+        for k, (c, o, info) in self.items.items():
+            e = other.items.get(k)
+            items[k] = [c + e[0], o + e[1], info] if e is not None else [c + other.floor, o + other.floor, info]
+        for k, (c, o, info) in other.items.items():
+            if k not in self.items:
+                items[k] = [c + self.floor, o + self.floor, info]
+        self.items = items
+        self.floor += other.floor
+        if len(items) >= 2 * self.capacity:
+            self._prune()
+        return self
+
+    def scale(self, factor: float) -> None:
+        self.floor *= factor
+        for e in self.items.values():
+            e[0] *= factor
+            e[1] *= factor
+
+    def to_json(self) -> dict:
+        ranked = self.ranked()
+        return {"floor": self.floor, "keys": [k for k, _ in ranked], "counts": [e[0] for _, e in ranked],
+                "overcounts": [e[1] for _, e in ranked], "info": [e[2] for _, e in ranked]}
+
+    @classmethod
+    def from_json(cls, d: dict) -> "SpaceSaving":
+        t = cls()
+        t.floor = d["floor"]
+        t.items = {k: [c, o, i] for k, c, o, i in zip(d["keys"], d["counts"], d["overcounts"], d["info"])}
+        return t
+
+
+def hash32(s: str) -> int:
+    """CRC-32 of the UTF-8 bytes through MurmurHash3's finalizer (the page's hash32)."""
+    h = zlib.crc32(s.encode("utf-8"))
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+
+@lru_cache(maxsize=1 << 16)
+def _hll_slot(s: str, bits: int) -> tuple[int, int]:
+    """(register, rank of the first 1-bit after the register bits) of s's hash."""
+    h = hash32(s)
+    rest = (h << bits) & 0xFFFFFFFF
+    return h >> (32 - bits), 33 - rest.bit_length() if rest else 33 - bits
+
+
+class HyperLogLog:
+    """Distinct-count estimate from 2**bits one-byte registers; merged by register-wise max."""
+
+    def __init__(self, bits: int = HLL_BITS):
+        self.bits = bits
+        self.registers = bytearray(1 << bits)
+
+    def add(self, s: str) -> None:
+        i, rank = _hll_slot(s, self.bits)
+        if rank > self.registers[i]:
+            self.registers[i] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        total, zeros = 0.0, 0
+        for r in self.registers:
+            total += 2.0 ** -r
+            if not r:
+                zeros += 1
+        e = 0.7213 / (1 + 1.079 / m) * m * m / total
+        if e <= 2.5 * m and zeros:
+            e = m * math.log(m / zeros)              # small range: linear counting
+        elif e > 2 ** 32 / 30:
+            e = -(2 ** 32) * math.log(1 - e / 2 ** 32)  # 32-bit hash collisions
+        return js_round(e)
+
+
+class ResourceStats:
+    """Spot candidates of one period partial: per pool (EC2 box usage, ECS / Fargate), the top
+    resource IDs and instance types by net cost and the number of distinct resource IDs."""
+
+    def __init__(self):
+        # pool → (top resource IDs, top instance types, distinct resource IDs)
+        self.pools = {name: (SpaceSaving(), SpaceSaving(), HyperLogLog()) for name, _ in RESOURCE_POOLS}
+        self._index()
+
+    def _index(self) -> None:
+        # flags & F_RESOURCE_POOLS → the pools a line belongs to
+        self._targets = {f: [self.pools[name] for name, bit in RESOURCE_POOLS if f & bit]
+                         for f in range(F_RESOURCE_POOLS + 1) if not f & ~F_RESOURCE_POOLS}
+
+    def add(self, f: int, net: float, resource_id: str, instance_type: str) -> None:
+        # called for millions of lines: the counters' and registers' fast paths are inlined
+        for ids, types, hll in self._targets[f & F_RESOURCE_POOLS]:
+            if resource_id:
+                e = ids.items.get(resource_id)
+                if e is None:
+                    i, rank = _hll_slot(resource_id, hll.bits)
+                    if rank > hll.registers[i]:
+                        hll.registers[i] = rank
+                    if net > 0:
+                        ids.add(resource_id, net, instance_type)
+                elif net > 0:
+                    e[0] += net     # a tracked ID has been counted in hll already
+            if instance_type and net > 0:
+                e = types.items.get(instance_type)
+                if e is None:
+                    types.add(instance_type, net)
+                else:
+                    e[0] += net
+
+    def merge(self, other: "ResourceStats") -> "ResourceStats":
+        for name, mine in self.pools.items():
+            for a, b in zip(mine, other.pools[name]):
+                a.merge(b)
+        return self
+
+    def scale(self, factor: float) -> None:
+        for ids, types, _ in self.pools.values():
+            ids.scale(factor)
+            types.scale(factor)
+
+    def metrics(self, n: int = RESOURCE_TOP_REPORTED) -> dict:
+        out = {}
+        for name, (ids, types, hll) in self.pools.items():
+            out[name] = {
+                "distinctResources": hll.count(),
+                "resources": [{"id": k, "instanceType": e[2], "net": e[0], "overcount": e[1]}
+                              for k, e in ids.ranked()[:n]],
+                "instanceTypes": [{"id": k, "net": e[0], "overcount": e[1]} for k, e in types.ranked()[:n]],
+            }
+        return out
+
+    def to_json(self) -> dict:
+        return {name: {"ids": ids.to_json(), "types": types.to_json(), "hll": list(hll.registers)}
+                for name, (ids, types, hll) in self.pools.items()}
+
+    @classmethod
+    def from_json(cls, d: dict) -> "ResourceStats":
+        r = cls()
+        for name, (_, _, hll) in r.pools.items():
+            if name in d:
+                hll.registers = bytearray(d[name]["hll"])
+                r.pools[name] = (SpaceSaving.from_json(d[name]["ids"]), SpaceSaving.from_json(d[name]["types"]), hll)
+        r._index()
+        return r
+
+
+# -----------------------------
+# Core computation (init → consume → finalize, like the page)
+# -----------------------------
+class PeriodAggregate:
+    """Mergeable partial aggregate for one billing period: running sums + day/hour/service maps.
+
+    Each service's variable spend per day is kept in DAY_SLOTS fixed slots (see day_slot), so a
+    service costs the same memory however many days and rows the period has. Slots are sums, so
+    partials of one period (parts, byte ranges) merge by adding them.
+    """
+
+    SUMS = (
+        "total_bill", "fixed_monthly", "compute_public_baseline", "compute_actual_cost", "covered_public",
+        "spot_net", "ec2_box_net", "ec2_box_public", "ecs_net", "ecs_public", "fargate_spot_net",
+    )
+
+    def __init__(self, bill_start: str = "", bill_end: str = "", n_pools: int = 0):
+        self.bill_start = bill_start
+        self.bill_end = bill_end
+        self.row_count = 0
+        self.daily_var: dict[str, float] = {}
+        self.hourly_var: dict[str, float] = {}
+        self.hourly_compute: dict[str, float] = {}   # publicOnDemandCost of compute lines
+        self.service_spend: dict[str, float] = {}
+        self.service_days: dict[str, list[float]] = {}   # service → DAY_SLOTS day totals of variable spend
+        self.resources = ResourceStats()
+        self.pool_net = [0.0] * n_pools
+        self.pool_public = [0.0] * n_pools
+        for k in self.SUMS:
+            setattr(self, k, 0.0)
+
+    def merge(self, other: "PeriodAggregate") -> "PeriodAggregate":
+        self.row_count += other.row_count
+        for k in self.SUMS:
+            setattr(self, k, getattr(self, k) + getattr(other, k))
+        for mine, theirs in ((self.pool_net, other.pool_net), (self.pool_public, other.pool_public)):
+            mine.extend([0.0] * (len(theirs) - len(mine)))
+            for i, v in enumerate(theirs):
+                mine[i] += v
+        for mine, theirs in ((self.daily_var, other.daily_var), (self.hourly_var, other.hourly_var),
+                             (self.hourly_compute, other.hourly_compute), (self.service_spend, other.service_spend)):
+            for key, v in theirs.items():
+                mine[key] = mine.get(key, 0.0) + v
+        for svc, theirs in other.service_days.items():
+            mine = self.service_days.get(svc)
+            if mine is None:
+                self.service_days[svc] = list(theirs)
+            else:
+                for i, v in enumerate(theirs):
+                    mine[i] += v
+        self.resources.merge(other.resources)
+        return self
+
+    @property
+    def period_start(self) -> datetime | None:
+        return parse_date(self.bill_start) if self.bill_start else None
+
+    @property
+    def period_end(self) -> datetime | None:
+        return parse_date(self.bill_end) if self.bill_end else None
+
+    def period_days(self) -> list[str] | None:
+        """The billing period's days (UTC dates), or None when the period has no dates."""
+        start, end = self.period_start, self.period_end
+        if not (start and end):
+            return None
+        days_in_month = max(1, js_round((end - start) / timedelta(milliseconds=DAY_MS)))
+        return [(start + timedelta(days=i)).date().isoformat() for i in range(days_in_month)]
+
+    def day_slot(self, day: str) -> int:
+        """Slot of a usage day ("YYYY-MM-DD") in service_days: its index among the period's days,
+        -1 outside them. Without period dates it is the day of the month - 1 (so days of
+        different months share a slot)."""
+        start, end = self.period_start, self.period_end
+        if not (start and end):
+            return int(day[8:10]) - 1
+        days_in_month = max(1, js_round((end - start) / timedelta(milliseconds=DAY_MS)))
+        i = (date.fromisoformat(day) - start.date()).days
+        return i if 0 <= i < min(days_in_month, DAY_SLOTS) else -1
+
+    def daily_series(self) -> tuple[list[str], list[float], list[float]]:
+        """(dates, variable spend, normalized spend); fixed fees are spread evenly over the period."""
+        dates = self.period_days()
+        if dates is None:
+            dates = sorted(self.daily_var)
+        fixed_per_day = self.fixed_monthly / max(1, len(dates))
+        var_y = [self.daily_var.get(k, 0.0) for k in dates]
+        return dates, var_y, [v + fixed_per_day for v in var_y]
+
+    def hourly_series(self) -> tuple[list[str], list[float], list[float]]:
+        """(hours, variable spend, compute public On-Demand) on every hour of the period."""
+        start, end = self.period_start, self.period_end
+        if start and end:
+            n = max(1, js_round((end - start) / timedelta(milliseconds=HOUR_MS)))
+            hours = [(start + timedelta(hours=i)).isoformat()[:13] for i in range(n)]
+        else:
+            hours = sorted(self.hourly_var.keys() | self.hourly_compute.keys())
+        return (hours, [self.hourly_var.get(k, 0.0) for k in hours],
+                [self.hourly_compute.get(k, 0.0) for k in hours])
+
+
+def period_key(bill_start, bill_end) -> tuple[str, str]:
+    """Normalized billing-period key, so CSV strings and Parquet timestamps land together."""
+    out = []
+    for v in (bill_start, bill_end):
+        v = "" if v is None else v
+        dt = parse_date(v) if v != "" else None
+        out.append(js_iso(dt) if dt else str(v))
+    return out[0], out[1]
+
+
+class DashboardAccumulator:
+    """Routes rows to per-billing-period aggregates; memory is independent of row count."""
+
+    def __init__(self, opts: DashboardOptions | None = None):
+        self.opts = opts or DashboardOptions()
+        self.rules = ClassificationRules(self.opts.rules, self.opts.compute_codes)
+        self.periods: dict[tuple[str, str], PeriodAggregate] = {}
+
+        # memo tables: a CUR has millions of rows but few distinct keys
+        self._flags: dict[tuple, int] = {}
+        self._times: dict[str, tuple[str, str] | None] = {}
+        self._resource_cols: tuple[int | None, int | None] = (None, None)
+
+    def __getstate__(self):
+        # partials cross process boundaries; the memo tables are cheap to rebuild
+        state = self.__dict__.copy()
+        state["_flags"], state["_times"] = {}, {}
+        return state
+
+    @property
+    def row_count(self) -> int:
+        return sum(p.row_count for p in self.periods.values())
+
+    def _classify(self, lt: str, pc: str, ut: str) -> int:
+        flags = self.rules.classify(lt, pc, self.rules.usage_bits(ut))
+        self._flags[(lt, pc, ut)] = flags
+        return flags
+
+    def _time(self, s: str) -> tuple[str, str] | None:
+        keys = time_keys(s)
+        self._times[s] = keys
+        return keys
+
+    def period(self, bill_start, bill_end) -> PeriodAggregate:
+        key = period_key(bill_start, bill_end)
+        agg = self.periods.get(key)
+        if agg is None:
+            agg = self.periods[key] = PeriodAggregate(*key, len(self.rules.pool_names))
+        return agg
+
+    def consume(self, header: Sequence[str], rows: Iterable[Sequence]) -> "DashboardAccumulator":
+        """Fold rows (sequences aligned with `header`) into their billing period's sums, in order."""
+        idx: dict[str, int] = {}
+        for i, name in enumerate(header):
+            idx.setdefault(name, i)
+
+        def pick(*names):
+            for n in names:
+                if n in idx:
+                    return idx[n]
+            return None
+
+        positions = (
+            pick(COL_NET, COL_UNBLENDED), pick(COL_PUBLIC_OD), pick(COL_LINE_TYPE),
+            pick(COL_PRODUCT_CODE), pick(COL_USAGE_TYPE), pick(COL_PRODUCT_NAME, COL_PRODUCT_CODE),
+            pick(COL_USAGE_START),
+        )
+        i_bs, i_be = idx.get(COL_BILL_START), idx.get(COL_BILL_END)
+        self._resource_cols = (idx.get(COL_RESOURCE_ID), idx.get(COL_INSTANCE_TYPE))
+        width = len(header)
+
+        def slow(row):
+            # exact `a ?? b ?? default` chains for short rows / missing columns
+            def g(*names):
+                for n in names:
+                    i = idx.get(n)
+                    if i is not None and i < len(row) and row[i] is not None:
+                        return row[i]
+                return None
+
+            lt, pc, ut = g(COL_LINE_TYPE), g(COL_PRODUCT_CODE), g(COL_USAGE_TYPE)
+            svc = g(COL_PRODUCT_NAME, COL_PRODUCT_CODE)
+            return (
+                g(COL_NET, COL_UNBLENDED), g(COL_PUBLIC_OD),
+                "Unknown" if lt is None else str(lt), "Unknown" if pc is None else str(pc),
+                "" if ut is None else str(ut), "Unknown" if svc is None else str(svc),
+                g(COL_USAGE_START), _cell(row, i_bs), _cell(row, i_be),
+            )
+
+        cols = positions + (i_bs, i_be)
+        fast = itemgetter(*cols) if None not in cols else None
+
+        # CUR files come in long runs of one billing period: each run is folded with the period's
+        # sums held in locals, and the run ends at the first row of another period
+        it = iter(rows)
+        row = next(it, None)
+        while row is not None:
+            if not row:
+                row = next(it, None)  # skipEmptyLines
+                continue
+            vals = fast(row) if fast is not None and len(row) >= width else slow(row)
+            row = self._consume_run(self.period(vals[7], vals[8]), (vals[7], vals[8]), row, it, fast, slow, width)
+        return self
+
+    def _consume_run(self, agg: PeriodAggregate, key: tuple, first: Sequence, it: Iterator[Sequence],
+                     fast, slow, width: int) -> Sequence | None:
+        """Fold `first` and the following rows of the same period; return the first row of the next one."""
+        flags_memo, times_memo = self._flags, self._times
+        classify, to_time = self._classify, self._time
+        daily_var, service_spend, service_days = agg.daily_var, agg.service_spend, agg.service_days
+        slot_of: dict[str, int] = {}     # usage day → agg.day_slot
+        hourly_var, hourly_compute = agg.hourly_var, agg.hourly_compute
+        total_bill, fixed_monthly = agg.total_bill, agg.fixed_monthly
+        cpb, cac, cov = agg.compute_public_baseline, agg.compute_actual_cost, agg.covered_public
+        spot_net, ec2_net, ec2_pub = agg.spot_net, agg.ec2_box_net, agg.ec2_box_public
+        ecs_net, ecs_pub, fg_spot = agg.ecs_net, agg.ecs_public, agg.fargate_spot_net
+        pool_net, pool_pub = agg.pool_net, agg.pool_public
+        add_resource = agg.resources.add
+        i_rid, i_it = self._resource_cols
+        if i_rid is not None and i_it is not None:
+            resource_cells = itemgetter(i_rid, i_it)
+        else:
+            def resource_cells(row):
+                return _cell(row, i_rid), _cell(row, i_it)
+        bs0, be0 = key
+        inf = math.inf
+        n = 0
+        nxt = None
+
+        for row in chain((first,), it):
+            if fast is not None and len(row) >= width:
+                net_s, pub_s, lt, pc, ut, svc, us, bs, be = fast(row)
+            elif not row:
+                continue  # skipEmptyLines
+            else:
+                net_s, pub_s, lt, pc, ut, svc, us, bs, be = slow(row)
+            if bs != bs0 or be != be0:
+                nxt = row
+                break
+            n += 1
+
+            try:
+                net = float(net_s)
+                if not -inf < net < inf:
+                    net = 0.0
+            except (TypeError, ValueError):
+                net = parse_num(net_s)
+            if pub_s:
+                try:
+                    pub = float(pub_s)
+                    if not -inf < pub < inf:
+                        pub = 0.0
+                except (TypeError, ValueError):
+                    pub = parse_num(pub_s)
+            else:
+                pub = 0.0
+
+            total_bill += net
+            service_spend[svc] = service_spend.get(svc, 0.0) + net
+
+            f = flags_memo.get((lt, pc, ut))
+            if f is None:
+                f = classify(lt, pc, ut)
+            if f & F_RESOURCE_POOLS:
+                rid, itype = resource_cells(row) if len(row) >= width else (_cell(row, i_rid), _cell(row, i_it))
+                add_resource(f, net, rid, itype or "")
+
+            if f & F_FIXED:
+                fixed_monthly += net
+            elif us:
+                t = times_memo.get(us, 0)
+                if t == 0:
+                    t = to_time(us)
+                if t is not None:
+                    d, h = t
+                    daily_var[d] = daily_var.get(d, 0.0) + net
+                    slot = slot_of.get(d)
+                    if slot is None:
+                        slot = slot_of[d] = agg.day_slot(d)
+                    if slot >= 0:
+                        by_day = service_days.get(svc)
+                        if by_day is None:
+                            by_day = service_days[svc] = [0.0] * DAY_SLOTS
+                        by_day[slot] += net
+                    hourly_var[h] = hourly_var.get(h, 0.0) + net
+                    if f & F_COMPUTE:
+                        hourly_compute[h] = hourly_compute.get(h, 0.0) + pub
+
+            if f & F_COMPUTE:
+                cpb += pub
+                cac += net
+                if f & F_SP_COVERED:
+                    cov += pub
+            if f & F_SPOT:
+                spot_net += net
+            if f & F_EC2_BOX:
+                ec2_net += net
+                ec2_pub += pub
+            if f & F_ECS:
+                ecs_net += net
+                ecs_pub += pub
+                if f & F_FARGATE_SPOT:
+                    fg_spot += net
+            pools = f >> POOL_SHIFT
+            if pools:
+                i = 0
+                while pools:
+                    if pools & 1:
+                        pool_net[i] += net
+                        pool_pub[i] += pub
+                    pools >>= 1
+                    i += 1
+
+        agg.total_bill, agg.fixed_monthly = total_bill, fixed_monthly
+        agg.compute_public_baseline, agg.compute_actual_cost, agg.covered_public = cpb, cac, cov
+        agg.spot_net, agg.ec2_box_net, agg.ec2_box_public = spot_net, ec2_net, ec2_pub
+        agg.ecs_net, agg.ecs_public, agg.fargate_spot_net = ecs_net, ecs_pub, fg_spot
+        agg.row_count += n
+        return nxt
+
+    def consume_cube(self, cube: dict) -> "DashboardAccumulator":
+        """Fold a report cube (CubeAccumulator.to_cube) in, as the page's consumeCube does."""
+        if cube["usagePatterns"] != self.rules.patterns:
+            raise ValueError("cube was built with different UsageType patterns than the current rules")
+        dims, c = cube["dims"], cube["cells"]
+        periods = [self.period(bs, be) for bs, be in cube["periods"]]
+        flags_of: dict[tuple, int] = {}
+        slot_of: dict[tuple, int] = {}   # (period, day) code → agg.day_slot
+        for i in range(len(c["net"])):
+            key = (c["lineType"][i], c["productCode"][i], c["usage"][i])
+            f = flags_of.get(key)
+            if f is None:
+                f = flags_of[key] = self.rules.classify(dims["lineType"][key[0]], dims["productCode"][key[1]], key[2])
+            agg, net, pub = periods[c["period"][i]], c["net"][i], c["publicOD"][i]
+            agg.row_count += c["rows"][i]
+            svc = dims["service"][c["service"][i]]
+            agg.service_spend[svc] = agg.service_spend.get(svc, 0.0) + net
+            agg.total_bill += net
+            day = dims["day"][c["day"][i]]
+            if f & F_FIXED:
+                agg.fixed_monthly += net
+            elif day:
+                agg.daily_var[day] = agg.daily_var.get(day, 0.0) + net
+                pd = (c["period"][i], c["day"][i])
+                slot = slot_of.get(pd)
+                if slot is None:
+                    slot = slot_of[pd] = agg.day_slot(day)
+                if slot >= 0:
+                    by_day = agg.service_days.get(svc)
+                    if by_day is None:
+                        by_day = agg.service_days[svc] = [0.0] * DAY_SLOTS
+                    by_day[slot] += net
+            if f & F_COMPUTE:
+                agg.compute_public_baseline += pub
+                agg.compute_actual_cost += net
+                if f & F_SP_COVERED:
+                    agg.covered_public += pub
+            if f & F_SPOT:
+                agg.spot_net += net
+            if f & F_EC2_BOX:
+                agg.ec2_box_net += net
+                agg.ec2_box_public += pub
+            if f & F_ECS:
+                agg.ecs_net += net
+                agg.ecs_public += pub
+                if f & F_FARGATE_SPOT:
+                    agg.fargate_spot_net += net
+            pools, j = f >> POOL_SHIFT, 0
+            while pools:
+                if pools & 1:
+                    agg.pool_net[j] += net
+                    agg.pool_public[j] += pub
+                pools >>= 1
+                j += 1
+        h = cube.get("hourly") or {"hour": []}   # absent in version 2 cubes
+        for i, hour in enumerate(h["hour"]):
+            agg = periods[h["period"][i]]
+            agg.hourly_var[hour] = agg.hourly_var.get(hour, 0.0) + h["net"][i]
+            agg.hourly_compute[hour] = agg.hourly_compute.get(hour, 0.0) + h["computePublicOD"][i]
+        for agg, r in zip(periods, cube.get("resources") or []):   # absent before version 4
+            agg.resources.merge(ResourceStats.from_json(r))
+        return self
+
+    def merge(self, other: "DashboardAccumulator") -> "DashboardAccumulator":
+        """Combine another file's partials into this one, billing period by billing period."""
+        for key, agg in other.periods.items():
+            mine = self.periods.get(key)
+            if mine is None:
+                self.periods[key] = copy.deepcopy(agg)
+            else:
+                mine.merge(agg)
+        return self
+
+    def summarize(self) -> dict:
+        """The scan summary: per-period and cross-period metrics, independent of scenario parameters.
+
+        With several billing periods the combined figures are monthly averages across periods
+        (ratios are unaffected) and the daily series runs over all of them. Feed the summary to
+        `evaluate_dashboard` as often as needed; it never touches the CUR again.
+        """
+        names = self.rules.pool_names
+        aggs = sorted(self.periods.values(), key=_period_sort_key) or [PeriodAggregate(n_pools=len(names))]
+        per = [_scan_metrics(a, names, a.period_start, a.period_end, a.daily_series(), a.hourly_series(), [a])
+               for a in aggs]
+        if len(aggs) == 1:
+            return {"combined": per[0], "periods": per}
+
+        combined = PeriodAggregate(n_pools=len(names))
+        for a in aggs:
+            combined.merge(a)
+        scale = 1.0 / len(aggs)
+        for k in PeriodAggregate.SUMS:
+            setattr(combined, k, getattr(combined, k) * scale)
+        combined.service_spend = {k: v * scale for k, v in combined.service_spend.items()}
+        combined.resources.scale(scale)
+        combined.pool_net = [v * scale for v in combined.pool_net]
+        combined.pool_public = [v * scale for v in combined.pool_public]
+        combined.service_days = {}   # day slots are per period: the spikes read each period's own
+
+        by_date: dict[str, list[float]] = {}
+        for r in per:
+            for d, v, nv in zip(r["dailyX"], r["dailyVarY"], r["dailyNormY"]):
+                slot = by_date.setdefault(d, [0.0, 0.0])
+                slot[0] += v
+                slot[1] += nv
+        dates = sorted(by_date)
+        by_hour: dict[str, list[float]] = {}
+        for r in per:
+            for h, v, cv in zip(r["hourlyX"], r["hourlyVarY"], r["hourlyComputeY"]):
+                slot = by_hour.setdefault(h, [0.0, 0.0])
+                slot[0] += v
+                slot[1] += cv
+        hours = sorted(by_hour)
+        starts = [a.period_start for a in aggs if a.period_start]
+        ends = [a.period_end for a in aggs if a.period_end]
+        return {
+            "combined": _scan_metrics(
+                combined, names, min(starts) if starts else None, max(ends) if ends else None,
+                (dates, [by_date[d][0] for d in dates], [by_date[d][1] for d in dates]),
+                (hours, [by_hour[h][0] for h in hours], [by_hour[h][1] for h in hours]), aggs),
+            "periods": per,
+        }
+
+    def finalize(self) -> dict:
+        """Same object (same keys) as the page's finalizeDashboard, plus per-period results."""
+        return evaluate_dashboard(self.summarize(), self.opts)
+
+
+def _period_sort_key(agg: PeriodAggregate):
+    return (agg.bill_start == "", agg.bill_start, agg.bill_end)
+
+
+def _scan_metrics(agg: PeriodAggregate, pool_names: Sequence[str], period_start, period_end,
+                  daily: tuple[list, list, list], hourly: tuple[list, list, list],
+                  parts: Sequence[PeriodAggregate]) -> dict:
+    """Everything in the result that needs the CUR rows (the page's scanMetrics); `parts` are the
+    periods agg covers (agg itself, or every period for the combined figures)."""
+    dates, daily_var_y, daily_norm_y = daily
+    hours, hourly_var_y, hourly_compute_y = hourly
+    total_bill = agg.total_bill
+    cpb, cac = agg.compute_public_baseline, agg.compute_actual_cost
+    services = sorted(agg.service_spend.items(), key=itemgetter(1), reverse=True)
+    top = services[:TOP_SERVICES]
+    return {
+        "periodStart": js_iso(period_start), "periodEnd": js_iso(period_end),
+        "dailyX": dates, "dailyNormY": daily_norm_y, "dailyVarY": daily_var_y,
+        "hourlyX": hours, "hourlyVarY": hourly_var_y, "hourlyComputeY": hourly_compute_y,
+        "totalBill": total_bill, "computePublicBaseline": cpb, "computeActualCost": cac,
+        "computeShareTotal": cac / total_bill if total_bill > 0 else 0.0,
+        "observedDiscount": (1 - cac / cpb) if cpb > 0 else 0.0,
+        "currentCoverage": agg.covered_public / cpb if cpb > 0 else 0.0,
+        "topSvcNames": [k for k, _ in top], "topSvcCosts": [v for _, v in top],
+        "svcNames": [k for k, _ in services], "svcCosts": [v for _, v in services],
+        "spotNet": agg.spot_net,
+        "spotShareTotal": agg.spot_net / total_bill if total_bill > 0 else 0.0,
+        "spotShareCompute": agg.spot_net / cac if cac > 0 else 0.0,
+        "ec2BoxNet": agg.ec2_box_net, "ecsNet": agg.ecs_net, "fargateSpotNet": agg.fargate_spot_net,
+        "candidateEC2Box": agg.ec2_box_public if agg.ec2_box_public > 0 else agg.ec2_box_net,
+        "candidateECS": agg.ecs_public if agg.ecs_public > 0 else agg.ecs_net,
+        "pools": [{"name": n, "net": agg.pool_net[i], "publicOD": agg.pool_public[i]}
+                  for i, n in enumerate(pool_names)],
+        "resources": agg.resources.metrics(),
+        "spikes": spike_metrics(parts, dates, daily_var_y),
+        "dailyP95": series_quantile((daily_norm_y, daily_var_y), 0.95),
+        "hourlyP95": series_quantile((hourly_var_y, hourly_compute_y), 0.95),
+    }
+
+
+# -----------------------------
+# Spend spikes: robust (median / MAD) z-scores; per-service baselines from KLL quantile sketches
+# -----------------------------
+SKETCH_K = 128
+SPIKE_Z = 3.5
+SPIKE_MIN_EXCESS = 0.05     # and at least 5% above the typical day
+SPIKE_MAX_DAYS = 20
+SPIKE_CONTRIBUTORS = 5
+
+
+class QuantileSketch:
+    """KLL quantile sketch: a fixed number of retained items however many values are added.
+
+    Level h holds items of weight 2**h; a full level is sorted and every other item is promoted.
+    The promoted half alternates per level instead of being chosen at random, so the same values
+    in the same order give the same sketch here and in the page.
+    """
+
+    def __init__(self, k: int = SKETCH_K):
+        self.k = k
+        self.n = 0
+        self.size = 0
+        self.levels: list[list[float]] = [[]]
+        self.parity = [0]
+        self.cap = self._capacity()
+
+    def _capacity(self, h: int | None = None) -> int:
+        """Level h's capacity (⌈(2/3)**depth · k⌉, at least 2, depth from the top), or the total."""
+        total, c = 0, self.k
+        for i in range(len(self.levels) - 1, -1, -1):
+            if i == h:
+                return c
+            total += c
+            c = max(2, (2 * c + 2) // 3)
+        return total
+
+    def add(self, x: float) -> None:
+        self.levels[0].append(x)
+        self.n += 1
+        self.size += 1
+        if self.size <= self.cap:
+            return
+        levels = self.levels
+        for h in range(len(levels)):
+            if len(levels[h]) < self._capacity(h):
+                continue
+            if h == len(levels) - 1:
+                levels.append([])
+                self.parity.append(0)
+                self.cap = self._capacity()
+            lv = sorted(levels[h])
+            m = len(lv) - (len(lv) & 1)     # an odd item out stays on its level
+            levels[h + 1].extend(lv[self.parity[h]:m:2])
+            self.parity[h] ^= 1
+            levels[h] = lv[m:]
+            self.size -= m // 2
+            return
+
+    def items(self) -> list[tuple[float, int]]:
+        """Retained (value, weight) pairs, ascending; the weights sum to n."""
+        return sorted(((v, 1 << h) for h, lv in enumerate(self.levels) for v in lv), key=itemgetter(0))
+
+    def quantile(self, q: float) -> float:
+        return weighted_quantile(self.items(), self.n, q)
+
+
+def weighted_quantile(items: Sequence[tuple[float, int]], n: int, q: float) -> float:
+    """Smallest value whose cumulative weight reaches q·n (0 for no items)."""
+    cum = 0
+    for v, w in items:
+        cum += w
+        if cum >= q * n:
+            return v
+    return items[-1][0] if items else 0.0
+
+
+def quantile(values: Iterable[float], q: float) -> float:
+    """Smallest value with at least q·n of the values at or below it (0 for no values); exact."""
+    xs = sorted(values)
+    return xs[max(0, math.ceil(q * len(xs)) - 1)] if xs else 0.0
+
+
+def series_quantile(series: Iterable[Sequence[float]], q: float) -> float:
+    return quantile(chain.from_iterable(series), q)
+
+
+def robust_scale(values: Iterable[float]) -> tuple[float, float, float]:
+    """(median, MAD, scale): scale is 1.4826·MAD, or 1.2533·mean absolute deviation if MAD is 0."""
+    xs = sorted(values)
+    median = quantile(xs, 0.5)
+    dev = [abs(v - median) for v in xs]
+    mad = quantile(dev, 0.5)
+    scale = 1.4826 * mad if mad > 0 else (1.2533 * sum(dev) / len(xs) if xs else 0.0)
+    return median, mad, scale
+
+
+def spike_metrics(parts: Sequence[PeriodAggregate], days: Sequence[str], values: Sequence[float]) -> dict:
+    """Days whose variable spend is more than SPIKE_Z robust z-scores above the typical day.
+
+    Each flagged day lists the services furthest above their own median day (a day without
+    spend counts as 0), largest excess first. A service's day totals are the day slots of the
+    period in `parts` that holds the day, and its median comes from a KLL sketch fed one service
+    at a time, so the baselines take the same memory for years of days as for a month. Same
+    figures as the page's spikeMetrics.
+    """
+    median, mad, scale = robust_scale(values)
+    flagged = []
+    for d, v in zip(days, values):
+        excess = v - median
+        if scale > 0 and excess / scale > SPIKE_Z and excess >= SPIKE_MIN_EXCESS * abs(median):
+            flagged.append({"day": d, "value": v, "baseline": median, "excess": excess,
+                            "z": excess / scale, "contributors": []})
+    flagged.sort(key=lambda s: (-s["excess"], s["day"]))
+    out = flagged[:SPIKE_MAX_DAYS]
+    if out:
+        # each day → (its period's service day slots, slot); None for a day no period holds
+        where = {}
+        for d in days:
+            for p in parts:
+                slot = p.day_slot(d)
+                if slot >= 0:
+                    where[d] = (p.service_days, slot)
+                    break
+            else:
+                where[d] = None
+
+        def spend(svc: str, d: str) -> float:
+            w = where[d]
+            by_day = w[0].get(svc) if w else None
+            return by_day[w[1]] if by_day else 0.0
+
+        baselines = []
+        for svc in sorted(set().union(*(p.service_days for p in parts))):
+            sk = QuantileSketch()
+            for d in days:
+                sk.add(spend(svc, d))
+            baselines.append((svc, sk.quantile(0.5)))
+        for s in out:
+            contributors = []
+            for svc, baseline in baselines:
+                net = spend(svc, s["day"])
+                if net - baseline > 0:
+                    contributors.append({"service": svc, "net": net, "baseline": baseline, "excess": net - baseline})
+            contributors.sort(key=lambda c: (-c["excess"], c["service"]))
+            s["contributors"] = contributors[:SPIKE_CONTRIBUTORS]
+    return {"median": median, "mad": mad, "threshold": median + SPIKE_Z * scale, "days": out}
+
+
+def evaluate_scenarios(m: dict, opts: DashboardOptions, periods: int = 1) -> dict:
+    """KPIs + scenario tables from scan metrics (the page's evaluateScenarios); no CUR access.
+
+    `periods` is the number of billing periods m's hourly series spans (the commitment optimizer
+    reports savings per period, like the other monthly figures).
+    """
+    total_bill, cpb = m["totalBill"], m["computePublicBaseline"]
+    observed_discount = m["observedDiscount"]
+
+    add_coverage = max(0.0, min(1.0, opts.add_coverage))
+    target_coverage = min(1.0, m["currentCoverage"] + add_coverage)
+    incremental_commitment_od = cpb * add_coverage
+    affected_slice_total_bill = m["computeShareTotal"] * add_coverage
+
+    pt_rows = []
+    for pt in opts.pass_through:
+        disc_to_customer = observed_discount * pt
+        overall_reduction = affected_slice_total_bill * disc_to_customer
+        monthly_savings = total_bill * overall_reduction
+        pt_rows.append({
+            "pt": pt, "discToCustomer": disc_to_customer, "overallReduction": overall_reduction,
+            "monthlySavings": monthly_savings, "annualSavings": monthly_savings * 12,
+        })
+
+    spot_disc = max(0.0, min(0.95, opts.spot_discount))
+    spot_scenario = []
+    for a in SPOT_ADOPTION:
+        sav_ec2 = m["candidateEC2Box"] * a * spot_disc
+        sav_ecs = m["candidateECS"] * a * spot_disc
+        spot_scenario.append({
+            "a": a,
+            "savEC2": sav_ec2, "overallEC2": sav_ec2 / total_bill if total_bill > 0 else 0.0,
+            "savECS": sav_ecs, "overallECS": sav_ecs / total_bill if total_bill > 0 else 0.0,
+        })
+
+    return {
+        "periodStart": m["periodStart"], "periodEnd": m["periodEnd"],
+        "totalBill": total_bill, "computePublicBaseline": cpb, "computeActualCost": m["computeActualCost"],
+        "computeShareTotal": m["computeShareTotal"],
+        "observedDiscount": observed_discount, "currentCoverage": m["currentCoverage"],
+        "addCoverage": add_coverage, "targetCoverage": target_coverage,
+        "incrementalCommitmentOD": incremental_commitment_od, "affectedSliceTotalBill": affected_slice_total_bill,
+        "dailyX": m["dailyX"], "dailyNormY": m["dailyNormY"], "dailyVarY": m["dailyVarY"],
+        "hourlyX": m["hourlyX"], "hourlyVarY": m["hourlyVarY"], "hourlyComputeY": m["hourlyComputeY"],
+        "topSvcNames": m["topSvcNames"], "topSvcCosts": m["topSvcCosts"],
+        "svcNames": m["svcNames"], "svcCosts": m["svcCosts"],
+        "ptRows": pt_rows,
+        "spotNet": m["spotNet"], "spotShareTotal": m["spotShareTotal"], "spotShareCompute": m["spotShareCompute"],
+        "ec2BoxNet": m["ec2BoxNet"], "ecsNet": m["ecsNet"], "fargateSpotNet": m["fargateSpotNet"],
+        "spotDisc": spot_disc, "spotScenario": spot_scenario,
+        "pools": m["pools"],
+        "resources": m["resources"], "spotCandidates": spot_candidates(m["resources"], spot_disc),
+        "spikes": m["spikes"], "dailyP95": m["dailyP95"], "hourlyP95": m["hourlyP95"],
+        "commitment": optimize_commitment(m["hourlyComputeY"],
+                                          observed_discount if opts.sp_discount is None else opts.sp_discount, periods),
+    }
+
+
+def spot_candidates(resources: dict, spot_disc: float, n: int = RESOURCE_TOP_REPORTED) -> list[dict]:
+    """The largest resources of both Spot pools, with their savings if moved to Spot entirely."""
+    rows = [{"pool": name, **r, "savings": r["net"] * spot_disc}
+            for name, _ in RESOURCE_POOLS for r in resources[name]["resources"]]
+    rows.sort(key=lambda r: (-r["net"], r["pool"], r["id"]))
+    return rows[:n]
+
+
+def evaluate_dashboard(summary: dict, opts: DashboardOptions | None = None) -> dict:
+    """Scenario parameters applied to a scan summary → the dashboard result (+ per-period results)."""
+    opts = opts or DashboardOptions()
+    return {**evaluate_scenarios(summary["combined"], opts, len(summary["periods"])),
+            "periods": [evaluate_scenarios(m, opts) for m in summary["periods"]]}
+
+
+# -----------------------------
+# Hourly Savings Plan commitment optimizer (load-duration curve)
+# -----------------------------
+COMMITMENT_CURVE_POINTS = 101
+
+
+def optimize_commitment(hourly_od: Sequence[float], sp_discount: float, periods: int = 1,
+                        points: int = COMMITMENT_CURVE_POINTS) -> dict:
+    """The hourly commitment that maximizes net savings on an hourly SP-eligible On-Demand series.
+
+    Committing k (On-Demand-equivalent € per hour) costs (1 - d) * k every hour at SP discount d
+    and covers min(h, k) of an hour with usage h. Net savings over n hours,
+    Σ min(h, k) - (1 - d) * k * n, are concave in k with slope #(h > k) - (1 - d) * n, so the
+    optimum is the level the load-duration curve exceeds in a (1 - d) share of the hours. After
+    one sort, prefix sums give any point of the curve by bisection: O(n log n) in all.
+    Savings are per billing period (series totals / `periods`); `commitment` is at SP rates.
+    """
+    d = max(0.0, min(1.0, sp_discount))
+    a = sorted(hourly_od)
+    n = len(a)
+    prefix = list(accumulate(a, initial=0.0))
+    total = prefix[-1]
+    per = 1.0 / max(periods, 1)
+
+    def at(k: float) -> dict:
+        m = bisect_right(a, k)
+        covered = prefix[m] + k * (n - m)
+        return {"commitmentOD": k, "commitment": (1 - d) * k, "savings": (covered - (1 - d) * k * n) * per,
+                "utilization": covered / (k * n) if k > 0 else 0.0,
+                "coverage": covered / total if total > 0 else 0.0}
+
+    optimum = at(a[math.ceil(d * n) - 1] if n and d > 0 else 0.0)
+    peak = a[-1] if n else 0.0
+    curve = [at(peak * i / (points - 1)) for i in range(points)]
+    return {
+        "spDiscount": d, "hours": n, "optimum": optimum,
+        "curve": {k: [c[k] for c in curve] for k in ("commitmentOD", "savings", "utilization", "coverage")},
+        # level exceeded in each share of the hours (descending load-duration curve)
+        "loadDuration": {"share": [i / (points - 1) for i in range(points)],
+                         "level": [a[n - 1 - (i * (n - 1)) // (points - 1)] if n else 0.0 for i in range(points)]},
+    }
+
+
+# -----------------------------
+# Scenario sweep: the whole parameter grid from one scan summary
+# -----------------------------
+SWEEP_COVERAGE = tuple(i / 100 for i in range(101))       # additional SP coverage, 0..100% in 1% steps
+SWEEP_SPOT_DISCOUNT = tuple(i / 20 for i in range(20))     # 0..0.95
+SWEEP_SPOT_ADOPTION = tuple(i / 20 for i in range(21))     # 0..1
+SWEEP_CSV_COLUMNS = ("addCoverage", "passThrough", "spotDiscount", "spotAdoption", "spMonthlySavings",
+                     "spotEC2MonthlySavings", "spotECSMonthlySavings", "monthlySavings", "annualSavings",
+                     "overallReduction")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def sweep_scenarios(m: dict, pass_through: Sequence[float]) -> dict:
+    """Every addCoverage × passThrough × spotDiscount × spotAdoption scenario for scan metrics m.
+
+    The Savings Plan savings depend only on (addCoverage, passThrough) and the Spot savings only
+    on (spotDiscount, spotAdoption), so the 4-D monthly total is the outer sum of three 2-D
+    surfaces. Cells use evaluate_scenarios' arithmetic, so each one equals the scenario tables'
+    figures for its parameters exactly. Arrays are NumPy arrays when NumPy is installed and
+    nested lists otherwise.
+    """
+    axes = {"addCoverage": SWEEP_COVERAGE, "passThrough": tuple(pass_through),
+            "spotDiscount": SWEEP_SPOT_DISCOUNT, "spotAdoption": SWEEP_SPOT_ADOPTION}
+    total_bill = m["totalBill"]
+    share, disc = m["computeShareTotal"], m["observedDiscount"]
+    ec2, ecs = m["candidateEC2Box"], m["candidateECS"]
+    np = _numpy()
+    if np is not None:
+        cov, pt, sd, sa = (np.asarray(v, dtype=np.float64) for v in axes.values())
+        sp = total_bill * np.multiply.outer(share * cov, disc * pt)
+        spot_ec2 = np.multiply.outer(sd, ec2 * sa)
+        spot_ecs = np.multiply.outer(sd, ecs * sa)
+        total = (sp[:, :, None, None] + spot_ec2) + spot_ecs
+    else:
+        sp = [[total_bill * ((share * c) * (disc * p)) for p in axes["passThrough"]] for c in SWEEP_COVERAGE]
+        spot_ec2 = [[(ec2 * a) * d for a in SWEEP_SPOT_ADOPTION] for d in SWEEP_SPOT_DISCOUNT]
+        spot_ecs = [[(ecs * a) * d for a in SWEEP_SPOT_ADOPTION] for d in SWEEP_SPOT_DISCOUNT]
+        total = [[[[(s + e2) + e3 for e2, e3 in zip(r2, r3)] for r2, r3 in zip(spot_ec2, spot_ecs)] for s in row]
+                 for row in sp]
+    return {"axes": {k: list(v) for k, v in axes.items()}, "totalBill": total_bill,
+            "spMonthlySavings": sp, "spotEC2MonthlySavings": spot_ec2, "spotECSMonthlySavings": spot_ecs,
+            "monthlySavings": total}
+
+
+def sweep_rows(sweep: dict) -> Iterator[tuple]:
+    """The grid as SWEEP_CSV_COLUMNS tuples, addCoverage outermost and spotAdoption innermost."""
+    tolist = lambda v: v.tolist() if hasattr(v, "tolist") else v  # noqa: E731
+    sp, e2, e3, total = (tolist(sweep[k]) for k in SWEEP_CSV_COLUMNS[4:8])
+    ax = sweep["axes"]
+    total_bill = sweep["totalBill"]
+    for i, c in enumerate(ax["addCoverage"]):
+        for j, p in enumerate(ax["passThrough"]):
+            for k, d in enumerate(ax["spotDiscount"]):
+                for m, a in enumerate(ax["spotAdoption"]):
+                    t = total[i][j][k][m]
+                    yield (c, p, d, a, sp[i][j], e2[k][m], e3[k][m], t, t * 12,
+                           t / total_bill if total_bill > 0 else 0.0)
+
+
+def write_sweep_csv(sweep: dict, path: str | Path) -> int:
+    """Write the scenario grid as CSV; returns the number of scenarios."""
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(SWEEP_CSV_COLUMNS)
+        for row in sweep_rows(sweep):
+            w.writerow(row)
+            n += 1
+    return n
+
+
+# Tables for notebooks / BI tools (Arrow IPC file and Parquet, one file per table). Column types:
+# float64, int32, int64, utf8, bool, date32 (days) and timestamp (ms, UTC); the page's "Export tables"
+# writes the same schema (EXPORT_SCHEMA in its script) from its in-memory result. `services` lists
+# every service by net cost; `top` marks the TOP_SERVICES the page charts.
+EXPORT_SUMMARY_COLUMNS = (
+    "totalBill", "computePublicBaseline", "computeActualCost", "computeShareTotal", "observedDiscount",
+    "currentCoverage", "addCoverage", "targetCoverage", "incrementalCommitmentOD", "affectedSliceTotalBill",
+    "spotNet", "spotShareTotal", "spotShareCompute", "ec2BoxNet", "ecsNet", "fargateSpotNet", "spotDisc",
+)
+EXPORT_SCHEMA: dict[str, tuple[tuple[str, str], ...]] = {
+    "summary": (("scope", "utf8"), ("periodStart", "timestamp"), ("periodEnd", "timestamp"),
+                *((c, "float64") for c in EXPORT_SUMMARY_COLUMNS)),
+    "daily": (("date", "date32"), ("variableCost", "float64"), ("normalizedCost", "float64")),
+    "hourly": (("hour", "timestamp"), ("variableCost", "float64"), ("computePublicOD", "float64")),
+    "services": (("rank", "int32"), ("service", "utf8"), ("netCost", "float64"), ("top", "bool")),
+    "passThrough": (("passThrough", "float64"), ("discToCustomer", "float64"), ("overallReduction", "float64"),
+                    ("monthlySavings", "float64"), ("annualSavings", "float64")),
+    "spotScenario": (("adoption", "float64"), ("savEC2", "float64"), ("overallEC2", "float64"),
+                     ("savECS", "float64"), ("overallECS", "float64")),
+    "pools": (("pool", "utf8"), ("net", "float64"), ("publicOD", "float64")),
+    "cube": (("periodStart", "timestamp"), ("periodEnd", "timestamp"), ("day", "date32"), ("productCode", "utf8"),
+             ("lineType", "utf8"), ("usage", "int32"), ("service", "utf8"), ("rows", "int64"),
+             ("net", "float64"), ("publicOD", "float64")),
+}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _epoch_ms(s) -> int | None:
+    dt = parse_date(s)
+    return None if dt is None else (dt - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _epoch_day(s) -> int | None:
+    dt = parse_date(s) if s else None
+    return None if dt is None else (dt - _EPOCH).days
+
+
+def export_tables(res: dict, cube: dict | None = None) -> dict[str, dict[str, list]]:
+    """The dashboard result (and optionally the report cube) as columns per EXPORT_SCHEMA table.
+
+    `summary` holds the headline figures once with scope "combined" (monthly averages when there
+    are several periods) and once per billing period with scope "period".
+    """
+    def table(name: str, rows: Iterable[Sequence]) -> dict[str, list]:
+        cols = [c for c, _ in EXPORT_SCHEMA[name]]
+        return dict(zip(cols, map(list, zip(*rows)))) if rows else {c: [] for c in cols}
+
+    scoped = [("combined", res)] + [("period", p) for p in res.get("periods", [])]
+    tables = {
+        "summary": table("summary", [
+            (scope, _epoch_ms(r["periodStart"]), _epoch_ms(r["periodEnd"]), *(r[c] for c in EXPORT_SUMMARY_COLUMNS))
+            for scope, r in scoped]),
+        "daily": table("daily", [(_epoch_day(d), v, n) for d, v, n in zip(res["dailyX"], res["dailyVarY"],
+                                                                          res["dailyNormY"])]),
+        "hourly": table("hourly", [(_epoch_ms(h + ":00"), v, c) for h, v, c in zip(res["hourlyX"], res["hourlyVarY"],
+                                                                                   res["hourlyComputeY"])]),
+        "services": table("services", [(i + 1, n, c, i < TOP_SERVICES)
+                                       for i, (n, c) in enumerate(zip(res["svcNames"], res["svcCosts"]))]),
+        "passThrough": table("passThrough", [(r["pt"], r["discToCustomer"], r["overallReduction"], r["monthlySavings"],
+                                              r["annualSavings"]) for r in res["ptRows"]]),
+        "spotScenario": table("spotScenario", [(r["a"], r["savEC2"], r["overallEC2"], r["savECS"], r["overallECS"])
+                                               for r in res["spotScenario"]]),
+        "pools": table("pools", [(r["name"], r["net"], r["publicOD"]) for r in res["pools"]]),
+    }
+    if cube:
+        dims, c = cube["dims"], cube["cells"]
+        periods = [(_epoch_ms(bs), _epoch_ms(be)) for bs, be in cube["periods"]]
+        tables["cube"] = table("cube", [
+            (*periods[c["period"][i]], _epoch_day(dims["day"][c["day"][i]]), dims["productCode"][c["productCode"][i]],
+             dims["lineType"][c["lineType"][i]], c["usage"][i], dims["service"][c["service"][i]], c["rows"][i],
+             c["net"][i], c["publicOD"][i]) for i in range(len(c["net"]))])
+    return tables
+
+
+def write_export(tables: dict[str, dict[str, list]], out_dir: str | Path,
+                 formats: Sequence[str] = ("arrow", "parquet")) -> list[Path]:
+    """Write each table as <name>.arrow (uncompressed Arrow IPC file, memory-mappable) and/or
+    <name>.parquet (zstd) under out_dir; returns the paths written."""
+    pa, _, pq = _require_pyarrow()
+    types = {"float64": pa.float64(), "int32": pa.int32(), "int64": pa.int64(), "utf8": pa.string(),
+             "bool": pa.bool_(), "date32": pa.date32(), "timestamp": pa.timestamp("ms", tz="UTC")}
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, cols in tables.items():
+        schema = pa.schema([pa.field(c, types[t]) for c, t in EXPORT_SCHEMA[name]])
+        table = pa.table([pa.array(cols[f.name], f.type) for f in schema], schema=schema)
+        if "arrow" in formats:
+            path = out_dir / f"{name}.arrow"
+            with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table)
+            written.append(path)
+        if "parquet" in formats:
+            path = out_dir / f"{name}.parquet"
+            pq.write_table(table, str(path), compression="zstd")
+            written.append(path)
+    return written
+
+
+def _cell(row: Sequence, i: int | None) -> str:
+    if i is None or i >= len(row) or row[i] is None:
+        return ""
+    return str(row[i])
+
+
+def _fast_num(v) -> float:
+    try:
+        n = float(v)
+    except (TypeError, ValueError):
+        return parse_num(v)
+    return n if math.isfinite(n) else 0.0
+
+
+# -----------------------------
+# Aggregate cube (embedded in the HTML report, replayed by the page instead of raw rows)
+# -----------------------------
+CUBE_VERSION = 4
+
+
+class CubeAccumulator(DashboardAccumulator):
+    """Sums net / publicOnDemand cost per (period, day, productCode, lineItemType, usage class, service).
+
+    Every KPI, chart and scenario table is a function of these cells, so the page can rebuild
+    the dashboard from a few thousand cells instead of millions of rows. The usage class is the
+    UsageType reduced to the rules' `usageTypeContains` pattern bits; rows without a usable
+    usage date carry day "". The hourly series (variable net, compute public On-Demand) would
+    multiply the cells by 24, so they are kept beside them per (period, hour); the Spot
+    candidates (ResourceStats) are kept per period.
+    """
+
+    def __init__(self, opts: DashboardOptions | None = None):
+        super().__init__(opts)
+        self.periods: dict[tuple[str, str], dict[tuple, list]] = {}
+        self.hours: dict[tuple[str, str], dict[str, list[float]]] = {}
+        self.resources: dict[tuple[str, str], ResourceStats] = {}
+        self._usage: dict[str, int] = {}
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_usage"] = {}
+        return state
+
+    @property
+    def row_count(self) -> int:
+        return sum(c[0] for cells in self.periods.values() for c in cells.values())
+
+    def period(self, bill_start, bill_end) -> dict[tuple, list]:
+        key = period_key(bill_start, bill_end)
+        cells = self.periods.get(key)
+        if cells is None:
+            cells = self.periods[key] = {}
+        return cells
+
+    def _consume_run(self, cells: dict, key: tuple, first: Sequence, it: Iterator[Sequence],
+                     fast, slow, width: int) -> Sequence | None:
+        times_memo, usage_memo, to_time = self._times, self._usage, self._time
+        flags_memo, classify = self._flags, self._classify
+        usage_bits = self.rules.usage_bits
+        hours = self.hours.setdefault(period_key(*key), {})
+        resources = self.resources.setdefault(period_key(*key), ResourceStats())
+        i_rid, i_it = self._resource_cols
+        bs0, be0 = key
+        for row in chain((first,), it):
+            if fast is not None and len(row) >= width:
+                net_s, pub_s, lt, pc, ut, svc, us, bs, be = fast(row)
+            elif not row:
+                continue  # skipEmptyLines
+            else:
+                net_s, pub_s, lt, pc, ut, svc, us, bs, be = slow(row)
+            if bs != bs0 or be != be0:
+                return row
+
+            u = usage_memo.get(ut)
+            if u is None:
+                u = usage_memo[ut] = usage_bits(ut)
+            t = None
+            if us:
+                t = times_memo.get(us, 0)
+                if t == 0:
+                    t = to_time(us)
+            d = t[0] if t else ""
+
+            net = _fast_num(net_s)
+            pub = _fast_num(pub_s) if pub_s else 0.0
+            cell = cells.get((d, pc, lt, u, svc))
+            if cell is None:
+                cell = cells[(d, pc, lt, u, svc)] = [0, 0.0, 0.0]
+            cell[0] += 1
+            cell[1] += net
+            cell[2] += pub
+
+            f = flags_memo.get((lt, pc, ut))
+            if f is None:
+                f = classify(lt, pc, ut)
+            if f & F_RESOURCE_POOLS:
+                resources.add(f, net, _cell(row, i_rid), _cell(row, i_it))
+            if t and not f & F_FIXED:
+                hour = hours.get(t[1])
+                if hour is None:
+                    hour = hours[t[1]] = [0.0, 0.0]
+                hour[0] += net
+                if f & F_COMPUTE:
+                    hour[1] += pub
+        return None
+
+    def merge(self, other: "CubeAccumulator") -> "CubeAccumulator":
+        for key, theirs in other.periods.items():
+            mine = self.periods.setdefault(key, {})
+            for k, (n, net, pub) in theirs.items():
+                cell = mine.get(k)
+                if cell is None:
+                    mine[k] = [n, net, pub]
+                else:
+                    cell[0] += n
+                    cell[1] += net
+                    cell[2] += pub
+        for key, theirs in other.hours.items():
+            mine = self.hours.setdefault(key, {})
+            for h, (net, pub) in theirs.items():
+                hour = mine.get(h)
+                if hour is None:
+                    mine[h] = [net, pub]
+                else:
+                    hour[0] += net
+                    hour[1] += pub
+        for key, theirs in other.resources.items():
+            self.resources.setdefault(key, ResourceStats()).merge(theirs)
+        return self
+
+    def to_cube(self, source: dict | None = None) -> dict:
+        """Columnar, dictionary-encoded cube (the page's `consumeCube` input)."""
+        dims: dict[str, dict[str, int]] = {"day": {}, "productCode": {}, "lineType": {}, "service": {}}
+        cols: dict[str, list] = {k: [] for k in (
+            "period", "day", "productCode", "lineType", "usage", "service", "rows", "net", "publicOD")}
+
+        def code(dim: str, v: str) -> int:
+            d = dims[dim]
+            i = d.get(v)
+            if i is None:
+                i = d[v] = len(d)
+            return i
+
+        keys = sorted(self.periods, key=lambda k: (k[0] == "", k[0], k[1]))
+        for pi, key in enumerate(keys):
+            for (d, pc, lt, u, svc), (n, net, pub) in sorted(self.periods[key].items()):
+                cols["period"].append(pi)
+                cols["day"].append(code("day", d))
+                cols["productCode"].append(code("productCode", pc))
+                cols["lineType"].append(code("lineType", lt))
+                cols["usage"].append(u)
+                cols["service"].append(code("service", svc))
+                cols["rows"].append(n)
+                cols["net"].append(net)
+                cols["publicOD"].append(pub)
+        hourly: dict[str, list] = {k: [] for k in ("period", "hour", "net", "computePublicOD")}
+        for pi, key in enumerate(keys):
+            for h, (net, pub) in sorted(self.hours.get(key, {}).items()):
+                hourly["period"].append(pi)
+                hourly["hour"].append(h)
+                hourly["net"].append(net)
+                hourly["computePublicOD"].append(pub)
+        return {
+            "version": CUBE_VERSION,
+            "source": source or {},
+            "rules": self.rules.rules,
+            "usagePatterns": self.rules.patterns,
+            "periods": [list(k) for k in keys],
+            "dims": {k: list(v) for k, v in dims.items()},
+            "cells": cols,
+            "hourly": hourly,
+            "resources": [self.resources.get(key, ResourceStats()).to_json() for key in keys],
+        }
+
+
+def cube_payload(cube: dict) -> str:
+    """gzip + base64 of the compact cube JSON, as embedded in the HTML report."""
+    raw = json.dumps(cube, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    return base64.b64encode(gzip.compress(raw, compresslevel=9, mtime=0)).decode("ascii")
+
+
+def scan_file(path: str | Path, opts: DashboardOptions | None = None,
+              accumulator: type[DashboardAccumulator] = DashboardAccumulator) -> DashboardAccumulator:
+    """Stream one CUR file through a fresh accumulator (the per-file partial)."""
+    acc = accumulator(opts)
+    with read_cur(path) as (header, rows):
+        acc.consume(header, rows)
+    return acc
+
+
+def scan_csv_range(path: str | Path, start: int, end: int, header: list[str] | None,
+                   opts: DashboardOptions | None = None,
+                   accumulator: type[DashboardAccumulator] = DashboardAccumulator) -> DashboardAccumulator:
+    """Stream one byte range of a plain CSV (see csv_ranges) from a memory map through a fresh accumulator."""
+    acc = accumulator(opts)
+    with map_file(path) as mm, read_csv_range(mm, start, end, header) as (header, rows):
+        acc.consume(header, rows)
+    return acc
+
+
+def _scan_task(path: Path, span: tuple | None, opts: DashboardOptions,
+               accumulator: type[DashboardAccumulator]) -> DashboardAccumulator:
+    if span is None:
+        return scan_file(path, opts, accumulator)
+    return scan_csv_range(path, *span, opts, accumulator)
+
+
+def _split_ways(path: Path, spare: int) -> int:
+    if spare < 2 or not is_plain_csv(path):
+        return 1
+    return max(1, min(spare, path.stat().st_size // SPLIT_MIN_BYTES))
+
+
+def _scan_each(paths: Sequence[str | Path], opts: DashboardOptions, workers: int | None,
+               accumulator: type[DashboardAccumulator], split: bool = True) -> Iterator[DashboardAccumulator]:
+    """Per-file partials in input order, reduced in a process pool when there are several files.
+
+    Workers left over (more than files) go to large plain CSVs, which are scanned as byte ranges
+    from a memory map; a file's range partials are merged in file order into its partial (which
+    approximates a serial scan of the file, see the module notes).
+    """
+    paths = [Path(p) for p in paths]
+    workers = max(1, workers or os.cpu_count() or 1)
+    spare = workers // max(1, len(paths))
+    ways = [_split_ways(p, spare) if split else 1 for p in paths]
+    workers = min(workers, sum(ways))
+    if workers <= 1:
+        yield from map(scan_file, paths, repeat(opts), repeat(accumulator))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks, counts = [], []
+        for p, k in zip(paths, ways):
+            if k == 1:
+                tasks.append((p, None))
+                counts.append(1)
+                continue
+            header, ranges = csv_ranges(p, k, pool.map)
+            tasks += [(p, (a, b, None if a == 0 else header)) for a, b in ranges]
+            counts.append(len(ranges))
+        parts = pool.map(_scan_task, *zip(*tasks), repeat(opts), repeat(accumulator))
+        for n in counts:
+            if n == 1:
+                yield next(parts)
+                continue
+            acc = accumulator(opts)
+            for _ in range(n):
+                acc.merge(next(parts))
+            yield acc
+
+
+def scan_files(paths: Sequence[str | Path], opts: DashboardOptions | None = None,
+               workers: int | None = None,
+               accumulator: type[DashboardAccumulator] = DashboardAccumulator,
+               split: bool = True) -> DashboardAccumulator:
+    """Reduce each file to per-period partials in a process pool, then merge them in input order.
+
+    With more workers than files, large plain CSVs are split into byte ranges scanned in parallel
+    (split=False keeps one process per file).
+    """
+    opts = opts or DashboardOptions()
+    total = accumulator(opts)
+    for p in _scan_each(paths, opts, workers, accumulator, split):
+        total.merge(p)
+    return total
+
+
+CHECKPOINT_VERSION = 5
+
+
+def file_digest(path: str | Path, chunk: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ScanCheckpoint:
+    """Per-part partials of a CUR delivery kept on disk, so a refresh only rescans what changed.
+
+    AWS rewrites the current month's CUR several times a day while older months stay put. The
+    checkpoint directory holds `state.json` (per part: size, mtime and SHA-256 of its bytes) and
+    one pickled partial per distinct content hash. `update` stats every part, hashes only those
+    whose size or mtime moved, and rescans only those whose content is new; parts that left the
+    delivery (superseded assemblies) are dropped along with their partials. `merged` then folds
+    the stored partials in file order, so the totals equal a full scan bit for bit.
+
+    Partials depend on the classification rules and compute codes, so a change to either (or to
+    the accumulator type) discards the whole checkpoint. The pickles are trusted local state:
+    never point `state_dir` at files from someone else.
+    """
+
+    def __init__(self, state_dir: str | Path, opts: DashboardOptions | None = None,
+                 accumulator: type[DashboardAccumulator] = DashboardAccumulator):
+        self.dir = Path(state_dir)
+        self.opts = opts or DashboardOptions()
+        self.accumulator = accumulator
+        rules = ClassificationRules(self.opts.rules, self.opts.compute_codes)
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [CHECKPOINT_VERSION, CUBE_VERSION, accumulator.__name__, rules.rules, list(self.opts.compute_codes)],
+            sort_keys=True).encode("utf-8")).hexdigest()
+        self.parts: dict[str, dict] = {}
+        self.files: list[Path] = []
+        try:
+            state = json.loads((self.dir / "state.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        # partials are named by content hash alone, so those of another fingerprint must go
+        self._discard = state.get("fingerprint") != self.fingerprint
+        if not self._discard:
+            self.parts = state.get("parts", {})
+
+    def _partial_path(self, sha: str) -> Path:
+        return self.dir / "partials" / f"{sha}.pkl"
+
+    def update(self, files: Sequence[str | Path], workers: int | None = None) -> list[Path]:
+        """Bring the checkpoint in line with `files` (in input order); returns the parts rescanned."""
+        self.files = [Path(f) for f in files]
+        if self._discard:
+            for old in self._partial_path("").parent.glob("*.pkl"):
+                old.unlink()
+            self._discard = False
+        parts, stale = {}, []
+        for f in self.files:
+            key = str(f.resolve())
+            st = f.stat()
+            rec = self.parts.get(key)
+            if rec and rec["size"] == st.st_size and rec["mtimeNs"] == st.st_mtime_ns \
+                    and self._partial_path(rec["sha256"]).is_file():
+                parts[key] = rec
+                continue
+            sha = file_digest(f)
+            parts[key] = {"size": st.st_size, "mtimeNs": st.st_mtime_ns, "sha256": sha}
+            if not self._partial_path(sha).is_file():
+                stale.append(f)
+
+        self._partial_path("").parent.mkdir(parents=True, exist_ok=True)
+        for f, partial in zip(stale, _scan_each(stale, self.opts, workers, self.accumulator)):
+            _write_atomic(self._partial_path(parts[str(f.resolve())]["sha256"]),
+                          pickle.dumps(partial, protocol=pickle.HIGHEST_PROTOCOL))
+        if parts != self.parts or stale:
+            self.parts = parts
+            _write_atomic(self.dir / "state.json", json.dumps(
+                {"version": CHECKPOINT_VERSION, "fingerprint": self.fingerprint, "parts": parts},
+                indent=1).encode("utf-8"))
+            live = {rec["sha256"] for rec in parts.values()}
+            for old in self._partial_path("").parent.glob("*.pkl"):
+                if old.stem not in live:
+                    old.unlink()
+        return stale
+
+    @property
+    def digest(self) -> str:
+        """Identifies the merged data: the rules fingerprint and every part's content hash, in order."""
+        h = hashlib.sha256(self.fingerprint.encode("ascii"))
+        for f in self.files:
+            h.update(self.parts[str(f.resolve())]["sha256"].encode("ascii"))
+        return h.hexdigest()
+
+    def merged(self) -> DashboardAccumulator:
+        """The stored partials of the current parts merged in file order."""
+        total = self.accumulator(self.opts)
+        for f in self.files:
+            total.merge(pickle.loads(self._partial_path(self.parts[str(f.resolve())]["sha256"]).read_bytes()))
+        return total
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_cube(paths: str | Path | Sequence[str | Path], workers: int | None = None,
+               rules: dict | None = None) -> dict:
+    """Aggregate CUR files (or manifests/directories) into the report cube."""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files = expand_inputs(paths)
+    acc = scan_files(files, DashboardOptions(rules=rules), workers, CubeAccumulator)
+    if not acc.row_count:
+        raise ValueError("CSV parsed but contains no rows.")
+    return acc.to_cube({"files": [f.name for f in files], "rows": acc.row_count})
+
+
+def compute_dashboard(paths: str | Path | Sequence[str | Path], opts: DashboardOptions | None = None,
+                      workers: int | None = None) -> dict:
+    """Aggregate one or more CUR files (or manifests/directories) into the dashboard result."""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files = expand_inputs(paths)
+    acc = scan_files(files, opts, workers)
+    if not acc.row_count:
+        raise ValueError("CSV parsed but contains no rows.")
+    return acc.finalize()
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def _parse_list(s: str) -> list[float]:
+    out = []
+    for x in s.split(","):
+        x = x.strip()
+        if not x:
+            continue
+        try:
+            v = float(x)
+        except ValueError:
+            continue
+        if 0 < v <= 1:
+            out.append(v)
+    return out
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Aggregate AWS CUR files into the dashboard's scenario JSON.")
+    p.add_argument("cur", nargs="*",
+                   help="CUR part files (.csv, .csv.gz, .zip, .parquet), *Manifest.json files or delivery folders")
+    p.add_argument("-o", "--out", help="write JSON here (default: stdout)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="processes for per-file reduction (default: one per core)")
+    p.add_argument("--no-split", action="store_true",
+                   help="scan each file in one process (by default spare workers split large plain CSVs "
+                        "into byte ranges)")
+    p.add_argument("--save-scan", metavar="PATH",
+                   help="also write the scan summary (parameter-independent) as JSON to PATH")
+    p.add_argument("--state", metavar="DIR",
+                   help="keep per-part partials in DIR and rescan only new or changed parts on later runs")
+    p.add_argument("--from-scan", metavar="PATH",
+                   help="evaluate scenarios on a saved scan summary instead of reading CUR files")
+    p.add_argument("--to-parquet", metavar="PATH",
+                   help="convert the CSV (.csv, .csv.gz or .zip) to Parquet at PATH instead of aggregating (needs pyarrow)")
+    p.add_argument("--add-coverage", type=float, default=0.30, help="additional SP coverage, 0..1")
+    p.add_argument("--spot-discount", type=float, default=0.60, help="expected Spot discount, 0..0.95")
+    p.add_argument("--pass-through", default="0.3,0.4,0.5,0.6,0.7,0.8,1.0", help="comma-separated list in (0,1]")
+    p.add_argument("--sp-discount", type=float, default=None,
+                   help="Savings Plan rate discount for the hourly commitment optimizer, 0..1 "
+                        "(default: the observed effective compute discount)")
+    p.add_argument("--compute-codes", default=",".join(DEFAULT_COMPUTE_CODES), help="SP-eligible ProductCodes")
+    p.add_argument("--rules", metavar="PATH",
+                   help="classification rules JSON (flags and extra pools; see DEFAULT_RULES)")
+    p.add_argument("--export", metavar="DIR",
+                   help="also write the result tables (summary, daily, hourly, services, passThrough, "
+                        "spotScenario, pools) as Arrow IPC and Parquet files to DIR (needs pyarrow)")
+    p.add_argument("--sweep", metavar="PATH",
+                   help="also write every addCoverage (1%% steps) × pass-through × Spot discount × adoption "
+                        "scenario as CSV to PATH (vectorized with NumPy when installed)")
+    return p
+
+
+def options_from_args(args: argparse.Namespace) -> DashboardOptions:
+    if not 0 <= args.add_coverage <= 1:
+        raise SystemExit("Additional SP coverage must be a number between 0 and 1 (e.g., 0.30).")
+    if not 0 <= args.spot_discount <= 0.95:
+        raise SystemExit("Spot discount must be a number between 0 and 0.95 (e.g., 0.60).")
+    pass_through = _parse_list(args.pass_through)
+    if not pass_through:
+        raise SystemExit("Pass-through list must contain values in (0,1], e.g., 0.3,0.5,1.0")
+    if args.sp_discount is not None and not 0 <= args.sp_discount < 1:
+        raise SystemExit("SP discount must be a number between 0 and 1 (e.g., 0.28).")
+    codes = tuple(c.strip() for c in args.compute_codes.split(",") if c.strip())
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+        ClassificationRules(rules, codes)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Invalid rules: {e}")
+    return DashboardOptions(args.add_coverage, args.spot_discount, tuple(pass_through), codes, rules, args.sp_discount)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    opts = options_from_args(args)
+
+    t0 = time.perf_counter()
+    if not args.cur and not args.from_scan:
+        raise SystemExit("Give CUR files / folders, or --from-scan PATH.")
+    if args.export:
+        # before the scan, which can take minutes
+        try:
+            _require_pyarrow()
+        except ImportError:
+            print("❌ --export requires pyarrow (pip install pyarrow).", file=sys.stderr)
+            return 1
+    if args.to_parquet:
+        if len(args.cur) != 1:
+            raise SystemExit("--to-parquet converts a single CSV file.")
+        try:
+            n = convert_csv_to_parquet(args.cur[0], args.to_parquet)
+        except (ImportError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        print(f"✅ Converted: {Path(args.to_parquet).resolve()} ({n:,} rows in {time.perf_counter() - t0:.2f}s)",
+              file=sys.stderr)
+        return 0
+
+    if args.from_scan:
+        # parameter-only rerun: no CUR is read
+        summary = json.loads(Path(args.from_scan).read_text(encoding="utf-8"))
+        stats = f"from scan {args.from_scan}"
+    else:
+        files = expand_inputs(args.cur)
+        if not files:
+            print("❌ No CUR files found.", file=sys.stderr)
+            return 1
+        try:
+            if args.state:
+                checkpoint = ScanCheckpoint(args.state, opts)
+                rescanned = checkpoint.update(files, args.workers)
+                acc = checkpoint.merged()
+            else:
+                acc = scan_files(files, opts, args.workers, split=not args.no_split)
+        except ImportError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        if not acc.row_count:
+            print("❌ CSV parsed but contains no rows.", file=sys.stderr)
+            return 1
+        summary = acc.summarize()
+        dt = time.perf_counter() - t0
+        stats = (f"{len(files)} file(s), {len(acc.periods)} billing period(s), "
+                 f"{acc.row_count:,} rows in {dt:.2f}s, {acc.row_count / max(dt, 1e-9):,.0f} rows/s")
+        if args.state:
+            stats += f", {len(rescanned)} part(s) rescanned"
+        if args.save_scan:
+            Path(args.save_scan).write_text(json.dumps(summary), encoding="utf-8")
+    res = evaluate_dashboard(summary, opts)
+    if args.sweep:
+        t1 = time.perf_counter()
+        n = write_sweep_csv(sweep_scenarios(summary["combined"], opts.pass_through), args.sweep)
+        print(f"✅ Wrote: {Path(args.sweep).resolve()} ({n:,} scenarios in {time.perf_counter() - t1:.2f}s)",
+              file=sys.stderr)
+
+    if args.export:
+        written = write_export(export_tables(res), args.export)
+        print(f"✅ Wrote: {Path(args.export).resolve()} ({len(written)} Arrow / Parquet files)", file=sys.stderr)
+
+    text = json.dumps(res, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+        print(f"✅ Wrote: {Path(args.out).resolve()} ({stats})", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
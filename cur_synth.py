@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Deterministic synthetic AWS CUR generator, for benchmarks and for trying the dashboard without a
+real bill.
+
+Rows use the real CUR column names and are emitted hour by hour through each billing period, like
+an AWS delivery. ProductCode / UsageType pairs (EC2 box and Spot, Fargate, Lambda, S3, RDS, ...)
+follow a Zipf-like popularity, and the usual non-usage lines are mixed in: Savings Plan covered
+usage with its negation, hourly SavingsPlanRecurringFee, RIFee, support Fee, Credit and Tax. The
+same (rows, seed, start, periods) always produce byte-identical CSV.
+
+How to use:
+  python cur_synth.py cur-1m.csv.gz --rows 1m
+  python cur_synth.py cur-100k.csv --rows 100k --seed 7 --start 2024-03
+  python cur_synth.py cur-10m.parquet --rows 10m                      # needs pyarrow
+  python cur_synth.py delivery/ --rows 10m --periods 3 --parts 4        # S3-style folders + manifests
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import gzip
+import io
+import json
+import random
+import re
+import sys
+import time
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence, TextIO
+
+from cur_engine import convert_csv_to_parquet
+
+# Real CUR (legacy, CSV) column names; the dashboard reads ten of them, the rest give files a
+# realistic width for the parsers.
+COLUMNS = (
+    "identity/LineItemId", "identity/TimeInterval",
+    "bill/InvoiceId", "bill/BillingEntity", "bill/BillType", "bill/PayerAccountId",
+    "bill/BillingPeriodStartDate", "bill/BillingPeriodEndDate",
+    "lineItem/UsageAccountId", "lineItem/LineItemType", "lineItem/UsageStartDate", "lineItem/UsageEndDate",
+    "lineItem/ProductCode", "lineItem/UsageType", "lineItem/Operation", "lineItem/AvailabilityZone",
+    "lineItem/ResourceId", "lineItem/UsageAmount", "lineItem/CurrencyCode", "lineItem/UnblendedRate",
+    "lineItem/UnblendedCost", "lineItem/BlendedCost", "lineItem/NetUnblendedCost",
+    "lineItem/LineItemDescription",
+    "product/ProductName", "product/region", "product/instanceType", "product/operatingSystem",
+    "pricing/publicOnDemandCost", "pricing/publicOnDemandRate", "pricing/term", "pricing/unit",
+    "reservation/ReservationARN",
+    "savingsPlan/SavingsPlanARN", "savingsPlan/SavingsPlanRate", "savingsPlan/SavingsPlanEffectiveCost",
+    "resourceTags/user:Team", "resourceTags/user:Environment",
+)
+
+REGIONS = (("us-east-1", "USE1", "a"), ("eu-central-1", "EUC1", "b"), ("us-west-2", "USW2", "c"),
+           ("ap-southeast-1", "APS1", "a"))
+
+# (ProductCode, ProductName, UsageType suffix, Operation, instanceType, unit, public rate, kind)
+# kind drives the line types a SKU produces: "box" (SP-coverable instance hours), "spot", "fargate",
+# "fargateSpot", "lambda" (SP-coverable, no instance), "usage" (anything else).
+PRODUCTS = (
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "BoxUsage:m5.large", "RunInstances", "m5.large", "Hrs", 0.096, "box"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "BoxUsage:c5.xlarge", "RunInstances", "c5.xlarge", "Hrs", 0.17, "box"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "BoxUsage:r5.2xlarge", "RunInstances", "r5.2xlarge", "Hrs", 0.504, "box"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "BoxUsage:t3.medium", "RunInstances", "t3.medium", "Hrs", 0.0416, "box"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "SpotUsage:c5.xlarge", "RunInstances:SV001", "c5.xlarge", "Hrs", 0.17, "spot"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "SpotUsage:m5.2xlarge", "RunInstances:SV001", "m5.2xlarge", "Hrs", 0.384, "spot"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "EBS:VolumeUsage.gp3", "CreateVolume-Gp3", "", "GB-Mo", 0.00011, "usage"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "NatGateway-Hours", "NatGateway", "", "Hrs", 0.045, "usage"),
+    ("AmazonEC2", "Amazon Elastic Compute Cloud", "DataTransfer-Out-Bytes", "RunInstances", "", "GB", 0.09, "usage"),
+    ("AmazonECS", "Amazon Elastic Container Service", "Fargate-vCPU-Hours:perCPU", "FargateTask", "", "hours", 0.04048, "fargate"),
+    ("AmazonECS", "Amazon Elastic Container Service", "Fargate-GB-Hours", "FargateTask", "", "hours", 0.004445, "fargate"),
+    ("AmazonECS", "Amazon Elastic Container Service", "SpotUsage-Fargate-vCPU-Hours:perCPU", "FargateTask", "", "hours", 0.04048, "fargateSpot"),
+    ("AWSLambda", "AWS Lambda", "Lambda-GB-Second", "Invoke", "", "Lambda-GB-Second", 0.0000166667, "lambda"),
+    ("AWSLambda", "AWS Lambda", "Request", "Invoke", "", "Requests", 0.0000002, "usage"),
+    ("AmazonS3", "Amazon Simple Storage Service", "TimedStorage-ByteHrs", "StandardStorage", "", "GB-Mo", 0.000032, "usage"),
+    ("AmazonS3", "Amazon Simple Storage Service", "Requests-Tier1", "PutObject", "", "Requests", 0.000005, "usage"),
+    ("AmazonRDS", "Amazon Relational Database Service", "InstanceUsage:db.r5.large", "CreateDBInstance:0002", "db.r5.large", "Hrs", 0.25, "usage"),
+    ("AmazonRDS", "Amazon Relational Database Service", "RDS:GP2-Storage", "CreateDBInstance:0002", "", "GB-Mo", 0.000158, "usage"),
+    ("AmazonCloudWatch", "AmazonCloudWatch", "CW:MetricMonitorUsage", "MetricStorage", "", "Metrics", 0.0004, "usage"),
+    ("AmazonDynamoDB", "Amazon DynamoDB", "ReadRequestUnits", "GetItem", "", "ReadRequestUnits", 0.00000025, "usage"),
+    ("AWSELB", "Elastic Load Balancing", "LoadBalancerUsage", "LoadBalancing:Application", "", "Hrs", 0.0225, "usage"),
+    ("AmazonSageMaker", "Amazon SageMaker", "Hosting:ml.m5.xlarge", "RunInstance", "ml.m5.xlarge", "Hrs", 0.23, "usage"),
+)
+
+TEAMS = ("platform", "payments", "search", "data", "ml", "web", "mobile", "")
+ENVIRONMENTS = ("prod", "prod", "staging", "dev", "")
+ACCOUNTS = ("111122223333", "222233334444", "333344445555", "444455556666", "555566667777")
+PAYER = "999988887777"
+
+ZIPF_EXPONENT = 1.1
+SP_COVERED_SHARE = 0.45      # of SP-eligible usage
+SP_DISCOUNT = 0.28           # effective SP rate vs public On-Demand
+SPOT_DISCOUNT = 0.65
+RESOURCES_PER_SKU = 64
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}
+
+
+def parse_size(s: str | int) -> int:
+    """'100k' / '1m' / '10M' / '2500' → row count."""
+    if isinstance(s, int):
+        return s
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)\s*", s)
+    if not m:
+        raise ValueError(f"not a row count: {s!r}")
+    return int(float(m.group(1)) * SIZE_SUFFIXES.get(m.group(2).lower(), 1))
+
+
+def format_size(n: int) -> str:
+    """Inverse of parse_size for round numbers (file names, reports)."""
+    for suffix, mult in (("g", 1_000_000_000), ("m", 1_000_000), ("k", 1_000)):
+        if n >= mult and n % mult == 0:
+            return f"{n // mult}{suffix}"
+    return str(n)
+
+
+def _month(start: str, k: int) -> datetime:
+    y, m = map(int, start.split("-")[:2])
+    y, m = divmod((y * 12 + m - 1) + k, 12)
+    return datetime(y, m + 1, 1, tzinfo=timezone.utc)
+
+
+def billing_periods(start: str, periods: int) -> list[tuple[datetime, datetime]]:
+    """`periods` consecutive calendar months from `start` (YYYY-MM)."""
+    return [(_month(start, k), _month(start, k + 1)) for k in range(periods)]
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _csv_field(v: str) -> str:
+    return '"' + v.replace('"', '""') + '"' if any(c in v for c in ',"\n') else v
+
+
+class _Sku:
+    """One product × region with everything per-row formatting needs precomputed."""
+
+    __slots__ = ("kind", "hourly", "rate", "rate_s", "desc", "head", "tail", "unit", "az", "resources")
+
+    def __init__(self, product: tuple, region: str, prefix: str, az: str, index: int):
+        code, name, usage, operation, itype, unit, rate, kind = product
+        ut = usage if prefix == "USE1" else f"{prefix}-{usage}"
+        self.kind = kind
+        self.hourly = unit == "Hrs"
+        self.rate = rate * (1.12 if region != "us-east-1" else 1.0)
+        self.rate_s = f"{self.rate:.10g}"
+        self.desc = _csv_field(f"${self.rate:.4g} per {unit} {usage} in {region}, {'Linux' if itype else name}")
+        self.head = f"{code},{ut},{operation}"
+        self.tail = f"{name},{region},{itype},{'Linux' if itype else ''}"
+        self.unit = unit
+        self.az = region + az
+        if itype and code == "AmazonEC2":
+            self.resources = [f"i-{((index << 8 | r) * 0x9E3779B97F4A7C15) & (1 << 68) - 1:017x}"
+                              for r in range(RESOURCES_PER_SKU)]
+        else:
+            self.resources = [f"arn:aws:{code.lower()}:{region}:{ACCOUNTS[0]}:{operation.lower()}/res-{index}-{r}"
+                              for r in range(RESOURCES_PER_SKU)]
+
+
+def _catalog(rng: random.Random) -> tuple[list[_Sku], list[float]]:
+    """SKUs (product × region) in a seeded popularity order, with cumulative Zipf weights."""
+    skus = [_Sku(p, *r, index=i * len(REGIONS) + j) for i, p in enumerate(PRODUCTS) for j, r in enumerate(REGIONS)]
+    rng.shuffle(skus)
+    cum, total = [], 0.0
+    for rank in range(1, len(skus) + 1):
+        total += rank ** -ZIPF_EXPONENT
+        cum.append(total)
+    return skus, [c / total for c in cum]
+
+
+class _PeriodWriter:
+    """Formats the rows of one billing period; `rows(n)` yields exactly n CSV lines, hour by hour."""
+
+    def __init__(self, rng: random.Random, bill_start: datetime, bill_end: datetime, line_id: int):
+        self.rng = rng
+        self.line_id = line_id
+        self.skus, self.cum = _catalog(rng)
+        self.bill = f"{_iso(bill_start)},{_iso(bill_end)}"
+        self.invoice = f"{bill_start:%Y%m}{rng.randrange(10 ** 6):06d}"
+        self.hours = int((bill_end - bill_start) / timedelta(hours=1))
+        self.start = bill_start
+        self.sp_arn = f"arn:aws:savingsplans::{PAYER}:savingsplan/{rng.getrandbits(128):032x}"
+        self.ri_arn = f"arn:aws:ec2:us-east-1:{PAYER}:reserved-instances/{rng.getrandbits(128):032x}"
+        self.commitment = 0.0
+
+    def _line(self, lt: str, times: str, account: str, sku: _Sku, resource: str, amount: float, rate: float,
+              cost: float, desc: str, public: str, public_rate: str, term: str, ri: str = "", sp: str = "",
+              sp_rate: str = "", sp_cost: str = "", tags: str = ",", unit: str | None = None) -> str:
+        self.line_id += 1
+        lid = (self.line_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        return (f"{lid:016x},{times[0]},{self.invoice},AWS,Anniversary,{PAYER},{self.bill},{account},{lt},"
+                f"{times[1]},{sku.head},{sku.az if resource else ''},{resource},{amount:.8g},USD,{rate:.10g},"
+                f"{cost:.10g},{cost:.10g},{cost:.10g},{desc},{sku.tail},{public},{public_rate},{term},"
+                f"{sku.unit if unit is None else unit},{ri},{sp},{sp_rate},{sp_cost},{tags}\n")
+
+    def _fixed(self, lt: str, times: tuple, amount: float, rate: float, desc: str, term: str = "",
+               ri: str = "", sp: str = "") -> str:
+        return self._line(lt, times, PAYER, self.fee_sku, "", amount, rate, amount * rate, _csv_field(desc),
+                          "", "", term, ri=ri, sp=sp, unit="")
+
+    def rows(self, n: int) -> Iterator[str]:
+        rng, skus, cum = self.rng, self.skus, self.cum
+        random_, randrange, bisect_left = rng.random, rng.randrange, bisect.bisect_left
+        self.fee_sku = next(s for s in skus if s.kind == "box")
+        tags = [f"{t},{e}" for t in TEAMS for e in ENVIRONMENTS]
+        n_acc = len(ACCOUNTS)
+        per_hour = max(1, -(-n // self.hours))
+        emitted = 0
+        hour = 0
+        while emitted < n:
+            h0 = self.start + timedelta(hours=hour % self.hours)
+            t0, t1 = _iso(h0), _iso(h0 + timedelta(hours=1))
+            times = (f"{t0}/{t1}", f"{t0},{t1}")
+            quota = min(n - emitted, per_hour)
+            # Savings Plan commitment for the hour, billed whether used or not
+            if self.commitment:
+                yield self._fixed("SavingsPlanRecurringFee", times, 1.0, self.commitment,
+                                  "1-year No Upfront Compute Savings Plan", sp=self.sp_arn)
+                quota -= 1
+                emitted += 1
+            used = 0.0
+            while quota > 0:
+                sku = skus[bisect_left(cum, random_())]
+                account = ACCOUNTS[int(random_() ** 2 * n_acc)]
+                tag = tags[randrange(len(tags))]
+                resource = sku.resources[randrange(RESOURCES_PER_SKU)]
+                amount = 1.0 if sku.hourly else round(rng.lognormvariate(2.0, 1.4), 6)
+                public = amount * sku.rate
+                pub_s = f"{public:.10g}"
+                kind = sku.kind
+                if (kind == "box" or kind == "lambda") and quota >= 2 and random_() < SP_COVERED_SHARE:
+                    sp_rate = sku.rate * (1 - SP_DISCOUNT)
+                    used += amount * sp_rate
+                    yield self._line("SavingsPlanCoveredUsage", times, account, sku, resource, amount, sku.rate,
+                                     public, sku.desc, pub_s, sku.rate_s, "OnDemand", sp=self.sp_arn,
+                                     sp_rate=f"{sp_rate:.10g}", sp_cost=f"{amount * sp_rate:.10g}", tags=tag)
+                    yield self._line("SavingsPlanNegation", times, account, sku, resource, amount, -sku.rate,
+                                     -public, f"SavingsPlanNegation used by AccountId : {account}", "0", "0",
+                                     "OnDemand", sp=self.sp_arn, tags=tag)
+                    quota -= 2
+                    emitted += 2
+                    continue
+                if kind == "spot" or kind == "fargateSpot":
+                    cost = public * (1 - SPOT_DISCOUNT * (0.8 + 0.4 * random_()))
+                    term = "Spot"
+                else:
+                    cost = public
+                    term = "OnDemand"
+                yield self._line("Usage", times, account, sku, resource, amount, cost / amount if amount else 0.0,
+                                 cost, sku.desc, pub_s, sku.rate_s, term, tags=tag)
+                quota -= 1
+                emitted += 1
+            # size next hour's commitment at ~90% of this hour's covered spend
+            self.commitment = round(used * 0.9, 6)
+            hour += 1
+            # monthly lines land in the first hour so a truncated period still has them
+            if hour == 1 and emitted + 4 <= n:
+                yield self._fixed("RIFee", times, 744.0, 0.062,
+                                  "USD 0.062 hourly fee per Linux/UNIX (Amazon VPC), m5.large instance",
+                                  "Reserved", ri=self.ri_arn)
+                yield self._fixed("Fee", times, 1.0, 100.0, "AWS Support (Business)")
+                yield self._fixed("Credit", times, 1.0, -25.0, "AWS Credits, promotional")
+                yield self._fixed("Tax", times, 1.0, 412.37, "Tax for product code AmazonEC2")
+                emitted += 4
+
+
+def _split(n: int, k: int) -> list[int]:
+    """Split n rows over k periods (or parts) as evenly as possible."""
+    return [n // k + (i < n % k) for i in range(k)]
+
+
+def _period_lines(n: int, seed: int, k: int, bill: tuple[datetime, datetime]) -> Iterator[str]:
+    """The n rows of billing period k (seeded per period, so periods are independent of each other)."""
+    return _PeriodWriter(random.Random(f"{seed}:{k}"), *bill, line_id=k << 40).rows(n)
+
+
+def _write_lines(fh: TextIO, lines: Iterable[str], chunk: int = 8192) -> None:
+    buf = []
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= chunk:
+            fh.write("".join(buf))
+            buf.clear()
+    fh.write("".join(buf))
+
+
+def write_csv(fh: TextIO, rows: int, seed: int = 1, start: str = "2024-01", periods: int = 1) -> int:
+    """Write a CUR CSV (header + rows, all periods in order) to `fh`; returns the data rows written."""
+    fh.write(",".join(COLUMNS) + "\n")
+    for k, (bill, n) in enumerate(zip(billing_periods(start, periods), _split(rows, periods))):
+        _write_lines(fh, _period_lines(n, seed, k, bill))
+    return rows
+
+
+def _open_out(path: Path) -> TextIO:
+    if path.suffix.lower() == ".gz":
+        return io.TextIOWrapper(gzip.GzipFile(path, "wb", compresslevel=6, mtime=0), encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def generate_file(path: str | Path, rows: int, seed: int = 1, start: str = "2024-01", periods: int = 1) -> int:
+    """One CUR file (.csv, .csv.gz or .parquet) holding every period; returns the row count."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        tmp = path.with_name(path.name + ".tmp.csv")
+        try:
+            with _open_out(tmp) as fh:
+                write_csv(fh, rows, seed, start, periods)
+            return convert_csv_to_parquet(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+    with _open_out(path) as fh:
+        return write_csv(fh, rows, seed, start, periods)
+
+
+def generate_delivery(root: str | Path, rows: int, seed: int = 1, start: str = "2024-01", periods: int = 1,
+                      parts: int = 1, report: str = "synthetic-cur") -> list[Path]:
+    """An S3-style CUR delivery: one folder + manifest per billing period, `parts` .csv.gz each.
+
+    Layout: root/report/YYYYMMDD-YYYYMMDD/<assembly>/report-0000N.csv.gz with the period manifest
+    next to the assembly folder, so `cur_engine.py root/` reads it like a synced bucket.
+    """
+    root = Path(root)
+    files = []
+    for k, ((b0, b1), n) in enumerate(zip(billing_periods(start, periods), _split(rows, periods))):
+        period_dir = root / report / f"{b0:%Y%m%d}-{b1:%Y%m%d}"
+        assembly = f"{random.Random(f'{seed}:{k}:asm').getrandbits(64):016x}"
+        lines = _period_lines(n, seed, k, (b0, b1))
+        keys = []
+        # parts are consecutive slices of the period, as AWS splits them
+        for part, size in enumerate(_split(n, parts)):
+            f = period_dir / assembly / f"{report}-{part + 1:05d}.csv.gz"
+            f.parent.mkdir(parents=True, exist_ok=True)
+            with _open_out(f) as fh:
+                fh.write(",".join(COLUMNS) + "\n")
+                _write_lines(fh, islice(lines, size))
+            keys.append(f"{report}/{period_dir.name}/{assembly}/{f.name}")
+            files.append(f)
+        manifest = {"assemblyId": assembly, "reportKeys": keys,
+                    "billingPeriod": {"start": f"{b0:%Y%m%dT%H%M%S.000Z}", "end": f"{b1:%Y%m%dT%H%M%S.000Z}"}}
+        (period_dir / f"{report}-Manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return files
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Write a deterministic synthetic AWS CUR.")
+    p.add_argument("out", help="output file (.csv, .csv.gz, .parquet) or, with --parts, a delivery folder")
+    p.add_argument("--rows", default="100k", help="row count, e.g. 100k, 1m, 10m, 50m (default: 100k)")
+    p.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    p.add_argument("--start", default="2024-01", help="first billing period, YYYY-MM (default: 2024-01)")
+    p.add_argument("--periods", type=int, default=1, help="consecutive monthly billing periods (default: 1)")
+    p.add_argument("--parts", type=int, default=0,
+                   help="write an S3-style delivery folder with this many .csv.gz parts per period")
+    return p
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    try:
+        rows = parse_size(args.rows)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if not re.fullmatch(r"\d{4}-\d{2}", args.start):
+        raise SystemExit("--start must be YYYY-MM, e.g. 2024-01.")
+    if args.periods < 1 or rows < 1:
+        raise SystemExit("--rows and --periods must be positive.")
+
+    t0 = time.perf_counter()
+    try:
+        if args.parts:
+            files = generate_delivery(args.out, rows, args.seed, args.start, args.periods, args.parts)
+            what = f"{len(files)} part file(s) in {Path(args.out).resolve()}"
+        else:
+            generate_file(args.out, rows, args.seed, args.start, args.periods)
+            what = str(Path(args.out).resolve())
+    except ImportError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    dt = time.perf_counter() - t0
+    print(f"✅ Generated: {what} ({rows:,} rows in {dt:.2f}s, {rows / max(dt, 1e-9):,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
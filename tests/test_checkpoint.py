@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import cur_synth
+from cur_engine import DashboardOptions, ScanCheckpoint, scan_file
+
+
+# -----------------------------
+# ScanCheckpoint: parts are rescanned only when their bytes change
+# -----------------------------
+@pytest.fixture
+def delivery(tmp_path):
+    files = []
+    for i, month in enumerate(["2024-01", "2024-02", "2024-03"]):
+        path = tmp_path / "cur" / f"part-{i}.csv"
+        path.parent.mkdir(exist_ok=True)
+        cur_synth.generate_file(path, 1500, seed=i + 1, start=month)
+        files.append(path)
+    return files
+
+
+def _full_scan(files, opts=None):
+    total = scan_file(files[0], opts)
+    for f in files[1:]:
+        total.merge(scan_file(f, opts))
+    return total.finalize()
+
+
+def test_checkpoint_reuses_unchanged_parts(tmp_path, delivery):
+    state = tmp_path / "state"
+    cp = ScanCheckpoint(state)
+    assert cp.update(delivery, workers=1) == delivery
+    digest, result = cp.digest, cp.merged().finalize()
+    assert result == _full_scan(delivery)
+
+    again = ScanCheckpoint(state)
+    assert again.update(delivery, workers=1) == []
+    assert again.digest == digest
+    assert again.merged().finalize() == result
+
+    # a touched part is hashed again but its partial is still good
+    st = delivery[1].stat()
+    os.utime(delivery[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert ScanCheckpoint(state).update(delivery, workers=1) == []
+
+
+def test_checkpoint_rescans_changed_parts(tmp_path, delivery):
+    state = tmp_path / "state"
+    cp = ScanCheckpoint(state)
+    cp.update(delivery, workers=1)
+    digest = cp.digest
+
+    cur_synth.generate_file(delivery[1], 1800, seed=9, start="2024-02")
+    cp = ScanCheckpoint(state)
+    assert cp.update(delivery, workers=1) == [delivery[1]]
+    assert cp.digest != digest
+    assert cp.merged().finalize() == _full_scan(delivery)
+
+    # a part that left the delivery takes its partial along
+    assert cp.update(delivery[:2], workers=1) == []
+    assert len(list((state / "partials").glob("*.pkl"))) == 2
+    assert cp.merged().finalize() == _full_scan(delivery[:2])
+
+
+def test_checkpoint_invalidated_by_rules(tmp_path, delivery):
+    state = tmp_path / "state"
+    ScanCheckpoint(state).update(delivery, workers=1)
+    opts = DashboardOptions(compute_codes=("AmazonEC2",))
+    cp = ScanCheckpoint(state, opts)
+    assert cp.update(delivery, workers=1) == delivery
+    assert cp.merged().finalize() == _full_scan(delivery, opts)
+    # scenario parameters are not part of the fingerprint
+    assert ScanCheckpoint(state, DashboardOptions(compute_codes=("AmazonEC2",), add_coverage=0.5)) \
+        .update(delivery, workers=1) == []
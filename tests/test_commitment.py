@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from cur_engine import optimize_commitment
+
+
+# -----------------------------
+# Commitment optimizer
+# -----------------------------
+def _net_savings(hourly, d, k):
+    return sum(min(h, k) for h in hourly) - (1 - d) * k * len(hourly)
+
+
+def test_optimize_commitment_flat_load():
+    r = optimize_commitment([10.0] * 100, 0.3)
+    assert r["hours"] == 100
+    opt = r["optimum"]
+    assert opt["commitmentOD"] == 10.0
+    assert opt["commitment"] == pytest.approx(7.0)
+    assert opt["savings"] == pytest.approx(300.0)
+    assert opt["utilization"] == opt["coverage"] == 1.0
+    assert optimize_commitment([10.0] * 100, 0.3, periods=2)["optimum"]["savings"] == pytest.approx(150.0)
+
+
+def test_optimize_commitment_is_optimal():
+    rng = random.Random(11)
+    hourly = [max(0.0, 50 + 30 * rng.gauss(0, 1)) for _ in range(24 * 30)]
+    d = 0.28
+    r = optimize_commitment(hourly, d)
+    best = max(_net_savings(hourly, d, k) for k in set(hourly) | {0.0})
+    assert r["optimum"]["savings"] == pytest.approx(best)
+    assert all(s <= r["optimum"]["savings"] + 1e-9 for s in r["curve"]["savings"])
+    for k, s in zip(r["curve"]["commitmentOD"], r["curve"]["savings"]):
+        assert s == pytest.approx(_net_savings(hourly, d, k))
+    levels = r["loadDuration"]["level"]
+    assert levels[0] == max(hourly) and levels[-1] == min(hourly)
+    assert levels == sorted(levels, reverse=True)
+
+
+def test_optimize_commitment_edges():
+    assert optimize_commitment([], 0.3)["optimum"]["savings"] == 0.0
+    assert optimize_commitment([5.0, 7.0], 0.0)["optimum"]["commitmentOD"] == 0.0
@@ -0,0 +1,115 @@
+import base64
+import gzip
+import json
+import shutil
+import zipfile
+
+import pytest
+
+import cur_synth
+from conftest import assert_close
+from cur_engine import (EXPORT_SCHEMA, CubeAccumulator, DashboardAccumulator, convert_csv_to_parquet, cube_payload,
+                        export_tables, scan_file, write_export)
+
+
+@pytest.fixture(scope="module")
+def cur_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cur") / "cur.csv"
+    cur_synth.generate_file(path, 3000, seed=3, periods=2)
+    return path
+
+
+def _as_json(acc):
+    return json.dumps(acc.finalize(), sort_keys=True)
+
+
+# -----------------------------
+# Input formats: every reader folds the same rows into the same result
+# -----------------------------
+def _gz(src, dst):
+    with open(src, "rb") as fh, gzip.open(dst, "wb") as out:
+        shutil.copyfileobj(fh, out)
+
+
+def _zip(src, dst):
+    """Two CSV members sharing the header, as read in archive order."""
+    header, *rows = src.read_text(encoding="utf-8").splitlines(keepends=True)
+    half = len(rows) // 2
+    with zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("part-1.csv", "".join([header] + rows[:half]))
+        zf.writestr("part-2.csv", "".join([header] + rows[half:]))
+
+
+@pytest.mark.parametrize("suffix", [".csv.gz", ".zip", ".parquet", ".zip.parquet"])
+def test_formats_round_trip(tmp_path, cur_csv, suffix):
+    path = tmp_path / f"cur{suffix}"
+    if suffix == ".csv.gz":
+        _gz(cur_csv, path)
+    elif suffix == ".zip":
+        _zip(cur_csv, path)
+    else:
+        pytest.importorskip("pyarrow")
+        src = cur_csv
+        if suffix == ".zip.parquet":
+            src = tmp_path / "cur.zip"
+            _zip(cur_csv, src)
+        assert convert_csv_to_parquet(src, path) == 3000
+    assert _as_json(scan_file(path)) == _as_json(scan_file(cur_csv))
+
+
+# -----------------------------
+# Report cube: CubeAccumulator → cube_payload → consume_cube
+# -----------------------------
+def test_cube_round_trip(cur_csv):
+    cube = scan_file(cur_csv, accumulator=CubeAccumulator).to_cube({"rows": 3000})
+    decoded = json.loads(gzip.decompress(base64.b64decode(cube_payload(cube))))
+    assert decoded == json.loads(json.dumps(cube))
+
+    replayed = DashboardAccumulator().consume_cube(decoded)
+    assert replayed.row_count == 3000
+    # the cube sums cells before folding them, so sums match up to summation order
+    assert_close(json.loads(json.dumps(scan_file(cur_csv).finalize())), json.loads(json.dumps(replayed.finalize())))
+
+
+# -----------------------------
+# Table export: export_tables / write_export follow EXPORT_SCHEMA
+# -----------------------------
+def _tables(cur_csv):
+    """The result and cube CUR_analysis.py --export writes: the result is replayed from the cube."""
+    cube = scan_file(cur_csv, accumulator=CubeAccumulator).to_cube()
+    return DashboardAccumulator().consume_cube(cube).finalize(), cube
+
+
+def test_export_tables_columns(cur_csv):
+    res, cube = _tables(cur_csv)
+    tables = export_tables(res, cube)
+    assert list(tables) == list(EXPORT_SCHEMA)
+    for name, cols in tables.items():
+        assert list(cols) == [c for c, _ in EXPORT_SCHEMA[name]], name
+        assert len({len(v) for v in cols.values()}) == 1, name
+    assert tables["summary"]["scope"] == ["combined", "period", "period"]
+    assert len(tables["daily"]["date"]) == len(res["dailyX"])
+    assert len(tables["cube"]["net"]) == len(cube["cells"]["net"])
+    assert "cube" not in export_tables(res)
+
+
+@pytest.mark.parametrize("with_cube", [False, True])
+def test_write_export_schema(tmp_path, cur_csv, with_cube):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    res, cube = _tables(cur_csv)
+    tables = export_tables(res, cube if with_cube else None)
+    written = write_export(tables, tmp_path)
+    assert len(written) == (16 if with_cube else 14)
+    types = {"float64": pa.float64(), "int32": pa.int32(), "int64": pa.int64(), "utf8": pa.string(),
+             "bool": pa.bool_(), "date32": pa.date32(), "timestamp": pa.timestamp("ms", tz="UTC")}
+    for name, cols in tables.items():
+        schema = pa.schema([pa.field(c, types[t]) for c, t in EXPORT_SCHEMA[name]])
+        with pa.memory_map(str(tmp_path / f"{name}.arrow")) as src:
+            arrow = pa.ipc.open_file(src).read_all()
+        parquet = pq.read_table(tmp_path / f"{name}.parquet")
+        expected = pa.table([pa.array(cols[f.name], f.type) for f in schema], schema=schema)
+        for t in (arrow, parquet):
+            assert t.schema.equals(schema), name
+            assert t.equals(expected), name
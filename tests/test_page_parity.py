@@ -0,0 +1,72 @@
+"""The page's embedded engine (<script id="curEngine">) against cur_engine.py, run under Node."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+from dataclasses import asdict
+
+import pytest
+
+import cur_synth
+from conftest import ROOT
+from cur_engine import DEFAULT_RULES, DashboardOptions, scan_file
+
+NODE = shutil.which("node")
+pytestmark = pytest.mark.skipif(NODE is None, reason="needs node")
+
+# Loads the engine script in this realm, folds the CSV in columnar chunks like a worker does,
+# then merges the partial into a fresh accumulator like the page does.
+DRIVER = r"""
+const fs = require("fs"), vm = require("vm");
+const [page, csvPath, optsPath] = process.argv.slice(2);
+const src = fs.readFileSync(page, "utf8").match(/<script id="curEngine">([\s\S]*?)<\/script>/)[1];
+const names = [...src.matchAll(/^  (?:function|const|let) ([A-Za-z_$][\w$]*)/gm)].map(m => m[1]);
+const E = vm.runInThisContext(`(function(){ ${src}\n return {${names.join(",")}}; })()`);
+const opts = JSON.parse(fs.readFileSync(optsPath, "utf8"));
+
+const rows = [];
+E.parseCsvRows(fs.readFileSync(csvPath, "utf8"), rows, true);
+const part = E.initDashboard(opts);
+for (let i = 0; i < rows.length; i += 1000) E.consumeColumnarChunk(part, rows.slice(i, i + 1000));
+E.endColumnar(part);
+const acc = E.initDashboard(opts);
+E.mergeDashboardPartials(acc, part);
+const summary = E.summarizeDashboard(acc);
+process.stdout.write(JSON.stringify({summary, result: E.evaluateDashboard(summary, opts)}));
+"""
+
+
+def _page_opts(opts):
+    o = asdict(opts)
+    return {"addCoverage": o["add_coverage"], "spotDiscount": o["spot_discount"],
+            "passThrough": list(o["pass_through"]), "computeCodes": list(o["compute_codes"]),
+            "rules": o["rules"] or DEFAULT_RULES}
+
+
+@pytest.fixture(scope="module")
+def page(tmp_path_factory):
+    out = tmp_path_factory.mktemp("page") / "dashboard.html"
+    subprocess.run([sys.executable, str(ROOT / "CUR_analysis.py"), "-o", str(out)], check=True,
+                   capture_output=True, cwd=ROOT)
+    return out
+
+
+@pytest.mark.parametrize("periods", [1, 3])
+def test_page_engine_matches_python(tmp_path, page, periods):
+    path = tmp_path / "cur.csv"
+    cur_synth.generate_file(path, 6000, seed=periods, periods=periods)
+    opts = DashboardOptions()
+    (tmp_path / "driver.js").write_text(DRIVER, encoding="utf-8")
+    (tmp_path / "opts.json").write_text(json.dumps(_page_opts(opts)), encoding="utf-8")
+    out = subprocess.run([NODE, str(tmp_path / "driver.js"), str(page), str(path), str(tmp_path / "opts.json")],
+                         check=True, capture_output=True, text=True, env={**os.environ, "TZ": "UTC"}).stdout
+    js = json.loads(out)
+
+    acc = scan_file(path, opts)
+    py_summary = json.loads(json.dumps(acc.summarize()))
+    py_result = json.loads(json.dumps(acc.finalize()))
+    assert len(py_summary["periods"]) == periods
+    # the twins are bit-identical: no tolerance
+    assert js["summary"] == py_summary
+    assert js["result"] == py_result
@@ -0,0 +1,65 @@
+import random
+from collections import Counter
+
+import pytest
+
+from cur_engine import HyperLogLog, SpaceSaving
+
+
+# -----------------------------
+# Sketches
+# -----------------------------
+def _weighted_stream(n=40000, keys=5000, seed=3):
+    rng = random.Random(seed)
+    # heavy-tailed key popularity, integer weights so every sum is exact
+    return [(f"i-{int(keys * rng.random() ** 3):05d}", float(rng.randint(1, 100))) for _ in range(n)]
+
+
+def _check_space_saving(ss, truth):
+    for key, (count, over, _) in ss.items.items():
+        assert count - over <= truth[key] <= count
+    assert all(v <= ss.floor for k, v in truth.items() if k not in ss.items)
+    assert len(ss.items) < 2 * ss.capacity
+
+
+def test_space_saving_bounds():
+    stream = _weighted_stream()
+    truth = Counter()
+    ss = SpaceSaving(64)
+    for key, w in stream:
+        ss.add(key, w)
+        truth[key] += w
+    _check_space_saving(ss, truth)
+    assert ss.floor > 0
+    assert ss.ranked()[0][0] == truth.most_common(1)[0][0]
+
+
+def test_space_saving_merge_bounds():
+    stream = _weighted_stream()
+    halves = SpaceSaving(64), SpaceSaving(64)
+    truth = Counter()
+    for i, (key, w) in enumerate(stream):
+        halves[i % 2].add(key, w)
+        truth[key] += w
+    merged = halves[0].merge(halves[1])
+    _check_space_saving(merged, truth)
+
+
+@pytest.mark.parametrize("n", [1000, 20000, 200000])
+def test_hyperloglog_error(n):
+    hll = HyperLogLog()
+    for i in range(n):
+        hll.add(f"arn:aws:ec2:eu-west-1:123456789012:instance/i-{i:017x}")
+    # 4096 registers: ~1.6% standard error, so 5% is beyond three sigma
+    assert abs(hll.count() - n) <= 0.05 * n
+
+
+def test_hyperloglog_merge_is_union():
+    a, b, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        s = f"r-{i}"
+        (a if i < 20000 else b).add(s)
+        if i >= 10000:
+            b.add(s)
+        union.add(s)
+    assert a.merge(b).count() == union.count()
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+import random
+
+import pytest
+
+import cur_engine
+import cur_synth
+from conftest import assert_close
+from cur_engine import csv_ranges, map_file, read_csv_range, scan_files
+
+
+# -----------------------------
+# csv_ranges: byte ranges start on row boundaries, also inside quoted newlines
+# -----------------------------
+def _quoted_csv(path, rows=3000, seed=7):
+    """A CSV whose quoted fields hold newlines, commas and doubled quotes; returns header, rows and row starts."""
+    rng = random.Random(seed)
+    header = ["id", "note", "amount"]
+    body = []
+    for i in range(rows):
+        note = rng.choice(["plain", 'say "hi"', "a,b", "line one\nline two", "\n\n", "x\r\ny", ""])
+        body.append([str(i), note * rng.randint(1, 3), f"{rng.random():.6f}"])
+    offsets, out = [], io.BytesIO()
+    for r in [header] + body:
+        offsets.append(out.tell())
+        buf = io.StringIO(newline="")
+        csv.writer(buf, lineterminator="\n").writerow(r)
+        out.write(buf.getvalue().encode("utf-8"))
+    path.write_bytes(out.getvalue())
+    return header, body, set(offsets[1:])
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 7, 16, 64])
+def test_csv_ranges_split_on_row_boundaries(tmp_path, k):
+    path = tmp_path / "quoted.csv"
+    header, body, row_offsets = _quoted_csv(path)
+    got_header, ranges = csv_ranges(path, k)
+    assert got_header == header
+    assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(start in row_offsets for start, _ in ranges[1:])
+    assert 1 <= len(ranges) <= k
+
+    rows = []
+    with map_file(path) as mm:
+        for start, end in ranges:
+            with read_csv_range(mm, start, end, None if start == 0 else header) as (h, part):
+                assert h == header
+                rows += list(part)
+    assert rows == body
+
+
+def test_csv_ranges_map_fn(tmp_path):
+    path = tmp_path / "quoted.csv"
+    _quoted_csv(path, rows=500)
+    calls = []
+
+    def map_fn(*args):
+        calls.append(len(args[2]))
+        return map(*args)
+
+    assert csv_ranges(path, 5, map_fn) == csv_ranges(path, 5)
+    assert calls == [5]
+
+
+# -----------------------------
+# Split scans: byte-range partials merged against one serial pass
+# -----------------------------
+SKETCHED = ("resources", "spotCandidates")
+
+
+def _assert_bounds(serial, split):
+    """Entries listed by both scans have overlapping [net - overcount, net] spend bounds."""
+    for a, b in ((serial, split), (split, serial)):
+        for key, r in a.items():
+            if key in b:
+                assert r["net"] - r["overcount"] <= b[key]["net"] + 1e-9, key
+
+
+def _sketched(view):
+    out = {}
+    for pool, r in view["resources"].items():
+        out[pool, "distinct"] = r["distinctResources"]
+        out[pool, "resources"] = {x["id"]: x for x in r["resources"]}
+        out[pool, "instanceTypes"] = {x["id"]: x for x in r["instanceTypes"]}
+    out["spotCandidates"] = {(x["pool"], x["id"]): x for x in view["spotCandidates"]}
+    return out
+
+
+def test_split_scan_matches_serial(tmp_path, monkeypatch):
+    path = tmp_path / "cur.csv"
+    cur_synth.generate_file(path, 10000, seed=4, periods=2)
+    monkeypatch.setattr(cur_engine, "SPLIT_MIN_BYTES", 1 << 20)
+    assert cur_engine._split_ways(path, 6) > 2
+
+    serial = json.loads(json.dumps(scan_files([path], workers=1).finalize()))
+    split = json.loads(json.dumps(scan_files([path], workers=6).finalize()))
+    for a, b in zip([serial] + serial["periods"], [split] + split["periods"]):
+        ka, kb = _sketched(a), _sketched(b)
+        for k in ka:
+            if isinstance(ka[k], int):
+                assert ka[k] == kb[k], k    # HyperLogLog registers merge exactly
+            else:
+                _assert_bounds(ka[k], kb[k])
+        for k in SKETCHED:
+            del a[k], b[k]
+    assert_close(serial, split)
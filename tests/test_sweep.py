@@ -0,0 +1,30 @@
+import cur_synth
+from cur_engine import SWEEP_CSV_COLUMNS, DashboardOptions, evaluate_scenarios, scan_file, sweep_rows, sweep_scenarios
+
+
+# -----------------------------
+# Scenario sweep
+# -----------------------------
+def test_sweep_matches_scenario_tables(tmp_path):
+    path = tmp_path / "cur.csv"
+    cur_synth.generate_file(path, 4000, seed=5)
+    m = scan_file(path).summarize()["combined"]
+    pass_through = DashboardOptions().pass_through
+    sweep = sweep_scenarios(m, pass_through)
+    ax = sweep["axes"]
+    tolist = lambda v: v.tolist() if hasattr(v, "tolist") else v  # noqa: E731
+    sp, e2, e3 = (tolist(sweep[k]) for k in SWEEP_CSV_COLUMNS[4:7])
+
+    for i in (0, 17, 30, 100):
+        for k in (0, 7, 12, 19):
+            opts = DashboardOptions(add_coverage=ax["addCoverage"][i], spot_discount=ax["spotDiscount"][k])
+            r = evaluate_scenarios(m, opts)
+            assert [row["monthlySavings"] for row in r["ptRows"]] == sp[i]
+            for s in r["spotScenario"]:
+                a = ax["spotAdoption"].index(s["a"])
+                assert (s["savEC2"], s["savECS"]) == (e2[k][a], e3[k][a])
+
+    rows = list(sweep_rows(sweep))
+    assert len(rows) == len(ax["addCoverage"]) * len(pass_through) * len(ax["spotDiscount"]) * len(ax["spotAdoption"])
+    c, p, d, a, s, x2, x3, total, annual, _ = rows[len(rows) // 3]
+    assert total == (s + x2) + x3 and annual == total * 12